@@ -0,0 +1,183 @@
+import asyncio
+from contextvars import ContextVar
+from typing import TypeVar, Any
+from uuid import uuid4
+
+from aws_lambda_powertools import Logger
+from pydantic import ValidationError
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import get_stage_string, check_secret_state, find_version, is_rotation_finished
+from rds_proxy_password_rotation.adapter.secret_value_cache import SecretValueCache
+from rds_proxy_password_rotation.adapter.stage_transition_planner import plan_stage_transition
+from rds_proxy_password_rotation.local_password_generator import LocalPasswordGenerator
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, UserCredentials, Credentials
+from rds_proxy_password_rotation.services import AsyncPasswordService, PasswordGenerator
+
+T = TypeVar('T', bound=Credentials)
+
+
+class AsyncAwsSecretsManagerService(AsyncPasswordService):
+    """
+    Async counterpart of `AwsSecretsManagerService`. Expects an aiobotocore style client, i.e. the operations of the
+    boto3 client as coroutines.
+    """
+
+    def __init__(self, secretsmanager_client: Any, logger: Logger, secret_value_cache: SecretValueCache = None,
+                 password_generator: PasswordGenerator = None):
+        self.client = secretsmanager_client
+        self.logger = logger
+        # the AWS password generator is blocking
+        self.password_generator = password_generator if password_generator is not None else LocalPasswordGenerator()
+        self.secret_value_cache = secret_value_cache if secret_value_cache is not None else SecretValueCache()
+
+        # secret id -> task fetching the metadata. Concurrent tasks of a request scope share one describe_secret call.
+        self.__metadata_snapshot: ContextVar[dict[str, asyncio.Future] | None] = ContextVar('async_metadata_snapshot', default=None)
+
+    def begin_request_scope(self):
+        self.__metadata_snapshot.set({})
+
+    def end_request_scope(self):
+        self.__metadata_snapshot.set(None)
+
+    async def is_rotation_enabled(self, secret_id: str) -> bool:
+        metadata = await self.__get_secret_metadata(secret_id)
+
+        return 'RotationEnabled' in metadata and metadata['RotationEnabled']
+
+    async def make_new_credentials_current(self, secret_id: str, token: str):
+        metadata = await self.__get_secret_metadata(secret_id)
+
+        try:
+            stage_moves = plan_stage_transition(metadata['VersionIdsToStages'], token)
+        except ValueError as e:
+            self.logger.error(f'Failed to finish the rotation of secret {secret_id} to version {token}: {e}')
+
+            raise e
+
+        if not stage_moves:
+            self.logger.info(f'current secret is already the pending one: {secret_id} and version {token}')
+            return
+
+        # invalidate before the first write: the snapshot must not survive a partially failed stage transition
+        self.__invalidate_secret_metadata(secret_id)
+
+        # the order matters, so the calls are not awaited concurrently
+        for stage_move in stage_moves:
+            await self.client.update_secret_version_stage(SecretId=secret_id, **stage_move.to_request())
+
+    async def remove_pending_version(self, secret_id: str, token: str):
+        self.__invalidate_secret_metadata(secret_id)
+        await self.client.update_secret_version_stage(SecretId=secret_id, VersionStage=get_stage_string(PasswordStage.PENDING), RemoveFromVersionId=token)
+
+        self.logger.info(f'pending stage removed: {secret_id} and version {token}')
+
+    async def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
+        metadata = await self.__get_secret_metadata(secret_id)
+
+        return check_secret_state(metadata['VersionIdsToStages'], secret_id, token, self.logger)
+
+    async def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        metadata = await self.__get_secret_metadata(secret_id)
+
+        return is_rotation_finished(metadata['VersionIdsToStages'], token)
+
+    async def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        return await self.__get_credentials(secret_id, stage, token, DatabaseCredentials)
+
+    async def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        return await self.__get_credentials(secret_id, stage, token, UserCredentials)
+
+    async def __get_credentials(self, secret_id: str, stage: PasswordStage, token: str | None, credentials_type: type[T]) -> T | None:
+        try:
+            version = None
+            snapshot = self.__metadata_snapshot.get()
+
+            # describing a secret not in the snapshot (e.g. a proxy secret) would cost an additional API call
+            if snapshot is not None and secret_id in snapshot:
+                version = find_version(await self.__get_secret_metadata(secret_id), stage, token)
+
+            if version is not None:
+                credentials = self.secret_value_cache.get(version[0], version[1], credentials_type)
+
+                if credentials is not None:
+                    return credentials
+
+                secret = await self.client.get_secret_value(SecretId=secret_id, VersionId=version[1])
+            elif token is None:
+                secret = await self.client.get_secret_value(SecretId=secret_id, VersionStage=get_stage_string(stage))
+            else:
+                secret = await self.client.get_secret_value(SecretId=secret_id, VersionId=token, VersionStage=get_stage_string(stage))
+
+            credentials = credentials_type.model_validate_json(secret['SecretString'])
+            self.secret_value_cache.put(secret['ARN'], secret['VersionId'], credentials)
+
+            return credentials
+        except ValidationError as e:
+            self.logger.error(f"Failed to parse secret value for secret {secret_id} (stage: {stage.name}, token: {token})")
+
+            raise e
+        except self.client.exceptions.ResourceNotFoundException:
+            self.logger.error(f"Failed to retrieve secret value for secret {secret_id} (stage: {stage.name}, token: {token})")
+
+        return None
+
+    async def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
+        if token is None:
+            token = str(uuid4())
+
+        new_username = credential.get_next_username()
+        pending_credential = credential.model_copy(update={'username': new_username, 'password': self.password_generator.generate_password()})
+
+        response = await self.client.put_secret_value(
+            SecretId=secret_id,
+            ClientRequestToken=token,
+            SecretString=pending_credential.model_dump_json(),
+            VersionStages=[get_stage_string(PasswordStage.PENDING)])
+        self.__invalidate_secret_metadata(secret_id)
+        # the following steps read the pending credentials without fetching them again
+        self.secret_value_cache.put(response['ARN'], response['VersionId'], pending_credential)
+
+        self.logger.info(f'new pending secret created: {secret_id} and version {token}')
+
+    async def set_credentials(self, secret_id: str, token: str, credentials: Credentials):
+        if token is None:
+            token = str(uuid4())
+
+        await self.client.put_secret_value(
+            SecretId=secret_id,
+            ClientRequestToken=token,
+            SecretString=credentials.model_dump_json(),
+            VersionStages=[get_stage_string(PasswordStage.CURRENT)])
+        self.__invalidate_secret_metadata(secret_id)
+
+        self.logger.info(f'credentials modified: {secret_id} and version {token}')
+
+    async def __get_secret_metadata(self, secret_id: str) -> dict:
+        snapshot = self.__metadata_snapshot.get()
+
+        if snapshot is None:
+            return await self.client.describe_secret(SecretId=secret_id)
+
+        metadata = snapshot.get(secret_id)
+
+        if metadata is None:
+            metadata = snapshot[secret_id] = asyncio.ensure_future(self.client.describe_secret(SecretId=secret_id))
+
+        try:
+            # a cancelled caller must not cancel the call shared with the other tasks
+            return await asyncio.shield(metadata)
+        except Exception:
+            # do not keep the failure in the snapshot, the next call tries again
+            if snapshot.get(secret_id) is metadata:
+                snapshot.pop(secret_id)
+
+            raise
+
+    def __invalidate_secret_metadata(self, secret_id: str):
+        """
+        Has to be called for every write changing the stages of a secret as the snapshot is outdated afterwards.
+        """
+        snapshot = self.__metadata_snapshot.get()
+
+        if snapshot is not None:
+            snapshot.pop(secret_id, None)
@@ -0,0 +1,72 @@
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.circuit_breaker import DatabaseCircuitBreaker
+from rds_proxy_password_rotation.adapter.postgresql_database_service import get_connect_string, get_connect_timeout, get_statement_timeout, SET_LOCAL_TIMEOUTS, record_connect_error
+from rds_proxy_password_rotation.model import DatabaseCredentials
+from rds_proxy_password_rotation.services import AsyncDatabaseService, Instrumentation, NoInstrumentation
+
+if TYPE_CHECKING:
+    from psycopg import AsyncConnection
+
+
+class AsyncPostgreSqlDatabaseService(AsyncDatabaseService):
+    """
+    Async counterpart of `PostgreSqlDatabaseService` using psycopg's `AsyncConnection`.
+    """
+
+    def __init__(self, logger: Logger, instrumentation: Instrumentation = None, circuit_breaker: DatabaseCircuitBreaker = None):
+        self.logger = logger
+        self.instrumentation = instrumentation if instrumentation is not None else NoInstrumentation()
+        self.circuit_breaker = circuit_breaker
+
+    async def test_user_credentials(self, credentials: DatabaseCredentials) -> bool:
+        async with await self._get_connection(credentials) as conn:
+            async with conn.cursor() as cur:
+                with self.instrumentation.measure('DatabaseQueryDuration', {'Operation': 'test_user_credentials'}):
+                    await cur.execute("SELECT 1")
+
+                return True
+
+    async def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        from psycopg import sql, AsyncClientCursor
+
+        async with await self._get_connection(old_credentials) as conn:
+            async with AsyncClientCursor(conn) as cur:
+                with self.instrumentation.measure('DatabaseQueryDuration', {'Operation': 'change_user_credentials'}):
+                    statement_timeout = get_statement_timeout('change_user_credentials')
+
+                    if statement_timeout is not None:
+                        await cur.execute(SET_LOCAL_TIMEOUTS, (statement_timeout, statement_timeout))
+
+                    await cur.execute(sql.SQL("ALTER USER {} WITH PASSWORD %s").format(sql.Identifier(old_credentials.username)), (new_password,))
+
+                await conn.commit()
+
+    async def _get_connection(self, credentials: DatabaseCredentials) -> 'AsyncConnection':
+        """
+        Method is protected to allow testing.
+        :param credentials: used to connect to the database
+        :return: the database connection
+        """
+        import psycopg
+
+        connect_timeout = get_connect_timeout()
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_connect(credentials.database_host, credentials.database_port)
+
+        try:
+            with self.instrumentation.measure('DatabaseConnectDuration'):
+                connection = await psycopg.AsyncConnection.connect(get_connect_string(credentials, connect_timeout))
+        except psycopg.OperationalError as e:
+            self.logger.error(f'Failed to connect to database {credentials.database_name} on {credentials.database_host}:{credentials.database_port} as {credentials.username}')
+            record_connect_error(self.circuit_breaker, credentials, e)
+
+            raise e
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(credentials.database_host, credentials.database_port)
+
+        return connection
@@ -3,23 +3,36 @@ from dependency_injector.wiring import inject, Provide
 from aws_lambda_powertools.utilities.parser import event_parser
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
-from rds_proxy_password_rotation.adapter.aws_lambda_function_model import AwsSecretManagerRotationEvent
+from rds_proxy_password_rotation.adapter.aws_lambda_function_model import AwsSecretManagerRotationEvent, FullRotationEvent
 from rds_proxy_password_rotation.adapter.container import Container
+from rds_proxy_password_rotation.adapter.profiling import profile_invocations
+from rds_proxy_password_rotation.deadline import Deadline
 from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
 
 
 container = None
 
-@event_parser(model=AwsSecretManagerRotationEvent)
-def lambda_handler(event: AwsSecretManagerRotationEvent, context: LambdaContext) -> None:
+@profile_invocations
+@event_parser(model=AwsSecretManagerRotationEvent | FullRotationEvent)
+def lambda_handler(event: AwsSecretManagerRotationEvent | FullRotationEvent, context: LambdaContext) -> None:
     global container
 
     if container is None:
         container = Container()
         container.wire(modules=[__name__])
 
-    __call_application(event)
+    deadline = Deadline.from_remaining_milliseconds(context.get_remaining_time_in_millis(), container.config.handler.deadline_safety_margin())
+
+    try:
+        __call_application(event, deadline)
+    finally:
+        container.botocore_metrics().dump()
+        container.logger().info('rate limiter statistics', extra={'rate_limiter': container.rate_limiter().statistics(reset=True)})
+        container.logger().info('secret value cache statistics', extra={'secret_value_cache': container.secret_value_cache().statistics(reset=True)})
 
 @inject
-def __call_application(event: AwsSecretManagerRotationEvent, application: PasswordRotationApplication = Provide[Container.password_rotation_application]) -> None:
-    application.rotate_secret(event.step.to_rotation_step(), event.secret_id, event.client_request_token)
+def __call_application(event: AwsSecretManagerRotationEvent | FullRotationEvent, deadline: Deadline, application: PasswordRotationApplication = Provide[Container.password_rotation_application]) -> None:
+    if isinstance(event, FullRotationEvent):
+        application.rotate_secret_fully(event.secret_id, event.client_request_token, deadline)
+    else:
+        application.rotate_secret(event.step.to_rotation_step(), event.secret_id, event.client_request_token, deadline)
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Literal
 
 from pydantic import BaseModel, Field
 
@@ -41,3 +42,18 @@ class AwsSecretManagerRotationEvent(BaseModel):
 
     rotation_token: str = Field(alias='RotationToken')
     """A unique identifier that indicates the source of the request. Required for secret rotation using an assumed role or cross-account rotation, in which you rotate a secret in one account by using a Lambda rotation function in another account. In both cases, the rotation function assumes an IAM role to call Secrets Manager and then Secrets Manager uses the rotation token to validate the IAM role identity."""
+
+
+class FullRotationEvent(BaseModel):
+    """
+    Event of a schedule (e.g. EventBridge Scheduler) rotating a secret with all steps in one invocation.
+    """
+
+    rotation_mode: Literal['full'] = Field(alias='RotationMode')
+    """Has to be `full`. Distinguishes the event from the events of Secrets Manager."""
+
+    secret_id: str = Field(alias='SecretId')
+    """The ARN of the secret to rotate."""
+
+    client_request_token: str | None = Field(alias='ClientRequestToken', default=None)
+    """The version id of the new secret version. Pass the same token on retries to continue an interrupted rotation. Defaults to a random one."""
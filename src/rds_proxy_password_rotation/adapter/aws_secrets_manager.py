@@ -1,18 +1,105 @@
+from contextvars import ContextVar
+from typing import TypeVar, TYPE_CHECKING, Iterator
 from uuid import uuid4
 
 from aws_lambda_powertools import Logger
-from mypy_boto3_secretsmanager.client import SecretsManagerClient
-from mypy_boto3_secretsmanager.type_defs import DescribeSecretResponseTypeDef
 from pydantic import ValidationError
 
-from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, UserCredentials, Credentials
-from rds_proxy_password_rotation.services import PasswordService
+from rds_proxy_password_rotation.adapter.secret_value_cache import SecretValueCache
+from rds_proxy_password_rotation.adapter.stage_transition_planner import plan_stage_transition
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, UserCredentials, Credentials, PasswordType
+from rds_proxy_password_rotation.services import PasswordService, PasswordGenerator, EXCLUDED_PASSWORD_CHARACTERS
+
+if TYPE_CHECKING:
+    # the stubs are expensive to import and not needed at runtime
+    from mypy_boto3_secretsmanager.client import SecretsManagerClient
+    from mypy_boto3_secretsmanager.type_defs import DescribeSecretResponseTypeDef, GetSecretValueResponseTypeDef, SecretListEntryTypeDef
+
+T = TypeVar('T', bound=Credentials)
+
+
+def get_stage_string(stage: PasswordStage) -> str:
+    match stage:
+        case PasswordStage.CURRENT:
+            return "AWSCURRENT"
+        case PasswordStage.PENDING:
+            return "AWSPENDING"
+        case PasswordStage.PREVIOUS:
+            return "AWSPREVIOUS"
+        case _:
+            raise ValueError(f"Invalid stage: {stage}")
+
+
+def is_rotation_finished(versions: dict[str, list[str]], token: str) -> bool:
+    """
+    :return: True if the token is the current version and not staged as AWSPENDING anymore
+    """
+    return token in versions and "AWSCURRENT" in versions[token] and "AWSPENDING" not in versions[token]
+
+
+def check_secret_state(versions: dict[str, list[str]], secret_id: str, token: str, logger: Logger) -> bool:
+    """
+    :return: True if the token is the pending version, False if it is the current version already. A current version
+             still staged as AWSPENDING (finish_secret was interrupted) is pending, so finish_secret removes the stage.
+    :raises ValueError: if the token is neither the pending nor the current version
+    """
+    if token not in versions:
+        logger.error("Secret version %s has no stage for rotation of secret %s." % (token, secret_id))
+        raise ValueError("Secret version %s has no stage for rotation of secret %s." % (token, secret_id))
+    elif is_rotation_finished(versions, token):
+        logger.info("Secret version %s already set as AWSCURRENT for secret %s." % (token, secret_id))
+        return False
+    elif "AWSPENDING" not in versions[token]:
+        logger.error("Secret version %s not set as AWSPENDING for rotation of secret %s." % (token, secret_id))
+        raise ValueError("Secret version %s not set as AWSPENDING for rotation of secret %s." % (token, secret_id))
+    else:
+        return True
+
+
+def find_version(metadata: 'DescribeSecretResponseTypeDef', stage: PasswordStage, token: str | None) -> tuple[str, str] | None:
+    """
+    :return: ARN and version id of the version with the given stage (and token) or None if there is none
+    """
+    stage_string = get_stage_string(stage)
+
+    for version, stages in metadata['VersionIdsToStages'].items():
+        if stage_string in stages and (token is None or version == token):
+            return metadata['ARN'], version
+
+    return None
+
+
+class AwsSecretsManagerPasswordGenerator(PasswordGenerator):
+    """
+    Generates passwords using the get_random_password API, i.e. every password costs an API call.
+    """
+
+    def __init__(self, secretsmanager_client: 'SecretsManagerClient', length: int = 32, exclude_characters: str = EXCLUDED_PASSWORD_CHARACTERS):
+        self.client = secretsmanager_client
+        self.length = length
+        self.exclude_characters = exclude_characters
+
+    def generate_password(self) -> str:
+        return self.client.get_random_password(PasswordLength=self.length, ExcludeCharacters=self.exclude_characters)['RandomPassword']
 
 
 class AwsSecretsManagerService(PasswordService):
-    def __init__(self, secretsmanager_client: SecretsManagerClient, logger: Logger):
+    def __init__(self, secretsmanager_client: 'SecretsManagerClient', logger: Logger, secret_value_cache: SecretValueCache = None,
+                 password_generator: PasswordGenerator = None):
         self.client = secretsmanager_client
         self.logger = logger
+        self.password_generator = password_generator if password_generator is not None else AwsSecretsManagerPasswordGenerator(secretsmanager_client)
+        self.secret_value_cache = secret_value_cache if secret_value_cache is not None else SecretValueCache()
+
+        # secret id -> metadata, only populated within a request scope. A context variable keeps concurrent steps
+        # (threads, tasks) apart.
+        self.__metadata_snapshot: ContextVar[dict[str, 'DescribeSecretResponseTypeDef'] | None] = ContextVar('metadata_snapshot', default=None)
+
+    def begin_request_scope(self):
+        self.__metadata_snapshot.set({})
+
+    def end_request_scope(self):
+        self.__metadata_snapshot.set(None)
 
     def is_rotation_enabled(self, secret_id: str) -> bool:
         metadata = self.__get_secret_metadata(secret_id)
@@ -21,77 +108,64 @@ class AwsSecretsManagerService(PasswordService):
 
     def make_new_credentials_current(self, secret_id: str, token: str):
         metadata = self.__get_secret_metadata(secret_id)
-        versions = metadata['VersionIdsToStages']
 
-        current_version = None
-        previous_version = None
+        try:
+            stage_moves = plan_stage_transition(metadata['VersionIdsToStages'], token)
+        except ValueError as e:
+            self.logger.error(f'Failed to finish the rotation of secret {secret_id} to version {token}: {e}')
+
+            raise e
 
-        for version, stages in versions.items():
-            if "AWSCURRENT" in stages:
-                if version == token:
-                    self.logger.info(f'current secret is already the pending one: {secret_id} and version {version}')
-                    return
+        if not stage_moves:
+            self.logger.info(f'current secret is already the pending one: {secret_id} and version {token}')
+            return
 
-                current_version = version
-            elif "AWSPREVIOUS" in stages:
-                previous_version = version
+        # invalidate before the first write: the snapshot must not survive a partially failed stage transition
+        self.__invalidate_secret_metadata(secret_id)
 
-        if previous_version is not None:
-            self.client.update_secret_version_stage(
-                SecretId=secret_id,
-                VersionStage="AWSPREVIOUS",
-                MoveToVersionId=current_version,
-                RemoveFromVersionId=previous_version
-            )
-        else:
-            self.client.update_secret_version_stage(
-                SecretId=secret_id,
-                VersionStage="AWSPREVIOUS",
-                MoveToVersionId=current_version
-            )
+        for stage_move in stage_moves:
+            self.client.update_secret_version_stage(SecretId=secret_id, **stage_move.to_request())
 
-        self.client.update_secret_version_stage(
-            SecretId=secret_id,
-            VersionStage='AWSCURRENT',
-            MoveToVersionId=token,
-            RemoveFromVersionId=current_version)
+    def remove_pending_version(self, secret_id: str, token: str):
+        self.__invalidate_secret_metadata(secret_id)
+        self.client.update_secret_version_stage(SecretId=secret_id, VersionStage=get_stage_string(PasswordStage.PENDING), RemoveFromVersionId=token)
 
-        self.client.update_secret_version_stage(
-            SecretId=secret_id,
-            VersionStage='AWSPENDING',
-            RemoveFromVersionId=token)
+        self.logger.info(f'pending stage removed: {secret_id} and version {token}')
 
     def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
         metadata = self.__get_secret_metadata(secret_id)
-        versions = metadata['VersionIdsToStages']
-
-        if token not in versions:
-            self.logger.error("Secret version %s has no stage for rotation of secret %s." % (token, secret_id))
-            raise ValueError("Secret version %s has no stage for rotation of secret %s." % (token, secret_id))
-        elif "AWSCURRENT" in versions[token]:
-            self.logger.info("Secret version %s already set as AWSCURRENT for secret %s." % (token, secret_id))
-            return False
-        elif "AWSPENDING" not in versions[token]:
-            self.logger.error("Secret version %s not set as AWSPENDING for rotation of secret %s." % (token, secret_id))
-            raise ValueError("Secret version %s not set as AWSPENDING for rotation of secret %s." % (token, secret_id))
-        else:
-            return True
 
-    def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
-        try:
-            return DatabaseCredentials.model_validate_json(self.__get_secret_value(secret_id, stage, token))
-        except ValidationError as e:
-            self.logger.error(f"Failed to parse secret value for secret {secret_id} (stage: {stage.name}, token: {token})")
+        return check_secret_state(metadata['VersionIdsToStages'], secret_id, token, self.logger)
 
-            raise e
-        except self.client.exceptions.ResourceNotFoundException:
-            self.logger.error(f"Failed to retrieve secret value for secret {secret_id} (stage: {stage.name}, token: {token})")
+    def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        metadata = self.__get_secret_metadata(secret_id)
 
-        return None
+        return is_rotation_finished(metadata['VersionIdsToStages'], token)
+
+    def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        return self.__get_credentials(secret_id, stage, token, DatabaseCredentials)
 
     def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        return self.__get_credentials(secret_id, stage, token, UserCredentials)
+
+    def __get_credentials(self, secret_id: str, stage: PasswordStage, token: str | None, credentials_type: type[T]) -> T | None:
         try:
-            return UserCredentials.model_validate_json(self.__get_secret_value(secret_id, stage, token))
+            version = self.__find_version(secret_id, stage, token)
+
+            if version is not None:
+                credentials = self.secret_value_cache.get(version[0], version[1], credentials_type)
+
+                if credentials is not None:
+                    return credentials
+
+                secret = self.client.get_secret_value(SecretId=secret_id, VersionId=version[1])
+            else:
+                secret = self.__get_secret_value(secret_id, stage, token)
+
+            credentials = credentials_type.model_validate_json(secret['SecretString'])
+            self.secret_value_cache.put(secret['ARN'], secret['VersionId'], credentials)
+
+            return credentials
         except ValidationError as e:
             self.logger.error(f"Failed to parse secret value for secret {secret_id} (stage: {stage.name}, token: {token})")
 
@@ -101,28 +175,42 @@ class AwsSecretsManagerService(PasswordService):
 
         return None
 
-    def __get_secret_value(self, secret_id: str, stage: PasswordStage, token: str) -> str:
-        stage_string = AwsSecretsManagerService.__get_stage_string(stage)
+    def __find_version(self, secret_id: str, stage: PasswordStage, token: str | None) -> tuple[str, str] | None:
+        """
+        Resolves the stage (and token) to the ARN and version id of the secret using the metadata snapshot. Returns None
+        if the snapshot has no metadata of the secret (e.g. a proxy secret or outside of a request scope), as resolving
+        would cost an additional API call. The secret value is fetched by stage then.
+        """
+        snapshot = self.__metadata_snapshot.get()
+
+        if snapshot is None or secret_id not in snapshot:
+            return None
+
+        return find_version(snapshot[secret_id], stage, token)
+
+    def __get_secret_value(self, secret_id: str, stage: PasswordStage, token: str) -> 'GetSecretValueResponseTypeDef':
+        stage_string = get_stage_string(stage)
 
         if token is None:
-            secret = self.client.get_secret_value(SecretId=secret_id, VersionStage=stage_string)
+            return self.client.get_secret_value(SecretId=secret_id, VersionStage=stage_string)
         else:
-            secret = self.client.get_secret_value(SecretId=secret_id, VersionId=token, VersionStage=stage_string)
-
-        return secret['SecretString']
+            return self.client.get_secret_value(SecretId=secret_id, VersionId=token, VersionStage=stage_string)
 
     def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
         if token is None:
             token = str(uuid4())
 
         new_username = credential.get_next_username()
-        pending_credential = credential.model_copy(update={'username': new_username, 'password': self.client.get_random_password(ExcludeCharacters=':/@"\'\\')['RandomPassword']})
+        pending_credential = credential.model_copy(update={'username': new_username, 'password': self.password_generator.generate_password()})
 
-        self.client.put_secret_value(
+        response = self.client.put_secret_value(
                 SecretId=secret_id,
                 ClientRequestToken=token,
                 SecretString=pending_credential.model_dump_json(),
-                VersionStages=[AwsSecretsManagerService.__get_stage_string(PasswordStage.PENDING)])
+                VersionStages=[get_stage_string(PasswordStage.PENDING)])
+        self.__invalidate_secret_metadata(secret_id)
+        # the following steps read the pending credentials without fetching them again
+        self.secret_value_cache.put(response['ARN'], response['VersionId'], pending_credential)
 
         self.logger.info(f'new pending secret created: {secret_id} and version {token}')
 
@@ -134,21 +222,70 @@ class AwsSecretsManagerService(PasswordService):
             SecretId=secret_id,
             ClientRequestToken=token,
             SecretString=credentials.model_dump_json(),
-            VersionStages=[AwsSecretsManagerService.__get_stage_string(PasswordStage.CURRENT)])
+            VersionStages=[get_stage_string(PasswordStage.CURRENT)])
+        self.__invalidate_secret_metadata(secret_id)
 
         self.logger.info(f'credentials modified: {secret_id} and version {token}')
 
-    def __get_secret_metadata(self, secret_id: str) -> DescribeSecretResponseTypeDef:
-        return self.client.describe_secret(SecretId=secret_id)
-
-    @staticmethod
-    def __get_stage_string(stage: PasswordStage) -> str:
-        match stage:
-            case PasswordStage.CURRENT:
-                return "AWSCURRENT"
-            case PasswordStage.PENDING:
-                return "AWSPENDING"
-            case PasswordStage.PREVIOUS:
-                return "AWSPREVIOUS"
-            case _:
-                raise ValueError(f"Invalid stage: {stage}")
+    def list_secrets(self, name_prefix: str = None) -> Iterator['SecretListEntryTypeDef']:
+        """
+        Yields the metadata of all secrets (with a name starting with the prefix). The pages are fetched lazily, i.e.
+        only one page is kept in memory.
+        """
+        filters = [{'Key': 'name', 'Values': [name_prefix]}] if name_prefix else []
+        next_token = {}
+
+        # paged manually: the calls of a paginator would bypass the rate limiter of the client
+        while True:
+            page = self.client.list_secrets(Filters=filters, **next_token)
+
+            yield from page['SecretList']
+
+            if 'NextToken' not in page:
+                return
+
+            next_token = {'NextToken': page['NextToken']}
+
+    def list_secret_ids(self, name_prefix: str = None) -> Iterator[str]:
+        """
+        Yields the ARNs of all secrets (with a name starting with the prefix).
+        """
+        for secret in self.list_secrets(name_prefix):
+            yield secret['ARN']
+
+    def get_rotation_type(self, secret_id: str) -> PasswordType | None:
+        """
+        :return: the rotation type of the current version or None if the secret is not rotated by this project
+        """
+        try:
+            secret = self.client.get_secret_value(SecretId=secret_id, VersionStage=get_stage_string(PasswordStage.CURRENT))
+        except self.client.exceptions.ResourceNotFoundException:
+            return None
+
+        if 'SecretString' not in secret:
+            return None
+
+        try:
+            return Credentials.model_validate_json(secret['SecretString']).rotation_type
+        except ValidationError:
+            return None
+
+    def __get_secret_metadata(self, secret_id: str) -> 'DescribeSecretResponseTypeDef':
+        snapshot = self.__metadata_snapshot.get()
+
+        if snapshot is None:
+            return self.client.describe_secret(SecretId=secret_id)
+
+        if secret_id not in snapshot:
+            snapshot[secret_id] = self.client.describe_secret(SecretId=secret_id)
+
+        return snapshot[secret_id]
+
+    def __invalidate_secret_metadata(self, secret_id: str):
+        """
+        Has to be called for every write changing the stages of a secret as the snapshot is outdated afterwards.
+        """
+        snapshot = self.__metadata_snapshot.get()
+
+        if snapshot is not None:
+            snapshot.pop(secret_id, None)
@@ -0,0 +1,146 @@
+import math
+import time
+from threading import Lock
+from typing import Any
+
+from aws_lambda_powertools import Logger
+
+
+class LatencyHistogram:
+    """
+    Histogram with logarithmic buckets, i.e. the memory used does not depend on the number of samples. Percentiles are
+    reported as the upper bound of their bucket, which is at most 5% above the real value.
+    """
+
+    GROWTH_FACTOR = 1.05
+    SMALLEST_BUCKET_MILLISECONDS = 0.01
+
+    def __init__(self):
+        self.bucket_counts: dict[int, int] = {}
+        self.count = 0
+        self.max_milliseconds = 0.0
+
+    def record(self, milliseconds: float):
+        bucket = max(0, math.ceil(math.log(max(milliseconds, LatencyHistogram.SMALLEST_BUCKET_MILLISECONDS) / LatencyHistogram.SMALLEST_BUCKET_MILLISECONDS, LatencyHistogram.GROWTH_FACTOR)))
+
+        self.bucket_counts[bucket] = self.bucket_counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max_milliseconds = max(self.max_milliseconds, milliseconds)
+
+    def percentile(self, percent: float) -> float:
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+
+        for bucket in sorted(self.bucket_counts):
+            seen += self.bucket_counts[bucket]
+
+            if seen >= rank:
+                return min(self.max_milliseconds, LatencyHistogram.SMALLEST_BUCKET_MILLISECONDS * LatencyHistogram.GROWTH_FACTOR ** bucket)
+
+        return self.max_milliseconds
+
+
+class _OperationMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class BotocoreMetrics:
+    """
+    Collects latency histograms, errors and payload sizes per operation using the botocore event hooks of a client.
+    The latency covers everything botocore does for a call: signing, network and parsing. Compared to the application
+    timings, it shows whether time is spent in AWS or in our code.
+
+    botocore does not retry (the rate limiter does), so retries are counted by the `RateLimiter`.
+    """
+
+    def __init__(self, logger: Logger):
+        self.logger = logger
+
+        self.__lock = Lock()
+        self.__operations: dict[str, _OperationMetrics] = {}
+
+    def register(self, client: Any):
+        """
+        The handlers are registered for this client only, as every client has its own copy of the event system.
+        """
+        client.meta.events.register('before-call', self.__before_call)
+        client.meta.events.register('after-call', self.__after_call)
+        client.meta.events.register('after-call-error', self.__after_call_error)
+
+    def dump(self, reset: bool = True) -> dict[str, dict[str, float]]:
+        """
+        Logs the metrics collected since the last reset.
+
+        :param reset: starts collecting from scratch afterwards, e.g. to get the metrics per invocation
+        :return: the logged metrics by operation name
+        """
+        with self.__lock:
+            operations = self.__operations
+
+            if reset:
+                self.__operations = {}
+
+            summary = {name: {
+                'calls': metrics.latency.count,
+                'errors': metrics.errors,
+                'p50_ms': metrics.latency.percentile(50),
+                'p95_ms': metrics.latency.percentile(95),
+                'p99_ms': metrics.latency.percentile(99),
+                'max_ms': metrics.latency.max_milliseconds,
+                'request_bytes': metrics.request_bytes,
+                'response_bytes': metrics.response_bytes,
+            } for name, metrics in operations.items()}
+
+        if summary:
+            self.logger.info('botocore metrics', extra={'botocore_metrics': summary})
+
+        return summary
+
+    def __before_call(self, model: Any, params: dict, context: dict, **kwargs):
+        context['botocore_metrics_start'] = time.perf_counter()
+        context['botocore_metrics_operation'] = model.name
+        body = params.get('body')
+
+        if isinstance(body, (bytes, str)):
+            with self.__lock:
+                self.__get_operation(model.name).request_bytes += len(body)
+
+    def __after_call(self, http_response: Any, parsed: dict, model: Any, context: dict, **kwargs):
+        content_length = getattr(http_response, 'headers', {}).get('content-length')
+
+        with self.__lock:
+            operation = self.__get_operation(model.name)
+            operation.response_bytes += int(content_length) if content_length is not None else 0
+
+            if getattr(http_response, 'status_code', 200) >= 300:
+                operation.errors += 1
+
+            self.__record_latency(operation, context)
+
+    def __after_call_error(self, context: dict, **kwargs):
+        # botocore passes no model for failed calls
+        with self.__lock:
+            operation = self.__get_operation(context.get('botocore_metrics_operation', 'unknown'))
+            operation.errors += 1
+
+            self.__record_latency(operation, context)
+
+    def __get_operation(self, name: str) -> _OperationMetrics:
+        if name not in self.__operations:
+            self.__operations[name] = _OperationMetrics()
+
+        return self.__operations[name]
+
+    @staticmethod
+    def __record_latency(operation: _OperationMetrics, context: dict):
+        start = context.pop('botocore_metrics_start', None)
+
+        if start is not None:
+            operation.latency.record((time.perf_counter() - start) * 1000)
@@ -0,0 +1,115 @@
+import time
+from enum import Enum
+from threading import Lock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.services import Instrumentation, NoInstrumentation
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    """Connections are attempted"""
+    OPEN = "open"
+    """Connections fail fast"""
+    HALF_OPEN = "half_open"
+    """One connection is attempted to probe the endpoint, all others fail fast"""
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class _Circuit:
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+
+
+class DatabaseCircuitBreaker:
+    """
+    Tracks the connection failures per database endpoint (host and port). After a number of consecutive failures, the
+    circuit opens and connections to the endpoint fail fast instead of waiting for the connect timeout. After a
+    cooldown, one connection is attempted. It closes the circuit on success and opens it again on failure. A probe
+    without outcome after another cooldown (e.g. its caller failed with an unrelated error) counts as failed and the
+    next connection probes again.
+
+    The breaker is meant to live as long as the Lambda process and to be shared by all threads.
+    """
+
+    def __init__(self, logger: Logger, instrumentation: Instrumentation = None, failure_threshold: int = 3, cooldown: float = 30):
+        """
+        :param failure_threshold: consecutive connection failures opening the circuit
+        :param cooldown: seconds until an open circuit lets a probe through
+        """
+        self.logger = logger
+        self.instrumentation = instrumentation if instrumentation is not None else NoInstrumentation()
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.__lock = Lock()
+        self.__circuits: dict[tuple[str, int], _Circuit] = {}
+
+    def before_connect(self, host: str, port: int):
+        """
+        :raises CircuitOpenError: if the circuit of the endpoint is open or a probe is running already
+        """
+        with self.__lock:
+            circuit = self.__circuits.get((host, port))
+
+            if circuit is None or circuit.state == CircuitState.CLOSED:
+                return
+
+            now = time.monotonic()
+
+            if circuit.state == CircuitState.OPEN and now - circuit.opened_at >= self.cooldown:
+                circuit.probe_started_at = now
+                self.__change_state(host, port, circuit, CircuitState.HALF_OPEN)
+
+                return
+
+            if circuit.state == CircuitState.HALF_OPEN and now - circuit.probe_started_at >= self.cooldown:
+                circuit.consecutive_failures += 1
+                circuit.probe_started_at = now
+                self.logger.warning(f'probe of the circuit for database {host}:{port} has no outcome after {self.cooldown} seconds, probing again')
+
+                return
+
+        self.instrumentation.increment('DatabaseCircuitRejections', {'Endpoint': f'{host}:{port}'})
+
+        raise CircuitOpenError(f'circuit for database {host}:{port} is {circuit.state.value}, not connecting')
+
+    def record_success(self, host: str, port: int):
+        with self.__lock:
+            circuit = self.__circuits.get((host, port))
+
+            if circuit is None:
+                return
+
+            circuit.consecutive_failures = 0
+
+            if circuit.state != CircuitState.CLOSED:
+                self.__change_state(host, port, circuit, CircuitState.CLOSED)
+
+    def record_failure(self, host: str, port: int):
+        with self.__lock:
+            circuit = self.__circuits.setdefault((host, port), _Circuit())
+            circuit.consecutive_failures += 1
+
+            if circuit.state == CircuitState.HALF_OPEN or (circuit.state == CircuitState.CLOSED and circuit.consecutive_failures >= self.failure_threshold):
+                circuit.opened_at = time.monotonic()
+                self.__change_state(host, port, circuit, CircuitState.OPEN)
+
+    def get_state(self, host: str, port: int) -> CircuitState:
+        with self.__lock:
+            circuit = self.__circuits.get((host, port))
+
+            return circuit.state if circuit is not None else CircuitState.CLOSED
+
+    def __change_state(self, host: str, port: int, circuit: _Circuit, state: CircuitState):
+        self.logger.warning(f'circuit for database {host}:{port} changed from {circuit.state.value} to {state.value} after {circuit.consecutive_failures} consecutive connection failures')
+        self.instrumentation.increment('DatabaseCircuitStateChanges', {'Endpoint': f'{host}:{port}', 'State': state.value})
+
+        circuit.state = state
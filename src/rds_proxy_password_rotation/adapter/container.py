@@ -1,27 +1,189 @@
-import boto3
 from aws_lambda_powertools import Logger
 from dependency_injector import containers, providers
 
 from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.botocore_metrics import BotocoreMetrics
+from rds_proxy_password_rotation.adapter.circuit_breaker import DatabaseCircuitBreaker
+from rds_proxy_password_rotation.adapter.instrumentation import EmfInstrumentation, InstrumentedSecretsManagerClient
+from rds_proxy_password_rotation.adapter.postgresql_connection_cache import PostgreSqlConnectionCache
+from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+from rds_proxy_password_rotation.adapter.rate_limited_client import RateLimiter, RateLimitedSecretsManagerClient
+from rds_proxy_password_rotation.adapter.secret_value_cache import SecretValueCache
+from rds_proxy_password_rotation.local_password_generator import LocalPasswordGenerator
 from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
 
 
+def _create_secretsmanager_client(max_pool_connections: int, connect_timeout: float, read_timeout: float, tcp_keepalive: bool, max_attempts: int, retry_mode: str,
+                                  botocore_metrics: BotocoreMetrics = None):
+    """
+    boto3 is imported on first use as loading botocore and resolving the endpoint is expensive. Importing the container
+    must not pay for it.
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        tcp_keepalive=tcp_keepalive,
+        retries={
+            'max_attempts': max_attempts,
+            'mode': retry_mode,
+        },
+    )
+
+    client = boto3.client(service_name='secretsmanager', config=config)
+
+    if botocore_metrics is not None:
+        botocore_metrics.register(client)
+
+    return client
+
+
 class Container(containers.DeclarativeContainer):
-    config = providers.Configuration()
+    config = providers.Configuration(default={
+        'handler': {
+            # seconds of the Lambda timeout reserved to abort a step cleanly
+            'deadline_safety_margin': 2,
+        },
+        'secrets_manager': {
+            # enough connections for the concurrent proxy secret lookups
+            'max_pool_connections': 10,
+            'connect_timeout': 2,
+            'read_timeout': 5,
+            'tcp_keepalive': True,
+            # throttled calls are retried by the rate limiter, botocore retrying as well would multiply the attempts
+            'max_attempts': 1,
+            'retry_mode': 'standard',
+        },
+        'rate_limit': {
+            # calls per second, below the Secrets Manager quotas as other clients share them
+            'operations': {
+                'put_secret_value': 40,
+                'update_secret_version_stage': 40,
+                'list_secrets': 80,
+                'get_random_password': 40,
+            },
+            'max_retries': 5,
+            'base_delay': 0.1,
+            'max_delay': 5,
+        },
+        'metrics': {
+            'namespace': 'RdsProxyPasswordRotation',
+        },
+        'password': {
+            'length': 32,
+        },
+        'database': {
+            'max_idle_time': 300,
+            'health_check_after': 30,
+            'circuit_breaker': {
+                'failure_threshold': 3,
+                'cooldown': 30,
+            },
+        },
+    })
 
     logger = providers.Singleton(
         Logger,
     )
 
-    boto3_secrets_manager = boto3.client(service_name='secretsmanager')
+    instrumentation = providers.Singleton(
+        EmfInstrumentation,
+        logger=logger,
+        namespace=config.metrics.namespace,
+    )
+
+    # singleton: collects the metrics of all calls until they are dumped
+    botocore_metrics = providers.Singleton(
+        BotocoreMetrics,
+        logger=logger,
+    )
+
+    # singleton: the client (and its connection pool) is reused across warm invocations
+    boto3_secrets_manager = providers.Singleton(
+        _create_secretsmanager_client,
+        max_pool_connections=config.secrets_manager.max_pool_connections,
+        connect_timeout=config.secrets_manager.connect_timeout,
+        read_timeout=config.secrets_manager.read_timeout,
+        tcp_keepalive=config.secrets_manager.tcp_keepalive,
+        max_attempts=config.secrets_manager.max_attempts,
+        retry_mode=config.secrets_manager.retry_mode,
+        botocore_metrics=botocore_metrics,
+    )
+
+    # singleton: the limits are shared by all threads using the client
+    rate_limiter = providers.Singleton(
+        RateLimiter,
+        rate_limits=config.rate_limit.operations,
+        max_retries=config.rate_limit.max_retries,
+        base_delay=config.rate_limit.base_delay,
+        max_delay=config.rate_limit.max_delay,
+        instrumentation=instrumentation,
+    )
+
+    # measures every attempt, i.e. throttled calls are counted, waiting for the rate limiter is not
+    instrumented_secrets_manager = providers.Singleton(
+        InstrumentedSecretsManagerClient,
+        client=boto3_secrets_manager,
+        instrumentation=instrumentation,
+    )
+
+    rate_limited_secrets_manager = providers.Singleton(
+        RateLimitedSecretsManagerClient,
+        client=instrumented_secrets_manager,
+        rate_limiter=rate_limiter,
+    )
+
+    # generates the passwords locally to save an API call per rotation
+    password_generator = providers.Singleton(
+        LocalPasswordGenerator,
+        length=config.password.length,
+    )
+
+    # singleton: the secret values are reused across warm invocations
+    secret_value_cache = providers.Singleton(
+        SecretValueCache,
+    )
 
     secrets_manager = providers.Singleton(
         AwsSecretsManagerService,
-        boto3_secrets_manager=boto3_secrets_manager,
+        secretsmanager_client=rate_limited_secrets_manager,
+        logger=logger,
+        secret_value_cache=secret_value_cache,
+        password_generator=password_generator,
+    )
+
+    # singleton: the connections are reused across warm invocations
+    connection_cache = providers.Singleton(
+        PostgreSqlConnectionCache,
+        logger=logger,
+        max_idle_time=config.database.max_idle_time,
+        health_check_after=config.database.health_check_after,
+    )
+
+    # singleton: the circuits survive warm invocations and are shared by the threads of a fleet run
+    circuit_breaker = providers.Singleton(
+        DatabaseCircuitBreaker,
+        logger=logger,
+        instrumentation=instrumentation,
+        failure_threshold=config.database.circuit_breaker.failure_threshold,
+        cooldown=config.database.circuit_breaker.cooldown,
+    )
+
+    database_service = providers.Singleton(
+        PostgreSqlDatabaseService,
+        logger=logger,
+        connection_cache=connection_cache,
+        instrumentation=instrumentation,
+        circuit_breaker=circuit_breaker,
     )
 
     password_rotation_application = providers.Singleton(
         PasswordRotationApplication,
-        secrets_manager=secrets_manager,
+        password_service=secrets_manager,
+        database_service=database_service,
         logger=logger,
+        instrumentation=instrumentation,
     )
@@ -0,0 +1,76 @@
+import argparse
+import statistics
+import sys
+from itertools import chain
+
+from rds_proxy_password_rotation.adapter.container import Container
+from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+from rds_proxy_password_rotation.credential_drift_detector import CredentialDriftDetector
+from rds_proxy_password_rotation.deadline import Deadline
+
+
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Tests the credentials stored in the secrets against their databases. Prints one JSON line per check as soon as the checks of a secret are finished.')
+    parser.add_argument('secret_ids', nargs='*', help='ids or ARNs of the secrets to check')
+    parser.add_argument('--name-prefix', help='checks all secrets with a name starting with the prefix in addition to the given ones')
+    parser.add_argument('--max-workers', type=int, default=32, help='secrets checked concurrently (default: %(default)s)')
+    parser.add_argument('--max-concurrent-checks-per-host', type=int, default=4,
+                        help='logins at the same time on the same database host (default: %(default)s)')
+    parser.add_argument('--check-rotation-users', action='store_true', help='also tests the previous version if it belongs to another user of the rotation')
+    parser.add_argument('--check-proxy-secrets', action='store_true', help='also tests the proxy secrets against the database of the secret')
+    parser.add_argument('--failures-only', action='store_true', help='prints failed checks only')
+    parser.add_argument('--timeout', type=float, help='seconds until checks not started yet fail instead of being executed')
+
+    arguments = parser.parse_args(argv)
+
+    if not arguments.secret_ids and arguments.name_prefix is None:
+        parser.error('secret ids or --name-prefix required')
+
+    return arguments
+
+
+def main(argv: list[str] = None) -> int:
+    arguments = parse_arguments(argv)
+    deadline = Deadline(arguments.timeout) if arguments.timeout is not None else None
+
+    container = Container()
+    container.config.secrets_manager.max_pool_connections.from_value(arguments.max_workers + 8)
+
+    secrets_manager = container.secrets_manager()
+    # no connection cache: a reused connection does not prove that the password is still valid
+    database_service = PostgreSqlDatabaseService(container.logger(), instrumentation=container.instrumentation(), circuit_breaker=container.circuit_breaker())
+    detector = CredentialDriftDetector(secrets_manager, database_service, container.logger(), arguments.max_workers, arguments.max_concurrent_checks_per_host,
+                                       arguments.check_rotation_users, arguments.check_proxy_secrets)
+
+    secret_ids = arguments.secret_ids
+
+    if arguments.name_prefix is not None:
+        secret_ids = chain(secret_ids, secrets_manager.list_secret_ids(arguments.name_prefix))
+
+    failed = 0
+    connect_seconds = []
+
+    for result in detector.check_secrets(secret_ids, deadline):
+        if result.is_failed():
+            failed += 1
+        else:
+            connect_seconds.append(result.connect_seconds)
+
+        if result.is_failed() or not arguments.failures_only:
+            print(result.model_dump_json(), flush=True)
+
+    summary = f'{len(connect_seconds) + failed} credentials checked, {failed} failed'
+
+    if len(connect_seconds) >= 2:
+        quantiles = statistics.quantiles(connect_seconds, n=100)
+        summary += f', connect p50 {quantiles[49] * 1000:.1f} ms, p95 {quantiles[94] * 1000:.1f} ms'
+
+    print(summary, file=sys.stderr)
+    container.botocore_metrics().dump()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import sys
+from itertools import chain
+
+from rds_proxy_password_rotation.adapter.container import Container
+from rds_proxy_password_rotation.batching_database_service import BatchingDatabaseService
+from rds_proxy_password_rotation.fleet_rotation_runner import FleetRotationRunner
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+
+
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Rotates the passwords of many secrets from one process. Prints one JSON line per secret as soon as its rotation is finished.')
+    parser.add_argument('secret_ids', nargs='*', help='ids or ARNs of the secrets to rotate')
+    parser.add_argument('--name-prefix', help='rotates all secrets with a name starting with the prefix in addition to the given ones')
+    parser.add_argument('--max-workers', type=int, default=16, help='secrets rotated concurrently (default: %(default)s)')
+    parser.add_argument('--max-concurrent-rotations-per-host', type=int, default=2,
+                        help='secrets rotated concurrently on the same database host (default: %(default)s)')
+    parser.add_argument('--password-change-batch-window', type=float, default=0,
+                        help='seconds to collect password changes in the same database to apply them over one connection, 0 to disable. Every password change '
+                             'waits for the window. A batch holds --max-concurrent-rotations-per-host changes at most. The connection is opened by the first '
+                             'user of a batch, which needs CREATEROLE to change the other passwords (default: %(default)s)')
+    parser.add_argument('--single-invocation', action='store_true',
+                        help='executes all steps of a secret in one go sharing the metadata and credentials read by the steps')
+
+    arguments = parser.parse_args(argv)
+
+    if not arguments.secret_ids and arguments.name_prefix is None:
+        parser.error('secret ids or --name-prefix required')
+
+    return arguments
+
+
+def main(argv: list[str] = None) -> int:
+    arguments = parse_arguments(argv)
+
+    container = Container()
+    # every worker needs a connection for its own calls and the proxy secret lookups
+    container.config.secrets_manager.max_pool_connections.from_value(2 * arguments.max_workers + 8)
+
+    secrets_manager = container.secrets_manager()
+    database_service = container.database_service()
+
+    if arguments.password_change_batch_window > 0:
+        database_service = BatchingDatabaseService(database_service, arguments.password_change_batch_window)
+
+    secret_ids = arguments.secret_ids
+
+    if arguments.name_prefix is not None:
+        secret_ids = chain(secret_ids, secrets_manager.list_secret_ids(arguments.name_prefix))
+
+    failed = 0
+    total = 0
+
+    with PasswordRotationApplication(
+            password_service=secrets_manager,
+            database_service=database_service,
+            logger=container.logger(),
+            max_workers=2 * arguments.max_workers + 8,
+            instrumentation=container.instrumentation()) as application:
+        runner = FleetRotationRunner(application, secrets_manager, container.logger(), arguments.max_workers, arguments.max_concurrent_rotations_per_host,
+                                     arguments.single_invocation)
+
+        for outcome in runner.rotate_secrets(secret_ids):
+            total += 1
+            failed += 1 if outcome.is_failed() else 0
+
+            print(outcome.model_dump_json(), flush=True)
+
+    print(f'{total} secrets processed, {failed} failed', file=sys.stderr)
+    container.botocore_metrics().dump()
+    container.logger().info('rate limiter statistics', extra={'rate_limiter': container.rate_limiter().statistics()})
+    container.logger().info('secret value cache statistics', extra={'secret_value_cache': container.secret_value_cache().statistics()})
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
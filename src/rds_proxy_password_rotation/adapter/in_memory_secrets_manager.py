@@ -0,0 +1,293 @@
+import random
+import secrets
+import string
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Iterator
+from uuid import uuid4
+
+
+class InMemoryClientError(Exception):
+    """
+    Mimics botocore's ClientError, i.e. the error code is found in `response['Error']['Code']`.
+    """
+
+    def __init__(self, operation_name: str, message: str):
+        super().__init__(f'An error occurred ({type(self).__name__}) when calling the {operation_name} operation: {message}')
+        self.operation_name = operation_name
+        self.response = {'Error': {'Code': type(self).__name__, 'Message': message}}
+
+
+class ResourceNotFoundException(InMemoryClientError):
+    pass
+
+
+class ResourceExistsException(InMemoryClientError):
+    pass
+
+
+class InvalidParameterException(InMemoryClientError):
+    pass
+
+
+class ThrottlingException(InMemoryClientError):
+    pass
+
+
+class _Secret:
+    def __init__(self, name: str, arn: str, rotation_enabled: bool):
+        self.name = name
+        self.arn = arn
+        self.rotation_enabled = rotation_enabled
+        self.last_rotated_date: datetime | None = None
+        # version id -> (secret string, stages)
+        self.versions: dict[str, tuple[str, list[str]]] = {}
+
+
+class _ListSecretsPaginator:
+    def __init__(self, client: 'InMemorySecretsManagerClient'):
+        self.client = client
+
+    def paginate(self, **kwargs) -> Iterator[dict]:
+        next_token = None
+
+        while True:
+            page = self.client.list_secrets(**kwargs, **({'NextToken': next_token} if next_token is not None else {}))
+
+            yield page
+
+            next_token = page.get('NextToken')
+
+            if next_token is None:
+                return
+
+
+class InMemorySecretsManagerClient:
+    """
+    In-process stand-in for the boto3 Secrets Manager client implementing the operations used by this project. Versions
+    and stages behave like in Secrets Manager, e.g. moving AWSCURRENT moves AWSPREVIOUS to the old current version.
+
+    Every operation can be slowed down and made to fail with a ThrottlingException at a given rate. The random numbers
+    are seeded, i.e. a run is reproducible. Calls are counted per operation to assert API call budgets.
+    """
+
+    class exceptions:
+        ResourceNotFoundException = ResourceNotFoundException
+        ResourceExistsException = ResourceExistsException
+        InvalidParameterException = InvalidParameterException
+        ThrottlingException = ThrottlingException
+
+    ARN_PREFIX = 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:'
+
+    def __init__(self, latency: dict[str, float] = None, throttling_rates: dict[str, float] = None, seed: int = 0, page_size: int = 100):
+        """
+        :param latency: seconds added to every call by operation name, e.g. `get_secret_value`. The key `*` applies to
+                        all operations without their own entry.
+        :param throttling_rates: fraction of calls failing with a ThrottlingException by operation name, `*` as above
+        :param seed: of the random numbers deciding which calls are throttled
+        :param page_size: secrets per list_secrets page unless the caller asks for less
+        """
+        self.latency = latency or {}
+        self.throttling_rates = throttling_rates or {}
+        self.page_size = page_size
+        self.call_counts: Counter[str] = Counter()
+        self.throttled_counts: Counter[str] = Counter()
+
+        self.__lock = Lock()
+        self.__random = random.Random(seed)
+        self.__secrets: dict[str, _Secret] = {}
+
+    def add_secret(self, name: str, secret_string: str, rotation_enabled: bool = True) -> str:
+        """
+        Test setup, not counted as a call.
+
+        :return: the ARN of the secret
+        """
+        with self.__lock:
+            secret = _Secret(name, f'{InMemorySecretsManagerClient.ARN_PREFIX}{name}', rotation_enabled)
+            secret.versions[str(uuid4())] = (secret_string, ['AWSCURRENT'])
+            self.__secrets[name] = secret
+
+            return secret.arn
+
+    def get_stages(self, secret_id: str) -> dict[str, list[str]]:
+        """
+        Test assertions, not counted as a call.
+        """
+        with self.__lock:
+            return {version: list(stages) for version, (_, stages) in self.__get_secret('get_stages', secret_id).versions.items()}
+
+    def reset_call_counts(self):
+        with self.__lock:
+            self.call_counts.clear()
+            self.throttled_counts.clear()
+
+    def describe_secret(self, SecretId: str) -> dict:
+        with self.__call('describe_secret'):
+            secret = self.__get_secret('DescribeSecret', SecretId)
+
+            response = {
+                'ARN': secret.arn,
+                'Name': secret.name,
+                'RotationEnabled': secret.rotation_enabled,
+                'VersionIdsToStages': {version: list(stages) for version, (_, stages) in secret.versions.items()},
+            }
+
+            if secret.last_rotated_date is not None:
+                response['LastRotatedDate'] = secret.last_rotated_date
+
+            return response
+
+    def get_secret_value(self, SecretId: str, VersionId: str = None, VersionStage: str = None) -> dict:
+        with self.__call('get_secret_value'):
+            secret = self.__get_secret('GetSecretValue', SecretId)
+
+            if VersionId is None and VersionStage is None:
+                VersionStage = 'AWSCURRENT'
+
+            for version, (secret_string, stages) in secret.versions.items():
+                if (VersionId is None or version == VersionId) and (VersionStage is None or VersionStage in stages):
+                    return {
+                        'ARN': secret.arn,
+                        'Name': secret.name,
+                        'VersionId': version,
+                        'SecretString': secret_string,
+                        'VersionStages': list(stages),
+                    }
+
+            raise ResourceNotFoundException('GetSecretValue', f'version {VersionId} / stage {VersionStage} of secret {SecretId} not found')
+
+    def put_secret_value(self, SecretId: str, ClientRequestToken: str, SecretString: str, VersionStages: list[str] = None) -> dict:
+        with self.__call('put_secret_value'):
+            secret = self.__get_secret('PutSecretValue', SecretId)
+            stages = VersionStages if VersionStages is not None else ['AWSCURRENT']
+
+            if ClientRequestToken in secret.versions:
+                # idempotent retry of the same request
+                if secret.versions[ClientRequestToken][0] != SecretString:
+                    raise ResourceExistsException('PutSecretValue', f'version {ClientRequestToken} of secret {SecretId} exists with a different value')
+
+                return {'ARN': secret.arn, 'Name': secret.name, 'VersionId': ClientRequestToken, 'VersionStages': list(secret.versions[ClientRequestToken][1])}
+
+            previous_current = self.__find_version(secret, 'AWSCURRENT') if 'AWSCURRENT' in stages else None
+
+            for stage in stages:
+                InMemorySecretsManagerClient.__remove_stage(secret, stage)
+
+            secret.versions[ClientRequestToken] = (SecretString, list(stages))
+
+            if previous_current is not None:
+                self.__move_stage(secret, 'AWSPREVIOUS', previous_current)
+
+            return {'ARN': secret.arn, 'Name': secret.name, 'VersionId': ClientRequestToken, 'VersionStages': list(stages)}
+
+    def update_secret_version_stage(self, SecretId: str, VersionStage: str, MoveToVersionId: str = None, RemoveFromVersionId: str = None) -> dict:
+        with self.__call('update_secret_version_stage'):
+            secret = self.__get_secret('UpdateSecretVersionStage', SecretId)
+            current_holder = self.__find_version(secret, VersionStage)
+
+            for version_id in (MoveToVersionId, RemoveFromVersionId):
+                if version_id is not None and version_id not in secret.versions:
+                    raise ResourceNotFoundException('UpdateSecretVersionStage', f'version {version_id} of secret {SecretId} not found')
+
+            if MoveToVersionId is not None and current_holder is not None and current_holder != MoveToVersionId and current_holder != RemoveFromVersionId:
+                raise InvalidParameterException('UpdateSecretVersionStage', f'stage {VersionStage} is attached to version {current_holder}, not to {RemoveFromVersionId}')
+
+            if RemoveFromVersionId is not None:
+                secret_string, stages = secret.versions[RemoveFromVersionId]
+                secret.versions[RemoveFromVersionId] = (secret_string, [stage for stage in stages if stage != VersionStage])
+
+            if MoveToVersionId is not None:
+                self.__move_stage(secret, VersionStage, MoveToVersionId)
+
+                if VersionStage == 'AWSCURRENT' and current_holder is not None and current_holder != MoveToVersionId:
+                    self.__move_stage(secret, 'AWSPREVIOUS', current_holder)
+                    secret.last_rotated_date = datetime.now(timezone.utc)
+
+            return {'ARN': secret.arn, 'Name': secret.name}
+
+    def list_secrets(self, Filters: list[dict] = None, MaxResults: int = None, NextToken: str = None) -> dict:
+        with self.__call('list_secrets'):
+            prefixes = [value for secret_filter in Filters or [] if secret_filter['Key'] == 'name' for value in secret_filter['Values']]
+            names = sorted(name for name in self.__secrets if not prefixes or any(name.startswith(prefix) for prefix in prefixes))
+
+            start = int(NextToken) if NextToken is not None else 0
+            end = start + min(MaxResults or self.page_size, self.page_size)
+
+            page = {'SecretList': [{
+                'ARN': self.__secrets[name].arn,
+                'Name': name,
+                'RotationEnabled': self.__secrets[name].rotation_enabled,
+                'SecretVersionsToStages': {version: list(stages) for version, (_, stages) in self.__secrets[name].versions.items()},
+                **({'LastRotatedDate': self.__secrets[name].last_rotated_date} if self.__secrets[name].last_rotated_date is not None else {}),
+            } for name in names[start:end]]}
+
+            if end < len(names):
+                page['NextToken'] = str(end)
+
+            return page
+
+    def get_paginator(self, operation_name: str) -> _ListSecretsPaginator:
+        if operation_name != 'list_secrets':
+            raise NotImplementedError(f'no paginator for {operation_name}')
+
+        return _ListSecretsPaginator(self)
+
+    def get_random_password(self, PasswordLength: int = 32, ExcludeCharacters: str = '') -> dict:
+        with self.__call('get_random_password'):
+            alphabet = [c for c in string.ascii_letters + string.digits + string.punctuation if c not in ExcludeCharacters]
+
+            return {'RandomPassword': ''.join(secrets.choice(alphabet) for _ in range(PasswordLength))}
+
+    def __call(self, operation: str) -> Any:
+        """
+        Counts the call, waits for the configured latency and decides whether the call is throttled. The returned
+        context manager holds the lock, i.e. the operations are atomic.
+        """
+        with self.__lock:
+            self.call_counts[operation] += 1
+            throttled = self.__random.random() < self.throttling_rates.get(operation, self.throttling_rates.get('*', 0.0))
+
+            if throttled:
+                self.throttled_counts[operation] += 1
+
+        latency = self.latency.get(operation, self.latency.get('*', 0.0))
+
+        if latency > 0:
+            time.sleep(latency)
+
+        if throttled:
+            raise ThrottlingException(operation, 'Rate exceeded')
+
+        return self.__lock
+
+    def __get_secret(self, operation_name: str, secret_id: str) -> _Secret:
+        name = secret_id.removeprefix(InMemorySecretsManagerClient.ARN_PREFIX)
+
+        if name not in self.__secrets:
+            raise ResourceNotFoundException(operation_name, f'secret {secret_id} not found')
+
+        return self.__secrets[name]
+
+    @staticmethod
+    def __find_version(secret: _Secret, stage: str) -> str | None:
+        for version, (_, stages) in secret.versions.items():
+            if stage in stages:
+                return version
+
+        return None
+
+    @staticmethod
+    def __move_stage(secret: _Secret, stage: str, version_id: str):
+        InMemorySecretsManagerClient.__remove_stage(secret, stage)
+
+        secret_string, stages = secret.versions[version_id]
+        secret.versions[version_id] = (secret_string, stages + [stage])
+
+    @staticmethod
+    def __remove_stage(secret: _Secret, stage: str):
+        for version, (secret_string, stages) in secret.versions.items():
+            if stage in stages:
+                secret.versions[version] = (secret_string, [s for s in stages if s != stage])
@@ -0,0 +1,132 @@
+import time
+from threading import Lock
+from typing import Any, Callable
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.services import Instrumentation
+
+
+class EmfInstrumentation(Instrumentation):
+    """
+    Buffers the metrics and writes them as CloudWatch Embedded Metric Format via the logger, i.e. CloudWatch extracts
+    the metrics from the Lambda logs. One log line is written per set of dimensions.
+    """
+
+    def __init__(self, logger: Logger, namespace: str = 'RdsProxyPasswordRotation'):
+        self.logger = logger
+        self.namespace = namespace
+
+        self.__lock = Lock()
+        # dimensions -> metric name -> values (durations in milliseconds) or count
+        self.__durations: dict[tuple[tuple[str, str], ...], dict[str, list[float]]] = {}
+        self.__counts: dict[tuple[tuple[str, str], ...], dict[str, int]] = {}
+
+    def record_duration(self, name: str, seconds: float, dimensions: dict[str, str] = None):
+        with self.__lock:
+            self.__durations.setdefault(EmfInstrumentation.__get_key(dimensions), {}).setdefault(name, []).append(seconds * 1000)
+
+    def increment(self, name: str, dimensions: dict[str, str] = None):
+        with self.__lock:
+            counts = self.__counts.setdefault(EmfInstrumentation.__get_key(dimensions), {})
+            counts[name] = counts.get(name, 0) + 1
+
+    def flush(self):
+        with self.__lock:
+            durations, self.__durations = self.__durations, {}
+            counts, self.__counts = self.__counts, {}
+
+        timestamp = int(time.time() * 1000)
+
+        for key in durations.keys() | counts.keys():
+            metrics = [{'Name': name, 'Unit': 'Milliseconds'} for name in durations.get(key, {})]
+            metrics += [{'Name': name, 'Unit': 'Count'} for name in counts.get(key, {})]
+
+            self.logger.info('metrics', extra={
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [[name for name, _ in key]],
+                        'Metrics': metrics,
+                    }],
+                },
+                **dict(key),
+                **durations.get(key, {}),
+                **counts.get(key, {}),
+            })
+
+    @staticmethod
+    def __get_key(dimensions: dict[str, str] | None) -> tuple[tuple[str, str], ...]:
+        return tuple(sorted((dimensions or {}).items()))
+
+
+class HookInstrumentation(Instrumentation):
+    """
+    Passes every metric to the given callables, e.g. to record them with OpenTelemetry instruments:
+
+        HookInstrumentation(
+            on_duration=lambda name, seconds, attributes: histogram.record(seconds, {'name': name, **attributes}),
+            on_increment=lambda name, attributes: counter.add(1, {'name': name, **attributes}))
+    """
+
+    def __init__(self, on_duration: Callable[[str, float, dict[str, str]], None], on_increment: Callable[[str, dict[str, str]], None] = None):
+        self.on_duration = on_duration
+        self.on_increment = on_increment
+
+    def record_duration(self, name: str, seconds: float, dimensions: dict[str, str] = None):
+        self.on_duration(name, seconds, dimensions or {})
+
+    def increment(self, name: str, dimensions: dict[str, str] = None):
+        if self.on_increment is not None:
+            self.on_increment(name, dimensions or {})
+
+
+class InstrumentedSecretsManagerClient:
+    """
+    Wraps a boto3 client. Counts and measures every API call by operation name.
+    """
+
+    def __init__(self, client: Any, instrumentation: Instrumentation):
+        self.client = client
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.client, name)
+
+        if name.startswith('_') or name in ('exceptions', 'meta', 'get_paginator', 'can_paginate') or not callable(attribute):
+            return attribute
+
+        def call(**kwargs):
+            dimensions = {'Operation': name}
+            self.instrumentation.increment('SecretsManagerCalls', dimensions)
+
+            with self.instrumentation.measure('SecretsManagerCallDuration', dimensions):
+                return attribute(**kwargs)
+
+        return call
+
+
+class AsyncInstrumentedSecretsManagerClient:
+    """
+    Async counterpart of `InstrumentedSecretsManagerClient` for aiobotocore style clients.
+    """
+
+    def __init__(self, client: Any, instrumentation: Instrumentation):
+        self.client = client
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.client, name)
+
+        if name.startswith('_') or name in ('exceptions', 'meta', 'get_paginator', 'can_paginate') or not callable(attribute):
+            return attribute
+
+        async def call(**kwargs):
+            dimensions = {'Operation': name}
+            self.instrumentation.increment('SecretsManagerCalls', dimensions)
+
+            with self.instrumentation.measure('SecretsManagerCallDuration', dimensions):
+                return await attribute(**kwargs)
+
+        return call
@@ -0,0 +1,134 @@
+import hashlib
+import hmac
+import time
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.model import DatabaseCredentials
+
+if TYPE_CHECKING:
+    from psycopg import Connection
+
+
+class _CachedConnection:
+    def __init__(self, connection: 'Connection', password_digest: bytes, released_at: float):
+        self.connection = connection
+        self.password_digest = password_digest
+        self.released_at = released_at
+
+
+class PostgreSqlConnectionCache:
+    """
+    Keeps idle connections keyed by host, port, database and user. The cache is meant to live as long as the Lambda
+    process, i.e. connections survive warm invocations.
+
+    A connection is removed from the cache while it is in use, so it is never shared between threads. It is only handed
+    out for the password it was opened with, i.e. a cached connection proves that the credentials were valid when it
+    was opened. Connections of a user have to be invalidated when the password of that user changes.
+    """
+
+    def __init__(self, logger: Logger, max_idle_time: float = 300, health_check_after: float = 30):
+        """
+        :param max_idle_time: seconds after which an idle connection is closed instead of being reused
+        :param health_check_after: seconds of idle time after which a connection is checked with a query before reuse
+        """
+        self.logger = logger
+        self.max_idle_time = max_idle_time
+        self.health_check_after = health_check_after
+
+        self.__lock = Lock()
+        self.__connections: dict[tuple[str, int, str, str], _CachedConnection] = {}
+
+    def acquire(self, credentials: DatabaseCredentials) -> 'Connection | None':
+        """
+        :return: a healthy connection for the credentials or None if there is none
+        """
+        with self.__lock:
+            cached = self.__connections.pop(PostgreSqlConnectionCache.__get_key(credentials), None)
+
+        if cached is None:
+            return None
+
+        idle_time = time.monotonic() - cached.released_at
+
+        if not hmac.compare_digest(cached.password_digest, PostgreSqlConnectionCache.__get_password_digest(credentials.password)):
+            self.logger.info(f'cached connection for {credentials.username} was opened with a different password. Closing it.')
+            cached.connection.close()
+
+            return None
+
+        if idle_time > self.max_idle_time or cached.connection.closed or cached.connection.broken:
+            cached.connection.close()
+
+            return None
+
+        if idle_time > self.health_check_after and not PostgreSqlConnectionCache.__is_healthy(cached.connection):
+            self.logger.info(f'cached connection for {credentials.username} failed the health check. Closing it.')
+            cached.connection.close()
+
+            return None
+
+        return cached.connection
+
+    def release(self, credentials: DatabaseCredentials, connection: 'Connection'):
+        """
+        Puts the connection back into the cache. Closes it if it is not reusable.
+        """
+        if connection.closed or connection.broken:
+            return
+
+        try:
+            # never hand out a connection with an open transaction
+            connection.rollback()
+        except Exception:
+            connection.close()
+
+            return
+
+        with self.__lock:
+            replaced = self.__connections.pop(PostgreSqlConnectionCache.__get_key(credentials), None)
+            self.__connections[PostgreSqlConnectionCache.__get_key(credentials)] = _CachedConnection(
+                connection, PostgreSqlConnectionCache.__get_password_digest(credentials.password), time.monotonic())
+
+        if replaced is not None:
+            replaced.connection.close()
+
+    def invalidate(self, credentials: DatabaseCredentials):
+        """
+        Closes the cached connection of the user. Has to be called after changing the password of the user.
+        """
+        with self.__lock:
+            cached = self.__connections.pop(PostgreSqlConnectionCache.__get_key(credentials), None)
+
+        if cached is not None:
+            cached.connection.close()
+
+    def close_all(self):
+        with self.__lock:
+            cached_connections = list(self.__connections.values())
+            self.__connections.clear()
+
+        for cached in cached_connections:
+            cached.connection.close()
+
+    @staticmethod
+    def __is_healthy(connection: 'Connection') -> bool:
+        try:
+            with connection.cursor() as cur:
+                cur.execute("SELECT 1")
+
+            connection.rollback()
+
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def __get_key(credentials: DatabaseCredentials) -> tuple[str, int, str, str]:
+        return credentials.database_host, credentials.database_port, credentials.database_name, credentials.username
+
+    @staticmethod
+    def __get_password_digest(password: str) -> bytes:
+        return hashlib.sha256(password.encode('utf-8')).digest()
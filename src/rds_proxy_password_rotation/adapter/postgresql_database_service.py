@@ -1,39 +1,227 @@
-import psycopg
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
 from aws_lambda_powertools import Logger
-from psycopg import Connection, sql, ClientCursor
 
+from rds_proxy_password_rotation.adapter.circuit_breaker import DatabaseCircuitBreaker
+from rds_proxy_password_rotation.adapter.postgresql_connection_cache import PostgreSqlConnectionCache
+from rds_proxy_password_rotation.deadline import get_current_deadline
 from rds_proxy_password_rotation.model import DatabaseCredentials
-from rds_proxy_password_rotation.services import DatabaseService
+from rds_proxy_password_rotation.services import DatabaseService, Instrumentation, NoInstrumentation
+
+if TYPE_CHECKING:
+    from psycopg import Connection
+
+
+CONNECT_TIMEOUT = 5
+"""Seconds, used if there is no deadline or it is further away"""
+
+SET_LOCAL_TIMEOUTS = "SELECT set_config('statement_timeout', %s, true), set_config('lock_timeout', %s, true)"
+"""Limits the statements of the current transaction only"""
+
+
+def get_connect_string(credentials: DatabaseCredentials, connect_timeout: int = CONNECT_TIMEOUT) -> str:
+    from psycopg.conninfo import make_conninfo
+
+    return make_conninfo("", password=credentials.password, user=credentials.username, host=credentials.database_host, port=credentials.database_port, dbname=credentials.database_name, sslmode="require", connect_timeout=connect_timeout)
+
+
+def get_connect_timeout() -> int:
+    """
+    :return: the connect timeout in seconds derived from the deadline of the current step
+    :raises DeadlineExceededError: if less than 2 seconds are left, the minimum timeout of libpq
+    """
+    deadline = get_current_deadline()
+
+    if deadline is None:
+        return CONNECT_TIMEOUT
+
+    return int(deadline.timeout('connect to database', maximum=CONNECT_TIMEOUT, minimum=2))
+
+
+def get_statement_timeout(operation: str) -> str | None:
+    """
+    :return: the statement and lock timeout derived from the deadline of the current step or None if there is no
+             deadline. Half of the remaining time is left to update the secrets after the statement.
+    """
+    deadline = get_current_deadline()
+
+    if deadline is None:
+        return None
+
+    return f'{max(1, int(deadline.timeout(operation, maximum=float("inf")) * 500))}ms'
+
+
+def record_connect_error(circuit_breaker: DatabaseCircuitBreaker | None, credentials: DatabaseCredentials, error: Exception):
+    """
+    Errors with an SQLSTATE were sent by the server, e.g. a wrong password, i.e. the endpoint is reachable.
+    """
+    if circuit_breaker is None:
+        return
+
+    if getattr(error, 'sqlstate', None) is not None:
+        circuit_breaker.record_success(credentials.database_host, credentials.database_port)
+    else:
+        circuit_breaker.record_failure(credentials.database_host, credentials.database_port)
 
 
 class PostgreSqlDatabaseService(DatabaseService):
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, connection_cache: PostgreSqlConnectionCache = None, instrumentation: Instrumentation = None,
+                 circuit_breaker: DatabaseCircuitBreaker = None):
         self.logger = logger
+        self.connection_cache = connection_cache
+        self.instrumentation = instrumentation if instrumentation is not None else NoInstrumentation()
+        self.circuit_breaker = circuit_breaker
 
     def test_user_credentials(self, credentials: DatabaseCredentials) -> bool:
-        with self._get_connection(credentials) as conn:
-            with conn.cursor() as cur:
+        """
+        Always logs in with the credentials, a cached connection does not prove that they are still valid. The new
+        connection is cached for the next password change of the user.
+        """
+        with self.__connection(credentials, cached=False) as conn:
+            with conn.cursor() as cur, self.instrumentation.measure('DatabaseQueryDuration', {'Operation': 'test_user_credentials'}):
                 cur.execute("SELECT 1")
 
                 return True
 
     def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
-        with self._get_connection(old_credentials) as conn:
-            with ClientCursor(conn) as cur:
+        from psycopg import sql, ClientCursor
+
+        # the session was authenticated with the old password, so it must not be reused for the new one
+        with self.__connection(old_credentials, reusable=False) as conn:
+            with ClientCursor(conn) as cur, self.instrumentation.measure('DatabaseQueryDuration', {'Operation': 'change_user_credentials'}):
+                statement_timeout = get_statement_timeout('change_user_credentials')
+
+                # a blocked ALTER USER must not run into the Lambda timeout
+                if statement_timeout is not None:
+                    cur.execute(SET_LOCAL_TIMEOUTS, (statement_timeout, statement_timeout))
+
                 cur.execute(sql.SQL("ALTER USER {} WITH PASSWORD %s").format(sql.Identifier(old_credentials.username)), (new_password,))
                 conn.commit()
 
-    def _get_connection(self, credentials: DatabaseCredentials) -> Connection:
+        if self.connection_cache is not None:
+            self.connection_cache.invalidate(old_credentials)
+
+    def change_users_credentials(self, changes: list[tuple[DatabaseCredentials, str]]) -> list[Exception | None]:
+        """
+        Applies the changes of users in the same database in one transaction over one connection, authenticated as the
+        first user of the database. Every change runs in its own savepoint, so a failing change does not affect the
+        others.
+
+        The first user needs the CREATEROLE attribute to change the passwords of the other users. Changes the connected
+        user is not privileged to do are retried over a connection of their own user. If the transaction fails as a
+        whole, e.g. the first user cannot log in, all changes of the database are retried that way.
         """
-        Method is protected to allow testing.
+        import psycopg
+
+        results: list[Exception | None] = [None] * len(changes)
+        changes_by_database: dict[tuple[str, int, str], list[int]] = {}
+
+        for index, (old_credentials, _) in enumerate(changes):
+            changes_by_database.setdefault((old_credentials.database_host, old_credentials.database_port, old_credentials.database_name), []).append(index)
+
+        for indices in changes_by_database.values():
+            transaction_failed = False
+
+            try:
+                self.__change_users_credentials_in_transaction(changes, indices, results)
+            except Exception as e:
+                self.logger.warning(f'Failed to change the passwords of {len(indices)} users on {changes[indices[0]][0].database_host}:{changes[indices[0]][0].database_port} '
+                                    f'in one transaction ({e}). Changing them one by one.')
+                transaction_failed = True
+
+            for index in indices:
+                if transaction_failed or isinstance(results[index], psycopg.errors.InsufficientPrivilege):
+                    results[index] = self.__change_user_credentials_or_error(*changes[index])
+
+                if self.connection_cache is not None:
+                    self.connection_cache.invalidate(changes[index][0])
+
+        return results
+
+    def __change_users_credentials_in_transaction(self, changes: list[tuple[DatabaseCredentials, str]], indices: list[int], results: list[Exception | None]):
+        import psycopg
+        from psycopg import sql, ClientCursor
+
+        # the session is authenticated with the old password of the first user, so it must not be reused
+        with self.__connection(changes[indices[0]][0], reusable=False) as conn:
+            with ClientCursor(conn) as cur, self.instrumentation.measure('DatabaseQueryDuration', {'Operation': 'change_users_credentials'}):
+                statement_timeout = get_statement_timeout('change_users_credentials')
+
+                if statement_timeout is not None:
+                    cur.execute(SET_LOCAL_TIMEOUTS, (statement_timeout, statement_timeout))
+
+                for index in indices:
+                    old_credentials, new_password = changes[index]
+                    cur.execute("SAVEPOINT change_user_credentials")
+
+                    try:
+                        cur.execute(sql.SQL("ALTER USER {} WITH PASSWORD %s").format(sql.Identifier(old_credentials.username)), (new_password,))
+                        cur.execute("RELEASE SAVEPOINT change_user_credentials")
+                    except psycopg.Error as e:
+                        self.logger.error(f'Failed to change the password of user {old_credentials.username}')
+                        cur.execute("ROLLBACK TO SAVEPOINT change_user_credentials")
+                        results[index] = e
+
+                conn.commit()
+
+    def __change_user_credentials_or_error(self, old_credentials: DatabaseCredentials, new_password: str) -> Exception | None:
+        try:
+            self.change_user_credentials(old_credentials, new_password)
+
+            return None
+        except Exception as e:
+            return e
+
+    @contextmanager
+    def __connection(self, credentials: DatabaseCredentials, reusable: bool = True, cached: bool = True) -> Iterator['Connection']:
+        """
+        Provides a connection from the cache (if any) and puts it back afterwards. Connections are closed if there is no
+        cache, they are not reusable or an error occurred.
+
+        :param cached: False to open a new connection even if the cache has one
+        """
+        connection = self.connection_cache.acquire(credentials) if self.connection_cache is not None and cached else None
+
+        if connection is None:
+            with self.instrumentation.measure('DatabaseConnectDuration'):
+                connection = self._get_connection(credentials)
+
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+
+            raise
+
+        if reusable and self.connection_cache is not None:
+            self.connection_cache.release(credentials, connection)
+        else:
+            connection.close()
+
+    def _get_connection(self, credentials: DatabaseCredentials) -> 'Connection':
+        """
+        Method is protected to allow testing. psycopg is imported here as it is expensive to load and not needed by all
+        rotation steps.
         :param credentials: used to connect to the database
         :return: the database connection
         """
-        connect_string = psycopg._connection_info.make_conninfo("", password=credentials.password, user=credentials.username, host=credentials.database_host, port=credentials.database_port, dbname=credentials.database_name, sslmode="require", connect_timeout=5)
+        import psycopg
+
+        connect_timeout = get_connect_timeout()
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_connect(credentials.database_host, credentials.database_port)
 
         try:
-            return psycopg.connect(connect_string)
+            connection = psycopg.connect(get_connect_string(credentials, connect_timeout))
         except psycopg.OperationalError as e:
             self.logger.error(f'Failed to connect to database {credentials.database_name} on {credentials.database_host}:{credentials.database_port} as {credentials.username}')
+            record_connect_error(self.circuit_breaker, credentials, e)
 
             raise e
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(credentials.database_host, credentials.database_port)
+
+        return connection
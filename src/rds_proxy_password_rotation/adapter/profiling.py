@@ -0,0 +1,172 @@
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Any
+from uuid import uuid4
+
+from aws_lambda_powertools import Logger
+
+PROFILING_MODE_VARIABLE = 'ROTATION_PROFILING_MODE'
+"""`cprofile` (deterministic, handler thread only) or `sampling` (all threads). Profiling is disabled if not set."""
+PROFILING_SAMPLE_RATE_VARIABLE = 'ROTATION_PROFILING_SAMPLE_RATE'
+"""Fraction of the invocations to profile, defaults to 1"""
+PROFILING_OUTPUT_DIRECTORY_VARIABLE = 'ROTATION_PROFILING_OUTPUT_DIRECTORY'
+"""Directory for the profiles, defaults to /tmp"""
+PROFILING_SAMPLING_INTERVAL_VARIABLE = 'ROTATION_PROFILING_SAMPLING_INTERVAL'
+"""Seconds between two samples of the sampling profiler, defaults to 0.005"""
+
+HOT_FUNCTIONS_TO_LOG = 10
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads in a background thread. Unlike cProfile, it also sees the rotation thread pool.
+    Idle pool threads are not sampled.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__sample, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__thread.join()
+
+    def write_collapsed_stacks(self, path: str):
+        """
+        Writes the stacks in the collapsed format used by flame graph tools, i.e. one `frame;frame;frame count` per line.
+        """
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+    def get_hot_functions(self, limit: int) -> list[dict[str, Any]]:
+        """
+        :return: the functions found most often on top of the stack
+        """
+        leaf_counts = Counter()
+
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(';', 1)[-1]] += count
+
+        return [{'function': function, 'samples': count} for function, count in leaf_counts.most_common(limit)]
+
+    def __sample(self):
+        own_thread_id = threading.get_ident()
+
+        while not self.__stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+
+                stack = SamplingProfiler.__collapse(frame)
+
+                if not stack.endswith('thread.py:_worker'):
+                    self.stacks[stack] += 1
+
+    @staticmethod
+    def __collapse(frame: Any) -> str:
+        frames = []
+
+        while frame is not None:
+            frames.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+            frame = frame.f_back
+
+        return ';'.join(reversed(frames))
+
+
+def profile_invocations(handler: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """
+    Profiles the invocations of a Lambda handler if enabled via the environment. Writes the profile to the output
+    directory and logs the hottest functions. The handler is returned as is if profiling is disabled, i.e. there is no
+    overhead at all.
+
+    An invalid configuration disables profiling with a warning. It must not break the rotation.
+    """
+    mode = os.environ.get(PROFILING_MODE_VARIABLE, '').strip().lower()
+
+    if not mode:
+        return handler
+
+    logger = Logger()
+
+    if mode not in ('cprofile', 'sampling'):
+        logger.warning(f'Invalid profiling mode: {mode}. Profiling is disabled.')
+        return handler
+
+    try:
+        sample_rate = float(os.environ.get(PROFILING_SAMPLE_RATE_VARIABLE, '1'))
+        sampling_interval = float(os.environ.get(PROFILING_SAMPLING_INTERVAL_VARIABLE, '0.005'))
+    except ValueError as e:
+        logger.warning(f'Invalid profiling configuration: {e}. Profiling is disabled.')
+        return handler
+
+    if sampling_interval <= 0:
+        logger.warning(f'Invalid profiling sampling interval: {sampling_interval}. Profiling is disabled.')
+        return handler
+
+    output_directory = os.environ.get(PROFILING_OUTPUT_DIRECTORY_VARIABLE, '/tmp')
+
+    @functools.wraps(handler)
+    def profiled_handler(event: Any, context: Any) -> Any:
+        if random.random() >= sample_rate:
+            return handler(event, context)
+
+        invocation_id = getattr(context, 'aws_request_id', None) or str(uuid4())
+        start = time.perf_counter()
+
+        if mode == 'cprofile':
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+
+            try:
+                return profiler.runcall(handler, event, context)
+            finally:
+                path = os.path.join(output_directory, f'rotation-{invocation_id}.pstats')
+
+                # profiling must not change the result of the handler
+                try:
+                    profiler.dump_stats(path)
+                    stats = pstats.Stats(profiler)
+                    hot_functions = [{
+                        'function': f'{os.path.basename(file)}:{line}:{function}',
+                        'calls': calls,
+                        'self_ms': self_time * 1000,
+                        'cumulative_ms': cumulative_time * 1000,
+                    } for (file, line, function), (_, calls, self_time, cumulative_time, _) in sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:HOT_FUNCTIONS_TO_LOG]]
+
+                    logger.info('profile written', extra={'profile': {'mode': mode, 'path': path, 'duration_ms': (time.perf_counter() - start) * 1000, 'hot_functions': hot_functions}})
+                except Exception as e:
+                    logger.warning(f'Failed to write the profile {path}: {e}')
+
+        profiler = SamplingProfiler(sampling_interval)
+        profiler.start()
+
+        try:
+            return handler(event, context)
+        finally:
+            profiler.stop()
+
+            path = os.path.join(output_directory, f'rotation-{invocation_id}.collapsed')
+
+            # profiling must not change the result of the handler
+            try:
+                profiler.write_collapsed_stacks(path)
+
+                logger.info('profile written', extra={'profile': {'mode': mode, 'path': path, 'duration_ms': (time.perf_counter() - start) * 1000, 'hot_functions': profiler.get_hot_functions(HOT_FUNCTIONS_TO_LOG)}})
+            except Exception as e:
+                logger.warning(f'Failed to write the profile {path}: {e}')
+
+    return profiled_handler
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from threading import Lock
+from typing import Any
+
+from rds_proxy_password_rotation.deadline import get_current_deadline
+from rds_proxy_password_rotation.services import Instrumentation, NoInstrumentation
+
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded'}
+
+RATE_LIMITED_OPERATIONS = {'describe_secret', 'get_secret_value', 'put_secret_value', 'update_secret_version_stage', 'list_secrets', 'get_random_password'}
+
+
+def check_deadline(operation: str, wait_seconds: float):
+    """
+    :raises DeadlineExceededError: if the call could not start before the deadline of the current step
+    """
+    deadline = get_current_deadline()
+
+    if deadline is not None:
+        deadline.check(operation, wait_seconds)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    # duck typed to avoid importing botocore
+    response = getattr(error, 'response', None)
+
+    return isinstance(response, dict) and response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class TokenBucket:
+    """
+    Not thread-safe, guarded by the `RateLimiter`.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        :param rate: tokens added per second
+        :param burst: maximum number of tokens, defaults to one second worth of tokens
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes a token. The token count may become negative, i.e. callers queue up without busy waiting.
+
+        :return: seconds to wait before the token may be used
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate) - 1
+        self.updated_at = now
+
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+        self.updated_at = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Client-side rate limits per operation, shared by all threads and coroutines using the client. The time to wait is
+    calculated under a lock, the waiting happens outside of it, so the limiter works for blocking and async callers.
+
+    A throttled call drains the bucket of its operation, i.e. all callers slow down, not just the throttled one.
+    """
+
+    def __init__(self, rate_limits: dict[str, float] = None, max_retries: int = 5, base_delay: float = 0.1, max_delay: float = 5.0,
+                 instrumentation: Instrumentation = None):
+        """
+        :param rate_limits: calls per second by operation name, e.g. `put_secret_value`. Operations without a limit
+                            are not limited.
+        :param max_retries: retries of a throttled call before the error is raised
+        :param base_delay: upper bound of the first backoff in seconds, doubled with every retry
+        :param max_delay: upper bound of every backoff in seconds
+        :param instrumentation: counts the retries of throttled calls by operation
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.instrumentation = instrumentation if instrumentation is not None else NoInstrumentation()
+
+        self.__lock = Lock()
+        self.__buckets = {operation: TokenBucket(rate) for operation, rate in (rate_limits or {}).items()}
+
+        self.calls = 0
+        self.throttled_calls = 0
+        self.wait_seconds = 0.0
+        self.work_seconds = 0.0
+
+    def reserve(self, operation: str) -> float:
+        """
+        :return: seconds to wait before calling the operation
+        """
+        with self.__lock:
+            bucket = self.__buckets.get(operation)
+
+            return bucket.reserve() if bucket is not None else 0.0
+
+    def get_backoff_delay(self, operation: str, retry: int) -> float:
+        """
+        Full jitter exponential backoff.
+
+        :param retry: number of the retry, starting with 0
+        """
+        with self.__lock:
+            self.throttled_calls += 1
+            bucket = self.__buckets.get(operation)
+
+            if bucket is not None:
+                bucket.drain()
+
+        self.instrumentation.increment('SecretsManagerRetries', {'Operation': operation})
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def record(self, wait_seconds: float, work_seconds: float):
+        with self.__lock:
+            self.calls += 1
+            self.wait_seconds += wait_seconds
+            self.work_seconds += work_seconds
+
+    def statistics(self, reset: bool = False) -> dict[str, float]:
+        """
+        :param reset: starts counting from scratch afterwards, e.g. to get the statistics per invocation
+        """
+        with self.__lock:
+            statistics = {
+                'calls': self.calls,
+                'throttled_calls': self.throttled_calls,
+                'wait_seconds': self.wait_seconds,
+                'work_seconds': self.work_seconds,
+            }
+
+            if reset:
+                self.calls = 0
+                self.throttled_calls = 0
+                self.wait_seconds = 0.0
+                self.work_seconds = 0.0
+
+            return statistics
+
+
+class RateLimitedSecretsManagerClient:
+    """
+    Wraps a boto3 client. Calls of the rate limited operations wait for the rate limiter and are retried with backoff
+    if throttled. No call is started if the deadline of the current step would pass while waiting. Everything else is
+    passed through.
+    """
+
+    def __init__(self, client: Any, rate_limiter: RateLimiter):
+        self.client = client
+        self.rate_limiter = rate_limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.client, name)
+
+        if name not in RATE_LIMITED_OPERATIONS:
+            return attribute
+
+        def call(**kwargs):
+            return self.__call(name, attribute, kwargs)
+
+        return call
+
+    def __call(self, operation: str, method: Any, kwargs: dict) -> Any:
+        retry = 0
+        wait_seconds = self.rate_limiter.reserve(operation)
+
+        while True:
+            check_deadline(operation, wait_seconds)
+
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+
+            start = time.perf_counter()
+
+            try:
+                result = method(**kwargs)
+                self.rate_limiter.record(wait_seconds, time.perf_counter() - start)
+
+                return result
+            except Exception as e:
+                self.rate_limiter.record(wait_seconds, time.perf_counter() - start)
+
+                if not is_throttling_error(e) or retry >= self.rate_limiter.max_retries:
+                    raise e
+
+                wait_seconds = self.rate_limiter.get_backoff_delay(operation, retry) + self.rate_limiter.reserve(operation)
+                retry += 1
+
+
+class AsyncRateLimitedSecretsManagerClient:
+    """
+    Async counterpart of `RateLimitedSecretsManagerClient` for aiobotocore style clients.
+    """
+
+    def __init__(self, client: Any, rate_limiter: RateLimiter):
+        self.client = client
+        self.rate_limiter = rate_limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.client, name)
+
+        if name not in RATE_LIMITED_OPERATIONS:
+            return attribute
+
+        async def call(**kwargs):
+            return await self.__call(name, attribute, kwargs)
+
+        return call
+
+    async def __call(self, operation: str, method: Any, kwargs: dict) -> Any:
+        retry = 0
+        wait_seconds = self.rate_limiter.reserve(operation)
+
+        while True:
+            check_deadline(operation, wait_seconds)
+
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+
+            start = time.perf_counter()
+
+            try:
+                result = await method(**kwargs)
+                self.rate_limiter.record(wait_seconds, time.perf_counter() - start)
+
+                return result
+            except Exception as e:
+                self.rate_limiter.record(wait_seconds, time.perf_counter() - start)
+
+                if not is_throttling_error(e) or retry >= self.rate_limiter.max_retries:
+                    raise e
+
+                wait_seconds = self.rate_limiter.get_backoff_delay(operation, retry) + self.rate_limiter.reserve(operation)
+                retry += 1
@@ -0,0 +1,88 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Iterator, TYPE_CHECKING
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.model import SecretInventoryRecord, PasswordType
+
+if TYPE_CHECKING:
+    from mypy_boto3_secretsmanager.type_defs import SecretListEntryTypeDef
+
+
+class SecretInventoryScanner:
+    """
+    Scans the secrets to find rotation candidates. The secrets are listed page by page and filtered by their metadata
+    first. Values are only fetched to filter by rotation type. At most a fixed number of fetches is in flight, so the
+    memory used does not depend on the number of secrets.
+    """
+
+    def __init__(self, secrets_manager: AwsSecretsManagerService, logger: Logger, max_concurrent_value_fetches: int = 8):
+        self.secrets_manager = secrets_manager
+        self.logger = logger
+        self.max_concurrent_value_fetches = max_concurrent_value_fetches
+
+    def scan(self, name_prefix: str = None, rotation_enabled: bool = None, pending_only: bool = False,
+             rotation_type: PasswordType = None) -> Iterator[SecretInventoryRecord]:
+        """
+        Yields the matching secrets in the order of list_secrets.
+
+        :param name_prefix: only secrets with a name starting with the prefix
+        :param rotation_enabled: only secrets with rotation enabled (True) or disabled (False). None for all secrets.
+        :param pending_only: only secrets with an unfinished rotation
+        :param rotation_type: only secrets with the rotation type. Fetches the value of every secret matching the other
+                              filters. None for all secrets without fetching any value.
+        """
+        records = (SecretInventoryScanner.__to_record(secret) for secret in self.secrets_manager.list_secrets(name_prefix))
+        records = (record for record in records
+                   if (rotation_enabled is None or record.rotation_enabled == rotation_enabled) and (not pending_only or record.pending_version_id is not None))
+
+        if rotation_type is None:
+            yield from records
+            return
+
+        for record in self.__add_rotation_types(records):
+            if record.rotation_type == rotation_type:
+                yield record
+
+    def __add_rotation_types(self, records: Iterator[SecretInventoryRecord]) -> Iterator[SecretInventoryRecord]:
+        """
+        Fetches the rotation types concurrently while keeping the order of the records. Reading ahead is limited to
+        twice the number of concurrent fetches.
+        """
+        in_flight: deque[Future[SecretInventoryRecord]] = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_value_fetches, thread_name_prefix='secret-inventory') as executor:
+            try:
+                for record in records:
+                    in_flight.append(executor.submit(self.__add_rotation_type, record))
+
+                    if len(in_flight) >= 2 * self.max_concurrent_value_fetches:
+                        yield in_flight.popleft().result()
+
+                while in_flight:
+                    yield in_flight.popleft().result()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def __add_rotation_type(self, record: SecretInventoryRecord) -> SecretInventoryRecord:
+        return record.model_copy(update={'rotation_type': self.secrets_manager.get_rotation_type(record.arn)})
+
+    @staticmethod
+    def __to_record(secret: 'SecretListEntryTypeDef') -> SecretInventoryRecord:
+        pending_version_id = None
+
+        for version, stages in secret.get('SecretVersionsToStages', {}).items():
+            # same rule as check_secret_state: a current version still staged as AWSPENDING is an unfinished rotation
+            # (finish_secret was interrupted)
+            if 'AWSPENDING' in stages:
+                pending_version_id = version
+
+        return SecretInventoryRecord(
+            arn=secret['ARN'],
+            name=secret['Name'],
+            rotation_enabled=secret.get('RotationEnabled', False),
+            pending_version_id=pending_version_id,
+            last_rotated_date=secret.get('LastRotatedDate'))
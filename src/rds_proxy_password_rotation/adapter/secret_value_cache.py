@@ -0,0 +1,79 @@
+from threading import Lock
+from typing import Callable, TypeVar
+
+from cachetools import TTLCache
+
+from rds_proxy_password_rotation.model import Credentials
+
+T = TypeVar('T', bound=Credentials)
+
+
+class _EvictionCountingTTLCache(TTLCache):
+    def __init__(self, maxsize: int, ttl: float, on_eviction: Callable[[], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.__on_eviction = on_eviction
+
+    def popitem(self):
+        # called by the cache only if it is full and the least recently used item has to go
+        item = super().popitem()
+        self.__on_eviction()
+
+        return item
+
+
+class SecretValueCache:
+    """
+    Holds parsed secret values keyed by secret ARN and version id. A version of a secret is immutable once written,
+    so the cache needs no invalidation. The TTL just limits how long a secret value stays in memory.
+
+    The cache is meant to live as long as the Lambda process, i.e. it is shared by all warm invocations.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 900):
+        self.__lock = Lock()
+        self.__cache = _EvictionCountingTTLCache(maxsize, ttl, self.__count_eviction)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, secret_arn: str, version_id: str, credentials_type: type[T]) -> T | None:
+        with self.__lock:
+            credentials = self.__cache.get((secret_arn, version_id, credentials_type))
+
+            if credentials is None:
+                self.misses += 1
+
+                return None
+
+            self.hits += 1
+
+        # callers may modify the returned model
+        return credentials.model_copy(deep=True)
+
+    def put(self, secret_arn: str, version_id: str, credentials: Credentials):
+        with self.__lock:
+            self.__cache[(secret_arn, version_id, type(credentials))] = credentials.model_copy(deep=True)
+
+    def statistics(self, reset: bool = False) -> dict[str, int]:
+        """
+        :param reset: starts counting from scratch afterwards, e.g. to get the statistics per invocation. The cached
+                      values are kept.
+        """
+        with self.__lock:
+            statistics = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.__cache),
+            }
+
+            if reset:
+                self.hits = 0
+                self.misses = 0
+                self.evictions = 0
+
+            return statistics
+
+    def __count_eviction(self):
+        self.evictions += 1
@@ -0,0 +1,60 @@
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class StageMove(BaseModel):
+    """
+    Arguments of one update_secret_version_stage call.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    version_stage: str
+    move_to_version_id: Optional[str] = None
+    remove_from_version_id: Optional[str] = None
+
+    def to_request(self) -> dict[str, str]:
+        request = {'VersionStage': self.version_stage}
+
+        if self.move_to_version_id is not None:
+            request['MoveToVersionId'] = self.move_to_version_id
+
+        if self.remove_from_version_id is not None:
+            request['RemoveFromVersionId'] = self.remove_from_version_id
+
+        return request
+
+
+def plan_stage_transition(versions: dict[str, list[str]], token: str) -> list[StageMove]:
+    """
+    Plans the stage moves making the pending version (token) the current one. Every state reached by a partially
+    executed plan results in the remaining moves only, i.e. executing the plan again is cheap.
+
+    AWSPREVIOUS is not moved explicitly: Secrets Manager moves it to the old current version when AWSCURRENT is moved.
+
+    :param versions: VersionIdsToStages of the secret
+    :return: the moves in the order they have to be executed. Empty if the token is the current version already.
+    :raises ValueError: if the state of the secret is not part of a rotation to the token
+    """
+    if token not in versions:
+        raise ValueError(f'version {token} does not exist')
+
+    current_versions = [version for version, stages in versions.items() if 'AWSCURRENT' in stages]
+
+    if len(current_versions) != 1:
+        raise ValueError(f'expected exactly one version staged as AWSCURRENT, found {len(current_versions)}')
+
+    token_stages = versions[token]
+    stage_moves = []
+
+    if current_versions[0] != token:
+        if 'AWSPENDING' not in token_stages:
+            raise ValueError(f'version {token} is neither staged as AWSPENDING nor as AWSCURRENT')
+
+        stage_moves.append(StageMove(version_stage='AWSCURRENT', move_to_version_id=token, remove_from_version_id=current_versions[0]))
+
+    if 'AWSPENDING' in token_stages:
+        stage_moves.append(StageMove(version_stage='AWSPENDING', remove_from_version_id=token))
+
+    return stage_moves
@@ -0,0 +1,62 @@
+import argparse
+import sys
+
+from rds_proxy_password_rotation.adapter.container import Container
+from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+from rds_proxy_password_rotation.adapter.secret_inventory_scanner import SecretInventoryScanner
+from rds_proxy_password_rotation.model import PasswordType
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.stuck_rotation_sweeper import StuckRotationSweeper
+
+
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Finds the secrets with an unfinished rotation and resumes or rolls back the rotations. Prints one JSON line per secret as soon as it is repaired.')
+    parser.add_argument('--name-prefix', help='sweeps the secrets with a name starting with the prefix only')
+    parser.add_argument('--max-workers', type=int, default=16, help='secrets repaired concurrently (default: %(default)s)')
+    parser.add_argument('--roll-back-not-applied', action='store_true',
+                        help='removes the pending version of rotations not applied to the database instead of resuming them')
+    parser.add_argument('--dry-run', action='store_true', help='classifies the secrets without changing anything')
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None) -> int:
+    arguments = parse_arguments(argv)
+
+    container = Container()
+    # every worker needs a connection for its own calls and the proxy secret lookups
+    container.config.secrets_manager.max_pool_connections.from_value(2 * arguments.max_workers + 8)
+
+    secrets_manager = container.secrets_manager()
+    # no connection cache: the classification has to log in with the credentials of the secret
+    database_service = PostgreSqlDatabaseService(container.logger(), instrumentation=container.instrumentation(), circuit_breaker=container.circuit_breaker())
+
+    records = SecretInventoryScanner(secrets_manager, container.logger()).scan(arguments.name_prefix, pending_only=True, rotation_type=PasswordType.AWS_RDS)
+
+    failed = 0
+    total = 0
+
+    with PasswordRotationApplication(
+            password_service=secrets_manager,
+            database_service=database_service,
+            logger=container.logger(),
+            max_workers=2 * arguments.max_workers + 8,
+            instrumentation=container.instrumentation()) as application:
+        sweeper = StuckRotationSweeper(application, secrets_manager, database_service, container.logger(), arguments.max_workers, arguments.roll_back_not_applied,
+                                       arguments.dry_run)
+
+        for outcome in sweeper.sweep(records):
+            total += 1
+            failed += 1 if outcome.is_failed() else 0
+
+            print(outcome.model_dump_json(), flush=True)
+
+    print(f'{total} stuck rotations processed, {failed} failed', file=sys.stderr)
+    container.botocore_metrics().dump()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator
+from uuid import uuid4
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.deadline import Deadline, deadline_scope
+from rds_proxy_password_rotation.model import RotationStep, PasswordStage, UserCredentials, DatabaseCredentials, PasswordRotationResult
+from rds_proxy_password_rotation.services import AsyncPasswordService, AsyncDatabaseService, Instrumentation, NoInstrumentation
+
+
+class RotationStepError(Exception):
+    """
+    Raised by a full rotation if one of its steps fails. The cause is the error of the step.
+    """
+
+    def __init__(self, step: RotationStep, secret_id: str):
+        super().__init__(f'rotation of secret {secret_id} failed in step {step.value}')
+        self.step = step
+
+
+class AsyncPasswordRotationApplication:
+    """
+    Executes the rotation steps. Independent calls to the services (e.g. fetching the current and the pending
+    credentials) are awaited concurrently.
+    """
+
+    def __init__(self, password_service: AsyncPasswordService, database_service: AsyncDatabaseService, logger: Logger, max_concurrent_proxy_secret_lookups: int = 8,
+                 instrumentation: Instrumentation = None):
+        self.password_service = password_service
+        self.database_service = database_service
+        self.logger = logger
+        self.max_concurrent_proxy_secret_lookups = max_concurrent_proxy_secret_lookups
+        self.instrumentation = instrumentation if instrumentation is not None else NoInstrumentation()
+
+    async def rotate_secret(self, step: RotationStep, secret_id: str, token: str, deadline: Deadline = None) -> PasswordRotationResult:
+        """
+        :param deadline: the services abort the step with a `DeadlineExceededError` instead of running past it
+        """
+        # all password service calls of one step share the same metadata snapshot
+        self.password_service.begin_request_scope()
+
+        try:
+            with deadline_scope(deadline):
+                return await self.__rotate_secret(step, secret_id, token)
+        finally:
+            self.password_service.end_request_scope()
+            self.instrumentation.flush()
+
+    async def rotate_secret_fully(self, secret_id: str, token: str = None, deadline: Deadline = None) -> PasswordRotationResult:
+        """
+        Executes all rotation steps in one go instead of being triggered by Secrets Manager once per step. The steps
+        share one request scope, i.e. the metadata snapshot and the parsed credentials are read once and reused by the
+        following steps. Every step still checks the state of the secret, so a rotation interrupted at any point can be
+        continued by calling this method again with the same token. Calling it again after the rotation has finished
+        changes nothing.
+
+        Database connections are not shared between the steps: set_secret closes its connection as it was authenticated
+        with the old password, and test_secret always logs in with the new one to verify it.
+
+        :param token: the version id of the new secret version. Defaults to a random one.
+        :raises RotationStepError: if a step fails
+        """
+        token = token if token is not None else str(uuid4())
+
+        self.password_service.begin_request_scope()
+
+        try:
+            with deadline_scope(deadline):
+                for step in RotationStep:
+                    try:
+                        result = await self.__rotate_secret(step, secret_id, token)
+                    except Exception as e:
+                        raise RotationStepError(step, secret_id) from e
+
+                    if result == PasswordRotationResult.NOTHING_TO_ROTATE:
+                        self.logger.info(f'{step.value}: nothing to rotate for secret {secret_id}')
+
+                        return result
+
+            self.logger.info(f'secret {secret_id} rotated to version {token}')
+
+            return PasswordRotationResult.STEP_EXECUTED
+        finally:
+            self.password_service.end_request_scope()
+            self.instrumentation.flush()
+
+    async def __rotate_secret(self, step: RotationStep, secret_id: str, token: str) -> PasswordRotationResult:
+        # not awaited concurrently on purpose: fills the metadata snapshot before the steps read the secret concurrently
+        if not await self.password_service.is_rotation_enabled(secret_id):
+            self.logger.warning("Rotation is not enabled for the secret %s", secret_id)
+            return PasswordRotationResult.NOTHING_TO_ROTATE
+
+        if step == RotationStep.CREATE_SECRET:
+            # the token does not exist before create_secret of a full rotation, so its state cannot be checked. But a
+            # finished rotation must not write the token again.
+            if await self.password_service.is_rotation_finished(secret_id, token):
+                self.logger.info(f'rotation of secret {secret_id} to version {token} is finished already')
+                return PasswordRotationResult.NOTHING_TO_ROTATE
+        elif not await self.password_service.ensure_valid_secret_state(secret_id, token):
+            return PasswordRotationResult.NOTHING_TO_ROTATE
+
+        match step:
+            case RotationStep.CREATE_SECRET:
+                execute_step = self.__create_secret
+            case RotationStep.SET_SECRET:
+                execute_step = self.__set_secret
+            case RotationStep.TEST_SECRET:
+                execute_step = self.__test_secret
+            case RotationStep.FINISH_SECRET:
+                execute_step = self.__finish_secret
+            case _:
+                raise ValueError(f"Invalid rotation step: {step}")
+
+        with self.instrumentation.measure('StepDuration', {'Step': step.value}):
+            await execute_step(secret_id, token)
+
+        return PasswordRotationResult.STEP_EXECUTED
+
+    async def __finish_secret(self, secret_id: str, token: str):
+        await self.password_service.make_new_credentials_current(secret_id, token)
+
+    async def __test_secret(self, secret_id: str, token: str):
+        pending_credential = await self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token)
+        await self.database_service.test_user_credentials(pending_credential)
+
+    async def __set_secret(self, secret_id: str, token: str):
+        pending_credential, current_credential = await asyncio.gather(
+            self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token),
+            self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT))
+
+        # the proxy secret has to be known before changing the password. Otherwise, a failing lookup would leave the
+        # secret with outdated current credentials.
+        proxy_secret_id, proxy_secret = await self.__find_proxy_secret(pending_credential, pending_credential.username)
+
+        await self.database_service.change_user_credentials(current_credential, pending_credential.password)
+
+        # database and proxy user credentials have to be in sync as the proxy user is used to connect to the database
+        if proxy_secret_id is not None:
+            await self.password_service.set_credentials(proxy_secret_id, token, proxy_secret.model_copy(update={'password': pending_credential.password}))
+
+        self.logger.info(f'set_secret: successfully set password for user {pending_credential.username} for secret {secret_id}')
+
+    async def __find_proxy_secret(self, credentials: DatabaseCredentials, username: str) -> tuple[str, UserCredentials] | tuple[None, None]:
+        """
+        Uses the proxy secret index of the credentials to fetch the proxy secret of the given user. Falls back to
+        scanning all proxy secrets if the credentials have no index, the user is not indexed or the index is outdated.
+        The next create_secret rebuilds an index without the user.
+        """
+        if credentials.has_no_proxy_secret(username) and credentials.has_valid_proxy_secret_index(username):
+            return None, None
+
+        if credentials.proxy_secret_id_by_username is not None:
+            proxy_secret_id = credentials.get_proxy_secret_id(username)
+
+            if proxy_secret_id is None:
+                self.logger.info(f'user {username} is not in the proxy secret index. Scanning all proxy secrets.')
+            else:
+                proxy_secret = await self.password_service.get_user_credentials(proxy_secret_id, PasswordStage.CURRENT)
+
+                if proxy_secret is not None and proxy_secret.username == username:
+                    return proxy_secret_id, proxy_secret
+
+                self.logger.warning(f'proxy secret index is outdated: {proxy_secret_id} is not the proxy secret of user {username}. Scanning all proxy secrets.')
+
+        async with aclosing(self.__fetch_proxy_secrets(credentials.proxy_secret_ids)) as proxy_secrets:
+            async for proxy_secret_id, proxy_secret in proxy_secrets:
+                if proxy_secret is not None and proxy_secret.username == username:
+                    return proxy_secret_id, proxy_secret
+
+        return None, None
+
+    async def __fetch_proxy_secrets(self, proxy_secret_ids: list[str] | None) -> AsyncIterator[tuple[str, UserCredentials | None]]:
+        """
+        Fetches the proxy secrets concurrently and yields them as soon as they arrive. Lookups still running are
+        cancelled when the generator is closed.
+        """
+        if not proxy_secret_ids:
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_proxy_secret_lookups)
+
+        async def fetch(proxy_secret_id: str) -> tuple[str, UserCredentials | None]:
+            async with semaphore:
+                return proxy_secret_id, await self.password_service.get_user_credentials(proxy_secret_id, PasswordStage.CURRENT)
+
+        tasks = [asyncio.ensure_future(fetch(proxy_secret_id)) for proxy_secret_id in proxy_secret_ids]
+
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __build_proxy_secret_index(self, credentials: DatabaseCredentials) -> DatabaseCredentials:
+        """
+        Returns the credentials with a valid index of the proxy secrets. The index is only rebuilt if the proxy secrets
+        have changed since it was created or the user to rotate to is not indexed. A proxy secret changing its username
+        to a user indexed without one is not noticed until the proxy secrets change.
+        """
+        if not credentials.proxy_secret_ids or credentials.has_valid_proxy_secret_index(credentials.get_next_username()):
+            return credentials
+
+        index = {}
+
+        async with aclosing(self.__fetch_proxy_secrets(credentials.proxy_secret_ids)) as proxy_secrets:
+            async for proxy_secret_id, proxy_secret in proxy_secrets:
+                if proxy_secret is None:
+                    self.logger.warning(f'proxy secret {proxy_secret_id} not found. Not indexing the proxy secrets.')
+                    return credentials.model_copy(update={'proxy_secret_id_by_username': None})
+
+                if proxy_secret.username in index:
+                    self.logger.warning(f'proxy secrets {index[proxy_secret.username]} and {proxy_secret_id} belong to the same user {proxy_secret.username}. Not indexing the proxy secrets.')
+                    return credentials.model_copy(update={'proxy_secret_id_by_username': None})
+
+                index[proxy_secret.username] = proxy_secret_id
+
+        # records the users without a proxy secret, so the following rotations neither rebuild the index nor scan the
+        # proxy secrets for them
+        for username in [*(credentials.rotation_usernames or []), credentials.get_next_username()]:
+            index.setdefault(username, None)
+
+        return credentials.model_copy(update={'proxy_secret_id_by_username': index})
+
+    async def __create_secret(self, secret_id: str, token: str):
+        """
+        Creates a new version of the secret with the password to rotate to unless a version tagged with AWSPENDING
+        already exists. The new version contains an index of the proxy secrets, so set_secret does not have to scan
+        them.
+        """
+
+        pending_credential, credentials_to_rotate = await asyncio.gather(
+            self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token),
+            self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT))
+
+        if pending_credential is not None:
+            return
+
+        credentials_to_rotate = await self.__build_proxy_secret_index(credentials_to_rotate)
+
+        await self.password_service.set_new_pending_password(secret_id, token, credentials_to_rotate)
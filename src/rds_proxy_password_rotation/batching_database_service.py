@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import Future
+from threading import Lock
+
+from rds_proxy_password_rotation.model import DatabaseCredentials
+from rds_proxy_password_rotation.services import DatabaseService
+
+
+class BatchingDatabaseService(DatabaseService):
+    """
+    Collects the password changes of concurrent rotations in the same database for a short time window and applies them
+    with one `change_users_credentials` call, e.g. over one connection. Meant for the fleet runner where many threads
+    rotate secrets of the same cluster at the same time.
+
+    The first thread of a batch waits for the window to pass and executes the batch, the others wait for their result.
+    A batch is never larger than the number of rotations running in the same database at the same time, i.e. batching
+    only pays off with a high limit of concurrent rotations per host.
+    """
+
+    def __init__(self, database_service: DatabaseService, window: float = 0.05, max_batch_size: int = 50):
+        """
+        :param window: seconds to wait for other changes to join the batch
+        :param max_batch_size: changes executed with one call at most. A full batch is executed without waiting.
+        """
+        self.database_service = database_service
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self.__lock = Lock()
+        self.__batches: dict[tuple[str, int, str], list[tuple[DatabaseCredentials, str, Future]]] = {}
+
+    def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        key = (old_credentials.database_host, old_credentials.database_port, old_credentials.database_name)
+        result = Future()
+
+        with self.__lock:
+            batch = self.__batches.setdefault(key, [])
+            batch.append((old_credentials, new_password, result))
+            is_leader = len(batch) == 1
+            full_batch = self.__batches.pop(key) if len(batch) >= self.max_batch_size else None
+
+        if full_batch is not None:
+            self.__execute(full_batch)
+        elif is_leader:
+            time.sleep(self.window)
+
+            with self.__lock:
+                # the batch may have been executed already because it was full
+                batch = self.__batches.pop(key) if self.__batches.get(key) and self.__batches[key][0][2] is result else None
+
+            if batch is not None:
+                self.__execute(batch)
+
+        result.result()
+
+    def test_user_credentials(self, credentials: DatabaseCredentials):
+        return self.database_service.test_user_credentials(credentials)
+
+    def change_users_credentials(self, changes: list[tuple[DatabaseCredentials, str]]) -> list[Exception | None]:
+        return self.database_service.change_users_credentials(changes)
+
+    def __execute(self, batch: list[tuple[DatabaseCredentials, str, Future]]):
+        try:
+            errors = self.database_service.change_users_credentials([(old_credentials, new_password) for old_credentials, new_password, _ in batch])
+        except Exception as e:
+            errors = [e] * len(batch)
+
+        for (_, _, result), error in zip(batch, errors):
+            if error is None:
+                result.set_result(None)
+            else:
+                result.set_exception(error)
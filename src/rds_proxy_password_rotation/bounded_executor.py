@@ -0,0 +1,38 @@
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_as_completed(executor: Executor, function: Callable[[T], R], items: Iterable[T], max_pending: int) -> Iterator[R]:
+    """
+    Calls the function for every item in the executor and yields the results as soon as they are available, i.e. not in
+    the order of the items. At most `max_pending` calls are submitted and not finished at a time, so the items are
+    consumed lazily (e.g. the pages of list_secrets) and the memory does not grow with the number of items.
+
+    The calls run in a copy of the context of the caller. Calls not started yet are cancelled when the iterator is
+    closed.
+    """
+    items = iter(items)
+    pending: set[Future] = set()
+
+    try:
+        while True:
+            for item in items:
+                pending.add(executor.submit(copy_context().run, function, item))
+
+                if len(pending) >= max_pending:
+                    break
+
+            if not pending:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,146 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from threading import Lock, Semaphore
+from typing import Iterable, Iterator
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.bounded_executor import map_as_completed
+from rds_proxy_password_rotation.deadline import Deadline, deadline_scope
+from rds_proxy_password_rotation.model import PasswordStage, DatabaseCredentials, CredentialKind, CredentialCheckResult
+from rds_proxy_password_rotation.services import PasswordService, DatabaseService
+
+
+class CredentialDriftDetector:
+    """
+    Verifies that the credentials stored in the secrets still authenticate against their databases, e.g. after a
+    password was changed without a rotation. Tests the current credentials of every secret and optionally the other
+    users of the rotation and the proxy secrets.
+
+    The secrets are checked by a bounded worker pool. Checks against the same database host are limited separately,
+    so a host is not flooded with logins. The database service must not reuse connections, otherwise a check proves
+    only that the credentials were valid when the connection was opened.
+    """
+
+    def __init__(self, password_service: PasswordService, database_service: DatabaseService, logger: Logger, max_workers: int = 32,
+                 max_concurrent_checks_per_host: int = 4, check_rotation_users: bool = False, check_proxy_secrets: bool = False):
+        """
+        :param max_workers: secrets checked concurrently
+        :param max_concurrent_checks_per_host: logins at the same time on the same database host and port
+        :param check_rotation_users: also tests the previous version of the secret if it belongs to another user of the
+                                     rotation. The passwords of the other users are not known.
+        :param check_proxy_secrets: also tests the current version of every proxy secret against the database of the secret
+        """
+        self.password_service = password_service
+        self.database_service = database_service
+        self.logger = logger
+        self.max_workers = max_workers
+        self.max_concurrent_checks_per_host = max_concurrent_checks_per_host
+        self.check_rotation_users = check_rotation_users
+        self.check_proxy_secrets = check_proxy_secrets
+
+        self.__lock = Lock()
+        self.__host_semaphores: dict[tuple[str, int], Semaphore] = {}
+
+    def check_secrets(self, secret_ids: Iterable[str], deadline: Deadline = None) -> Iterator[CredentialCheckResult]:
+        """
+        Yields the results of the checks of a secret as soon as they are finished, i.e. not in the order of the secret
+        ids. Checks not started before the deadline fail immediately, so the report is complete in time. The secret ids
+        are consumed as workers become free. Checks not started yet are cancelled when the iterator is closed.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='credential-check') as executor, \
+                closing(map_as_completed(executor, lambda secret_id: self.__check_secret(secret_id, deadline), secret_ids, 2 * self.max_workers)) as results_by_secret:
+            for results in results_by_secret:
+                yield from results
+
+    def __check_secret(self, secret_id: str, deadline: Deadline | None) -> list[CredentialCheckResult]:
+        with deadline_scope(deadline):
+            try:
+                self.__check_deadline(deadline)
+                credentials = self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT)
+
+                if credentials is None:
+                    raise ValueError(f'no current credentials found for secret {secret_id}')
+            except Exception as e:
+                return [CredentialCheckResult(secret_id=secret_id, kind=CredentialKind.CURRENT, error=f'{type(e).__name__}: {e}')]
+
+            results = [self.__check_credentials(secret_id, CredentialKind.CURRENT, credentials, deadline)]
+
+            if self.check_rotation_users and credentials.rotation_usernames:
+                results.extend(self.__check_rotation_users(secret_id, credentials, deadline))
+
+            if self.check_proxy_secrets and credentials.proxy_secret_ids:
+                results.extend(self.__check_proxy_secrets(credentials, deadline))
+
+            return results
+
+    def __check_rotation_users(self, secret_id: str, credentials: DatabaseCredentials, deadline: Deadline | None) -> list[CredentialCheckResult]:
+        try:
+            self.__check_deadline(deadline)
+            previous_credentials = self.password_service.get_database_credentials(secret_id, PasswordStage.PREVIOUS)
+        except Exception as e:
+            return [CredentialCheckResult(secret_id=secret_id, kind=CredentialKind.ROTATION_USER, error=f'{type(e).__name__}: {e}')]
+
+        if previous_credentials is None or previous_credentials.username == credentials.username or previous_credentials.username not in credentials.rotation_usernames:
+            return []
+
+        # the previous version may point to another database if the secret was edited in the meantime
+        previous_credentials = previous_credentials.model_copy(update={
+            'database_host': credentials.database_host,
+            'database_port': credentials.database_port,
+            'database_name': credentials.database_name,
+        })
+
+        return [self.__check_credentials(secret_id, CredentialKind.ROTATION_USER, previous_credentials, deadline)]
+
+    def __check_proxy_secrets(self, credentials: DatabaseCredentials, deadline: Deadline | None) -> list[CredentialCheckResult]:
+        results = []
+
+        for proxy_secret_id in credentials.proxy_secret_ids:
+            try:
+                self.__check_deadline(deadline)
+                proxy_credentials = self.password_service.get_user_credentials(proxy_secret_id, PasswordStage.CURRENT)
+
+                if proxy_credentials is None:
+                    raise ValueError(f'no current credentials found for proxy secret {proxy_secret_id}')
+            except Exception as e:
+                results.append(CredentialCheckResult(secret_id=proxy_secret_id, kind=CredentialKind.PROXY, error=f'{type(e).__name__}: {e}'))
+
+                continue
+
+            # the proxy connects to the database of the secret with the proxy credentials
+            proxy_database_credentials = credentials.model_copy(update={'username': proxy_credentials.username, 'password': proxy_credentials.password})
+            results.append(self.__check_credentials(proxy_secret_id, CredentialKind.PROXY, proxy_database_credentials, deadline))
+
+        return results
+
+    def __check_credentials(self, secret_id: str, kind: CredentialKind, credentials: DatabaseCredentials, deadline: Deadline | None) -> CredentialCheckResult:
+        result = CredentialCheckResult(secret_id=secret_id, kind=kind, username=credentials.username, database_host=credentials.database_host,
+                                       database_port=credentials.database_port)
+
+        try:
+            with self.__get_host_semaphore(credentials.database_host, credentials.database_port):
+                self.__check_deadline(deadline)
+
+                start = time.perf_counter()
+                self.database_service.test_user_credentials(credentials)
+                result.connect_seconds = time.perf_counter() - start
+        except Exception as e:
+            self.logger.warning(f'credentials of user {credentials.username} in secret {secret_id} ({kind.value}) do not authenticate: {type(e).__name__}: {e}')
+
+            result.error = f'{type(e).__name__}: {e}'
+
+        return result
+
+    @staticmethod
+    def __check_deadline(deadline: Deadline | None):
+        if deadline is not None:
+            deadline.check('credential check')
+
+    def __get_host_semaphore(self, host: str, port: int) -> Semaphore:
+        with self.__lock:
+            if (host, port) not in self.__host_semaphores:
+                self.__host_semaphores[(host, port)] = Semaphore(self.max_concurrent_checks_per_host)
+
+            return self.__host_semaphores[(host, port)]
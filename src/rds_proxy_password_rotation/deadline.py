@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class DeadlineExceededError(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    Point in time a rotation step has to be finished by. Calls check the remaining time before they start and derive
+    their timeouts from it, so a step is aborted by us and not killed by Lambda.
+    """
+
+    def __init__(self, seconds: float):
+        """
+        :param seconds: time left from now
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    @staticmethod
+    def from_remaining_milliseconds(remaining_milliseconds: int, safety_margin: float) -> 'Deadline':
+        """
+        :param safety_margin: seconds reserved to abort the step and log the error
+        """
+        return Deadline(remaining_milliseconds / 1000 - safety_margin)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self, operation: str, required: float = 0.0):
+        """
+        :param required: seconds the operation needs at least
+        :raises DeadlineExceededError: if less time is left
+        """
+        remaining = self.remaining()
+
+        if remaining <= required:
+            raise DeadlineExceededError(f'{operation}: {remaining:.3f} seconds left, {required:.3f} seconds required')
+
+    def timeout(self, operation: str, maximum: float, minimum: float = 0.0) -> float:
+        """
+        :return: the remaining time capped by the maximum
+        :raises DeadlineExceededError: if less than the minimum is left
+        """
+        self.check(operation, minimum)
+
+        return min(maximum, self.remaining())
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar('current_deadline', default=None)
+
+
+def get_current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline | None) -> Iterator[None]:
+    """
+    Makes the deadline available to all calls within the scope, including the ones in other threads started with a
+    copy of the context.
+    """
+    reset_token = _current_deadline.set(deadline)
+
+    try:
+        yield
+    finally:
+        _current_deadline.reset(reset_token)
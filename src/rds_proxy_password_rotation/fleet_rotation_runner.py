@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Semaphore
+from typing import Iterable, Iterator
+from uuid import uuid4
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.async_password_rotation_application import RotationStepError
+from rds_proxy_password_rotation.bounded_executor import map_as_completed
+from rds_proxy_password_rotation.model import RotationStep, PasswordStage, PasswordRotationResult, SecretRotationOutcome
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import PasswordService
+
+
+class FleetRotationRunner:
+    """
+    Rotates many secrets from one process. Every secret runs through all rotation steps, i.e. the runner does the job of
+    Secrets Manager triggering the Lambda function once per step.
+
+    The secrets are rotated by a bounded worker pool. Rotations of secrets on the same database host are limited
+    separately, so a host is not flooded with password changes.
+    """
+
+    def __init__(self, application: PasswordRotationApplication, password_service: PasswordService, logger: Logger,
+                 max_workers: int = 16, max_concurrent_rotations_per_host: int = 2, single_invocation: bool = False):
+        """
+        :param max_workers: secrets rotated concurrently
+        :param max_concurrent_rotations_per_host: secrets rotated concurrently on the same database host and port
+        :param single_invocation: executes all steps of a secret with one call sharing the metadata and credentials read
+                                  instead of one call per step
+        """
+        self.application = application
+        self.password_service = password_service
+        self.logger = logger
+        self.max_workers = max_workers
+        self.max_concurrent_rotations_per_host = max_concurrent_rotations_per_host
+        self.single_invocation = single_invocation
+
+        self.__lock = Lock()
+        self.__host_semaphores: dict[tuple[str, int], Semaphore] = {}
+
+    def rotate_secrets(self, secret_ids: Iterable[str]) -> Iterator[SecretRotationOutcome]:
+        """
+        Yields the outcome of every rotation as soon as it is finished, i.e. not in the order of the secret ids. A failed
+        rotation does not stop the others. The secret ids are consumed as workers become free. Rotations not started yet
+        are cancelled when the iterator is closed.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fleet-rotation') as executor:
+            yield from map_as_completed(executor, self.__rotate_secret, secret_ids, 2 * self.max_workers)
+
+    def __rotate_secret(self, secret_id: str) -> SecretRotationOutcome:
+        start = time.perf_counter()
+        step = None
+
+        try:
+            credentials = self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT)
+
+            if credentials is None:
+                raise ValueError(f'no current credentials found for secret {secret_id}')
+
+            token = str(uuid4())
+
+            with self.__get_host_semaphore(credentials.database_host, credentials.database_port):
+                if self.single_invocation:
+                    result = self.application.rotate_secret_fully(secret_id, token)
+
+                    return SecretRotationOutcome(secret_id=secret_id, result=result, duration_seconds=time.perf_counter() - start)
+
+                for step in RotationStep:
+                    result = self.application.rotate_secret(step, secret_id, token)
+
+                    if result == PasswordRotationResult.NOTHING_TO_ROTATE:
+                        self.logger.info(f'{step.value}: nothing to rotate for secret {secret_id}')
+
+                        return SecretRotationOutcome(secret_id=secret_id, result=result, duration_seconds=time.perf_counter() - start)
+
+            return SecretRotationOutcome(secret_id=secret_id, result=PasswordRotationResult.STEP_EXECUTED, duration_seconds=time.perf_counter() - start)
+        except Exception as e:
+            if isinstance(e, RotationStepError):
+                step = e.step
+                e = e.__cause__
+
+            self.logger.exception(f'rotation of secret {secret_id} failed in step {step.value if step else "-"}')
+
+            return SecretRotationOutcome(secret_id=secret_id, failed_step=step, error=f'{type(e).__name__}: {e}', duration_seconds=time.perf_counter() - start)
+
+    def __get_host_semaphore(self, host: str, port: int) -> Semaphore:
+        with self.__lock:
+            if (host, port) not in self.__host_semaphores:
+                self.__host_semaphores[(host, port)] = Semaphore(self.max_concurrent_rotations_per_host)
+
+            return self.__host_semaphores[(host, port)]
@@ -0,0 +1,48 @@
+import secrets
+import string
+
+from rds_proxy_password_rotation.services import PasswordGenerator, EXCLUDED_PASSWORD_CHARACTERS
+
+
+class LocalPasswordGenerator(PasswordGenerator):
+    """
+    Generates passwords with a cryptographically secure random generator. Saves the get_random_password call to AWS
+    Secrets Manager.
+    """
+
+    def __init__(self, length: int = 32, exclude_characters: str = EXCLUDED_PASSWORD_CHARACTERS, include_lowercase: bool = True,
+                 include_uppercase: bool = True, include_digits: bool = True, include_punctuation: bool = True,
+                 require_each_included_type: bool = True):
+        character_types = [
+            characters for characters, included in [
+                (string.ascii_lowercase, include_lowercase),
+                (string.ascii_uppercase, include_uppercase),
+                (string.digits, include_digits),
+                (string.punctuation, include_punctuation),
+            ] if included
+        ]
+
+        self.character_types = [''.join(c for c in characters if c not in exclude_characters) for characters in character_types]
+        self.character_types = [characters for characters in self.character_types if characters]
+        self.alphabet = ''.join(self.character_types)
+        self.length = length
+        self.require_each_included_type = require_each_included_type
+
+        if not self.alphabet:
+            raise ValueError('No characters left to generate a password from')
+
+        if require_each_included_type and length < len(self.character_types):
+            raise ValueError(f'Password length {length} is too short to include each of the {len(self.character_types)} character types')
+
+    def generate_password(self) -> str:
+        password = []
+
+        if self.require_each_included_type:
+            password = [secrets.choice(characters) for characters in self.character_types]
+
+        password += [secrets.choice(self.alphabet) for _ in range(self.length - len(password))]
+
+        # the required characters must not always be at the beginning
+        secrets.SystemRandom().shuffle(password)
+
+        return ''.join(password)
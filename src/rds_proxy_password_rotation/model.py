@@ -1,3 +1,4 @@
+from datetime import datetime
 from enum import Enum
 from typing import List
 
@@ -16,6 +17,90 @@ class RotationStep(Enum):
     """Finish the rotation"""
 
 
+class PasswordRotationResult(Enum):
+    NOTHING_TO_ROTATE = "nothing_to_rotate"
+    STEP_EXECUTED = "step_executed"
+
+
+class SecretRotationOutcome(BaseModel):
+    """
+    Outcome of the rotation of one secret through all rotation steps.
+    """
+
+    secret_id: str
+    result: Optional[PasswordRotationResult] = None
+    """None if the rotation failed"""
+    failed_step: Optional[RotationStep] = None
+    error: Optional[str] = None
+    duration_seconds: float
+
+    def is_failed(self) -> bool:
+        return self.error is not None
+
+
+class CredentialKind(Enum):
+    CURRENT = "current"
+    """The AWSCURRENT version of the secret"""
+    ROTATION_USER = "rotation_user"
+    """The AWSPREVIOUS version of the secret if it belongs to another user of the rotation"""
+    PROXY = "proxy"
+    """A proxy secret of the secret"""
+
+
+class CredentialCheckResult(BaseModel):
+    """
+    Outcome of testing one set of credentials against its database.
+    """
+
+    secret_id: str
+    kind: CredentialKind
+    username: Optional[str] = None
+    """None if the credentials could not be read"""
+    database_host: Optional[str] = None
+    database_port: Optional[int] = None
+    connect_seconds: Optional[float] = None
+    """Time to connect and authenticate, None if the credentials were not tested"""
+    error: Optional[str] = None
+
+    def is_failed(self) -> bool:
+        return self.error is not None
+
+
+class StuckRotationClass(Enum):
+    APPLIED = "applied"
+    """The pending password is set in the database already, i.e. the rotation failed after set_secret"""
+    NOT_APPLIED = "not_applied"
+    """The pending password is not set in the database, i.e. the rotation failed before or in set_secret"""
+    ORPHANED = "orphaned"
+    """The pending version cannot be rotated to, e.g. it is unreadable or belongs to another database"""
+
+
+class SweepAction(Enum):
+    RESUMED = "resumed"
+    """The remaining steps were executed with the pending version"""
+    ROLLED_BACK = "rolled_back"
+    """The pending stage was removed, the current version stays"""
+    NONE = "none"
+    """Classified only (dry run)"""
+
+
+class StuckRotationOutcome(BaseModel):
+    """
+    Outcome of repairing one secret with an unfinished rotation.
+    """
+
+    secret_id: str
+    pending_version_id: str
+    classification: Optional[StuckRotationClass] = None
+    """None if the secret could not be classified"""
+    action: Optional[SweepAction] = None
+    """None if the repair failed"""
+    error: Optional[str] = None
+
+    def is_failed(self) -> bool:
+        return self.error is not None
+
+
 class PasswordStage(Enum):
     CURRENT = "CURRENT"
     PENDING = "PENDING"
@@ -54,7 +139,51 @@ class DatabaseCredentials(UserCredentials):
     database_port: int
     database_name: str
 
-    proxy_secret_ids: Optional[list[UserCredentials]] = None
+    proxy_secret_ids: Optional[list[str]] = None
+
+    proxy_secret_id_by_username: Optional[dict[str, Optional[str]]] = None
+    """Index of the proxy secrets by username. Built during create_secret to avoid fetching all proxy secrets in set_secret.
+    Users of the rotation without a proxy secret are indexed with None."""
+
+    def get_proxy_secret_id(self, username: str) -> str | None:
+        if self.proxy_secret_id_by_username is None:
+            return None
+
+        return self.proxy_secret_id_by_username.get(username)
+
+    def has_no_proxy_secret(self, username: str) -> bool:
+        """
+        :return: True if the index records that the user has no proxy secret
+        """
+        return self.proxy_secret_id_by_username is not None and username in self.proxy_secret_id_by_username and self.proxy_secret_id_by_username[username] is None
+
+    def has_valid_proxy_secret_index(self, username: str = None) -> bool:
+        """
+        The index is valid if it contains every proxy secret exactly once and the given user, either with its proxy
+        secret or without one. A user missing in the index usually means that the username of a proxy secret has
+        changed since the index was built.
+        """
+        if self.proxy_secret_id_by_username is None:
+            return False
+
+        indexed_secret_ids = [secret_id for secret_id in self.proxy_secret_id_by_username.values() if secret_id is not None]
+
+        if len(indexed_secret_ids) != len(set(indexed_secret_ids)) or set(indexed_secret_ids) != set(self.proxy_secret_ids or []):
+            return False
+
+        return username is None or username in self.proxy_secret_id_by_username
 
     def copy_and_replace_username(credentials: 'DatabaseCredentials', new_username: str) -> 'DatabaseCredentials':
         return credentials.model_copy(update={'username': new_username})
+
+
+class SecretInventoryRecord(BaseModel):
+    arn: str
+    name: str
+    rotation_enabled: bool
+    pending_version_id: Optional[str] = None
+    """Version staged as AWSPENDING, i.e. a rotation was started but not finished. It may be AWSCURRENT already if
+    finish_secret was interrupted."""
+    last_rotated_date: Optional[datetime] = None
+    rotation_type: Optional[PasswordType] = None
+    """None if the value was not fetched or the secret is not rotated by this project"""
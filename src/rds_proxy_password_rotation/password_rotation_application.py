@@ -1,81 +1,93 @@
-from enum import Enum
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Coroutine, Any, TypeVar
 
 from aws_lambda_powertools import Logger
 
-from rds_proxy_password_rotation.model import RotationStep, PasswordStage
-from rds_proxy_password_rotation.services import PasswordService, DatabaseService
+from rds_proxy_password_rotation.async_password_rotation_application import AsyncPasswordRotationApplication
+from rds_proxy_password_rotation.deadline import Deadline
+from rds_proxy_password_rotation.model import RotationStep, PasswordRotationResult
+from rds_proxy_password_rotation.services import PasswordService, DatabaseService, Instrumentation
+from rds_proxy_password_rotation.threaded_services import ThreadedPasswordService, ThreadedDatabaseService
 
-
-class PasswordRotationResult(Enum):
-    NOTHING_TO_ROTATE = "nothing_to_rotate"
-    STEP_EXECUTED = "step_executed"
+R = TypeVar('R')
 
 
 class PasswordRotationApplication:
-    def __init__(self, password_service: PasswordService, database_service: DatabaseService, logger: Logger):
+    """
+    Blocking API of the rotation. The steps are executed by the `AsyncPasswordRotationApplication` with the blocking
+    service calls running in a thread pool. Every calling thread gets an event loop which is reused by its following
+    calls, e.g. during warm invocations.
+
+    `close` (or leaving the `with` block) shuts down the thread pool and closes the event loops.
+    """
+
+    def __init__(self, password_service: PasswordService, database_service: DatabaseService, logger: Logger, max_concurrent_proxy_secret_lookups: int = 8,
+                 max_workers: int = None, instrumentation: Instrumentation = None):
+        """
+        :param max_workers: threads executing the blocking service calls. Defaults to one per concurrent proxy secret lookup.
+        """
         self.password_service = password_service
         self.database_service = database_service
         self.logger = logger
 
-    def rotate_secret(self, step: RotationStep, secret_id: str, token: str) -> PasswordRotationResult:
-        if not self.password_service.is_rotation_enabled(secret_id):
-            self.logger.warning("Rotation is not enabled for the secret %s", secret_id)
-            return PasswordRotationResult.NOTHING_TO_ROTATE
-
-        if step != RotationStep.CREATE_SECRET and not self.password_service.ensure_valid_secret_state(secret_id, token):
-            return PasswordRotationResult.NOTHING_TO_ROTATE
+        self.executor = ThreadPoolExecutor(max_workers=max_workers if max_workers is not None else max(2, max_concurrent_proxy_secret_lookups), thread_name_prefix='password-rotation')
+        self.async_application = AsyncPasswordRotationApplication(
+            ThreadedPasswordService(password_service, self.executor),
+            ThreadedDatabaseService(database_service, self.executor),
+            logger,
+            max_concurrent_proxy_secret_lookups,
+            instrumentation)
 
-        match step:
-            case RotationStep.CREATE_SECRET:
-                self.__create_secret(secret_id, token)
-            case RotationStep.SET_SECRET:
-                self.__set_secret(secret_id, token)
-            case RotationStep.TEST_SECRET:
-                self.__test_secret(secret_id, token)
-            case RotationStep.FINISH_SECRET:
-                self.__finish_secret(secret_id, token)
-            case _:
-                raise ValueError(f"Invalid rotation step: {step}")
+        self.__thread_state = threading.local()
+        self.__event_loops: list[asyncio.AbstractEventLoop] = []
+        self.__event_loops_lock = threading.Lock()
 
-        return PasswordRotationResult.STEP_EXECUTED
+    def __enter__(self) -> 'PasswordRotationApplication':
+        return self
 
-    def __finish_secret(self, secret_id: str, token: str):
-        self.password_service.make_new_credentials_current(secret_id, token)
+    def __exit__(self, *args):
+        self.close()
 
-    def __test_secret(self, secret_id: str, token: str):
-        pending_credential = self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token)
-        self.database_service.test_user_credentials(pending_credential)
+    def rotate_secret(self, step: RotationStep, secret_id: str, token: str, deadline: Deadline = None) -> PasswordRotationResult:
+        return self.__run(self.async_application.rotate_secret(step, secret_id, token, deadline))
 
-    def __set_secret(self, secret_id: str, token: str):
-        pending_credential = self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token)
-        current_credential = self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT)
+    def rotate_secret_fully(self, secret_id: str, token: str = None, deadline: Deadline = None) -> PasswordRotationResult:
+        """
+        Executes all rotation steps in one go, see `AsyncPasswordRotationApplication.rotate_secret_fully`.
+        """
+        return self.__run(self.async_application.rotate_secret_fully(secret_id, token, deadline))
 
-        proxy_secret_id = None
-        proxy_secret = None
+    def close(self):
+        """
+        Waits for the running service calls. The application must not be used afterwards.
+        """
+        self.executor.shutdown(wait=True)
 
-        for secret_id in current_credential.proxy_secret_ids:
-            proxy_secret = self.password_service.get_user_credentials(secret_id, PasswordStage.CURRENT)
-            if proxy_secret.username == pending_credential.username:
-                proxy_secret_id = secret_id
-                break
+        with self.__event_loops_lock:
+            event_loops, self.__event_loops = self.__event_loops, []
 
-        self.database_service.change_user_credentials(current_credential, pending_credential.password)
+        for event_loop in event_loops:
+            event_loop.close()
 
-        # database and proxy user credentials have to be in sync as the proxy user is used to connect to the database
-        if proxy_secret_id is not None:
-            self.password_service.set_credentials(secret_id, token, proxy_secret)
+    def __run(self, coroutine: Coroutine[Any, Any, R]) -> R:
+        event_loop = getattr(self.__thread_state, 'event_loop', None)
 
-        self.logger.info(f'set_secret: successfully set password for user {pending_credential.username} for secret {secret_id}')
+        if event_loop is None:
+            event_loop = self.__thread_state.event_loop = asyncio.new_event_loop()
 
-    def __create_secret(self, secret_id: str, token: str):
-        """
-        Creates a new version of the secret with the password to rotate to unless a version tagged with AWSPENDING
-        already exists.
-        """
+            with self.__event_loops_lock:
+                self.__event_loops.append(event_loop)
 
-        if self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token) is not None:
-            return
+        try:
+            return event_loop.run_until_complete(coroutine)
+        finally:
+            # like asyncio.run: nothing started by this call may run into the next one
+            remaining_tasks = asyncio.all_tasks(event_loop)
 
-        credentials_to_rotate = self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT)
+            for task in remaining_tasks:
+                task.cancel()
 
-        self.password_service.set_new_pending_password(secret_id, token, credentials_to_rotate)
+            if remaining_tasks:
+                event_loop.run_until_complete(asyncio.gather(*remaining_tasks, return_exceptions=True))
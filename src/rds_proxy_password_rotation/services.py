@@ -1,9 +1,29 @@
+import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
 
 from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, UserCredentials, Credentials
 
+EXCLUDED_PASSWORD_CHARACTERS = ':/@"\'\\'
+"""Characters not allowed in passwords as they break connection strings."""
+
 
 class PasswordService(ABC):
+    def begin_request_scope(self):
+        """
+        Called before a rotation step is executed. Implementations may cache data which is valid for the duration of
+        the step only, e.g. the secret metadata.
+        """
+        pass
+
+    def end_request_scope(self):
+        """
+        Called after a rotation step has been executed. Drops everything cached since the last call of
+        `begin_request_scope`.
+        """
+        pass
+
     @abstractmethod
     def is_rotation_enabled(self, secret_id: str) -> bool:
         pass
@@ -12,6 +32,14 @@ class PasswordService(ABC):
     def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
         pass
 
+    @abstractmethod
+    def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        """
+        :return: True if the token is the current version and no stage of its rotation is left, False otherwise (also
+                 if the version does not exist)
+        """
+        pass
+
     @abstractmethod
     def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
         pass
@@ -32,6 +60,22 @@ class PasswordService(ABC):
     def make_new_credentials_current(self, secret_id: str, token: str):
         pass
 
+    @abstractmethod
+    def remove_pending_version(self, secret_id: str, token: str):
+        """
+        Aborts a rotation by removing the pending stage from the version. The version itself is kept.
+        """
+        pass
+
+
+class PasswordGenerator(ABC):
+    @abstractmethod
+    def generate_password(self) -> str:
+        pass
+
+    def generate_passwords(self, count: int) -> list[str]:
+        return [self.generate_password() for _ in range(count)]
+
 
 class DatabaseService(ABC):
     @abstractmethod
@@ -41,3 +85,121 @@ class DatabaseService(ABC):
     @abstractmethod
     def test_user_credentials(self, credentials: DatabaseCredentials):
         pass
+
+    def change_users_credentials(self, changes: list[tuple[DatabaseCredentials, str]]) -> list[Exception | None]:
+        """
+        Changes the passwords of several users. A failing change does not stop the others. Implementations may apply
+        the changes of users in the same database over one connection.
+
+        :param changes: old credentials and new password of every user
+        :return: per change (in the same order) None on success or the error
+        """
+        results = []
+
+        for old_credentials, new_password in changes:
+            try:
+                self.change_user_credentials(old_credentials, new_password)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+
+        return results
+
+
+class AsyncPasswordService(ABC):
+    """
+    Async counterpart of `PasswordService`.
+    """
+
+    def begin_request_scope(self):
+        pass
+
+    def end_request_scope(self):
+        pass
+
+    @abstractmethod
+    async def is_rotation_enabled(self, secret_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        pass
+
+    @abstractmethod
+    async def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        pass
+
+    @abstractmethod
+    async def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
+        pass
+
+    @abstractmethod
+    async def set_credentials(self, secret_id: str, token: str, credential: Credentials):
+        pass
+
+    @abstractmethod
+    async def make_new_credentials_current(self, secret_id: str, token: str):
+        pass
+
+    @abstractmethod
+    async def remove_pending_version(self, secret_id: str, token: str):
+        pass
+
+
+class AsyncDatabaseService(ABC):
+    """
+    Async counterpart of `DatabaseService`.
+    """
+
+    @abstractmethod
+    async def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        pass
+
+    @abstractmethod
+    async def test_user_credentials(self, credentials: DatabaseCredentials):
+        pass
+
+
+class Instrumentation(ABC):
+    """
+    Receives the metrics of the rotation. Implementations have to be thread-safe.
+    """
+
+    @abstractmethod
+    def record_duration(self, name: str, seconds: float, dimensions: dict[str, str] = None):
+        pass
+
+    @abstractmethod
+    def increment(self, name: str, dimensions: dict[str, str] = None):
+        pass
+
+    def flush(self):
+        """
+        Called after every rotation step. Implementations buffering the metrics emit them here.
+        """
+        pass
+
+    @contextmanager
+    def measure(self, name: str, dimensions: dict[str, str] = None) -> Iterator[None]:
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record_duration(name, time.perf_counter() - start, dimensions)
+
+
+class NoInstrumentation(Instrumentation):
+    def record_duration(self, name: str, seconds: float, dimensions: dict[str, str] = None):
+        pass
+
+    def increment(self, name: str, dimensions: dict[str, str] = None):
+        pass
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.async_password_rotation_application import RotationStepError
+from rds_proxy_password_rotation.bounded_executor import map_as_completed
+from rds_proxy_password_rotation.model import RotationStep, PasswordStage, SecretInventoryRecord, StuckRotationClass, SweepAction, StuckRotationOutcome
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import PasswordService, DatabaseService
+
+
+class StuckRotationSweeper:
+    """
+    Repairs secrets left with an AWSPENDING version by a failed rotation. Every secret is classified by testing the
+    pending and the current credentials against the database:
+
+    - applied: the pending credentials work. The rotation is resumed with test_secret.
+    - not applied: only the current credentials work. The rotation is resumed or rolled back.
+    - orphaned: the pending version is unreadable or belongs to another database. The pending stage is removed.
+
+    Resuming executes the steps with the pending version as token, i.e. create_secret keeps the pending version. The
+    database service must not reuse connections, otherwise the classification relies on outdated logins.
+    """
+
+    def __init__(self, application: PasswordRotationApplication, password_service: PasswordService, database_service: DatabaseService, logger: Logger,
+                 max_workers: int = 16, roll_back_not_applied: bool = False, dry_run: bool = False):
+        """
+        :param max_workers: secrets repaired concurrently
+        :param roll_back_not_applied: removes the pending stage of rotations not applied to the database instead of resuming them
+        :param dry_run: classifies the secrets without changing anything
+        """
+        self.application = application
+        self.password_service = password_service
+        self.database_service = database_service
+        self.logger = logger
+        self.max_workers = max_workers
+        self.roll_back_not_applied = roll_back_not_applied
+        self.dry_run = dry_run
+
+    def sweep(self, records: Iterable[SecretInventoryRecord]) -> Iterator[StuckRotationOutcome]:
+        """
+        Yields the outcome of every secret with a pending version as soon as it is repaired. Records without a pending
+        version are skipped. The records are consumed as workers become free. Repairs not started yet are cancelled when
+        the iterator is closed.
+        """
+        stuck_records = (record for record in records if record.pending_version_id is not None)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stuck-rotation-sweep') as executor:
+            yield from map_as_completed(executor, lambda record: self.__repair(record.arn, record.pending_version_id), stuck_records, 2 * self.max_workers)
+
+    def classify(self, secret_id: str, token: str) -> StuckRotationClass:
+        """
+        :raises ConnectionError: if neither the pending nor the current credentials work, e.g. the database is not reachable
+        """
+        try:
+            pending_credentials = self.password_service.get_database_credentials(secret_id, PasswordStage.PENDING, token)
+        except ValueError as e:
+            # unparseable secret value (pydantic's ValidationError is a ValueError)
+            self.logger.warning(f'pending version {token} of secret {secret_id} is unreadable: {e}')
+
+            return StuckRotationClass.ORPHANED
+
+        current_credentials = self.password_service.get_database_credentials(secret_id, PasswordStage.CURRENT)
+
+        if pending_credentials is None or current_credentials is None:
+            return StuckRotationClass.ORPHANED
+
+        pending_database = (pending_credentials.database_host, pending_credentials.database_port, pending_credentials.database_name)
+        current_database = (current_credentials.database_host, current_credentials.database_port, current_credentials.database_name)
+
+        if pending_database != current_database:
+            self.logger.warning(f'pending version {token} of secret {secret_id} belongs to database {pending_database}, the current version to {current_database}')
+
+            return StuckRotationClass.ORPHANED
+
+        try:
+            self.database_service.test_user_credentials(pending_credentials)
+
+            return StuckRotationClass.APPLIED
+        except Exception as pending_error:
+            try:
+                self.database_service.test_user_credentials(current_credentials)
+            except Exception as current_error:
+                raise ConnectionError(f'neither the pending ({pending_error}) nor the current credentials ({current_error}) work') from current_error
+
+            return StuckRotationClass.NOT_APPLIED
+
+    def __repair(self, secret_id: str, token: str) -> StuckRotationOutcome:
+        outcome = StuckRotationOutcome(secret_id=secret_id, pending_version_id=token)
+
+        try:
+            outcome.classification = self.classify(secret_id, token)
+
+            if self.dry_run:
+                outcome.action = SweepAction.NONE
+            elif outcome.classification == StuckRotationClass.ORPHANED or (outcome.classification == StuckRotationClass.NOT_APPLIED and self.roll_back_not_applied):
+                self.password_service.remove_pending_version(secret_id, token)
+                outcome.action = SweepAction.ROLLED_BACK
+            elif outcome.classification == StuckRotationClass.APPLIED:
+                # set_secret must not run again: it logs in with the current credentials which do not work anymore
+                for step in (RotationStep.TEST_SECRET, RotationStep.FINISH_SECRET):
+                    try:
+                        self.application.rotate_secret(step, secret_id, token)
+                    except Exception as e:
+                        raise RotationStepError(step, secret_id) from e
+
+                outcome.action = SweepAction.RESUMED
+            else:
+                self.application.rotate_secret_fully(secret_id, token)
+                outcome.action = SweepAction.RESUMED
+
+            if outcome.action == SweepAction.RESUMED and not self.password_service.is_rotation_finished(secret_id, token):
+                # e.g. the rotation has been disabled meanwhile
+                raise RuntimeError(f'version {token} of secret {secret_id} is still pending after resuming the rotation')
+
+            self.logger.info(f'stuck rotation of secret {secret_id} ({outcome.classification.value}): {outcome.action.value}')
+        except Exception as e:
+            step = None
+
+            if isinstance(e, RotationStepError):
+                step = e.step
+                e = e.__cause__
+
+            self.logger.exception(f'repair of the stuck rotation of secret {secret_id} failed{f" in step {step.value}" if step else ""}')
+
+            outcome.error = f'{type(e).__name__}: {e}'
+
+        return outcome
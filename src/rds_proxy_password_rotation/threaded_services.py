@@ -0,0 +1,74 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from contextvars import copy_context
+from typing import Callable, TypeVar
+
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, UserCredentials, Credentials
+from rds_proxy_password_rotation.services import AsyncPasswordService, PasswordService, AsyncDatabaseService, DatabaseService
+
+R = TypeVar('R')
+
+
+async def run_in_executor(executor: Executor, function: Callable[..., R], *args) -> R:
+    # unlike asyncio.to_thread, run_in_executor does not copy the context, but it carries the request scope
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(copy_context().run, function, *args))
+
+
+class ThreadedPasswordService(AsyncPasswordService):
+    """
+    Runs the blocking calls of a `PasswordService` in a thread pool, so they can be awaited concurrently.
+    """
+
+    def __init__(self, password_service: PasswordService, executor: Executor):
+        self.password_service = password_service
+        self.executor = executor
+
+    def begin_request_scope(self):
+        self.password_service.begin_request_scope()
+
+    def end_request_scope(self):
+        self.password_service.end_request_scope()
+
+    async def is_rotation_enabled(self, secret_id: str) -> bool:
+        return await run_in_executor(self.executor, self.password_service.is_rotation_enabled, secret_id)
+
+    async def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
+        return await run_in_executor(self.executor, self.password_service.ensure_valid_secret_state, secret_id, token)
+
+    async def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        return await run_in_executor(self.executor, self.password_service.is_rotation_finished, secret_id, token)
+
+    async def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        return await run_in_executor(self.executor, self.password_service.get_database_credentials, secret_id, stage, token)
+
+    async def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        return await run_in_executor(self.executor, self.password_service.get_user_credentials, secret_id, stage, token)
+
+    async def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
+        return await run_in_executor(self.executor, self.password_service.set_new_pending_password, secret_id, token, credential)
+
+    async def set_credentials(self, secret_id: str, token: str, credential: Credentials):
+        return await run_in_executor(self.executor, self.password_service.set_credentials, secret_id, token, credential)
+
+    async def make_new_credentials_current(self, secret_id: str, token: str):
+        return await run_in_executor(self.executor, self.password_service.make_new_credentials_current, secret_id, token)
+
+    async def remove_pending_version(self, secret_id: str, token: str):
+        return await run_in_executor(self.executor, self.password_service.remove_pending_version, secret_id, token)
+
+
+class ThreadedDatabaseService(AsyncDatabaseService):
+    """
+    Runs the blocking calls of a `DatabaseService` in a thread pool, so they can be awaited concurrently.
+    """
+
+    def __init__(self, database_service: DatabaseService, executor: Executor):
+        self.database_service = database_service
+        self.executor = executor
+
+    async def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        return await run_in_executor(self.executor, self.database_service.change_user_credentials, old_credentials, new_password)
+
+    async def test_user_credentials(self, credentials: DatabaseCredentials):
+        return await run_in_executor(self.executor, self.database_service.test_user_credentials, credentials)
@@ -0,0 +1,149 @@
+"""
+Measures the cold start cost of the Lambda entry point and the warm latency of the rotation steps. Every cold start
+measurement runs in a fresh interpreter. The results are written as JSON to track regressions between releases:
+
+    PYTHONPATH=src python tests/benchmark/cold_start_benchmark.py --output cold_start.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+from aws_lambda_powertools import Logger
+
+from fakes import InMemorySecretsManagerClient, InMemoryDatabaseService
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType, RotationStep
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+
+DEPENDENCIES = ['boto3', 'psycopg', 'pydantic', 'aws_lambda_powertools', 'dependency_injector.containers']
+
+_IMPORT_PROBE = '''
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"import": time.perf_counter() - start}}))
+'''
+
+_HANDLER_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import rds_proxy_password_rotation.adapter.aws_lambda_function as handler_module
+imported = time.perf_counter()
+
+from rds_proxy_password_rotation.adapter.container import Container
+container = Container()
+constructed = time.perf_counter()
+
+container.wire(modules=[handler_module.__name__])
+wired = time.perf_counter()
+
+from aws_lambda_powertools.utilities.parser import parse
+from rds_proxy_password_rotation.adapter.aws_lambda_function_model import AwsSecretManagerRotationEvent
+parse(event={"Step": "create_secret", "SecretId": "secret", "ClientRequestToken": "token", "RotationToken": "token"}, model=AwsSecretManagerRotationEvent)
+parsed = time.perf_counter()
+
+print(json.dumps({
+    "handler_import": imported - start,
+    "container_construction": constructed - imported,
+    "container_wire": wired - constructed,
+    "first_event_validation": parsed - wired,
+    "loaded_modules": len(sys.modules),
+}))
+'''
+
+
+def _run_probe(code: str) -> dict:
+    environment = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'eu-central-1'))
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=environment)
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _summarize(samples: list[float]) -> dict:
+    samples_ms = sorted(sample * 1000 for sample in samples)
+
+    return {
+        'median_ms': statistics.median(samples_ms),
+        'p95_ms': samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))],
+        'min_ms': samples_ms[0],
+        'max_ms': samples_ms[-1],
+        'samples': len(samples_ms),
+    }
+
+
+def measure_cold_start(repetitions: int) -> dict:
+    imports = {}
+
+    for module in DEPENDENCIES:
+        imports[module] = _summarize([_run_probe(_IMPORT_PROBE.format(module=module))['import'] for _ in range(repetitions)])
+
+    handler_runs = [_run_probe(_HANDLER_PROBE) for _ in range(repetitions)]
+    phases = ['handler_import', 'container_construction', 'container_wire', 'first_event_validation']
+
+    return {
+        'dependency_imports': imports,
+        'handler': {phase: _summarize([run[phase] for run in handler_runs]) for phase in phases},
+        'loaded_modules': handler_runs[-1]['loaded_modules'],
+    }
+
+
+def measure_warm_invocations(rotations: int) -> dict:
+    client = InMemorySecretsManagerClient()
+    database_service = InMemoryDatabaseService()
+    # create_secret logs an error for the missing pending version on purpose
+    logger = Logger(level='CRITICAL')
+    application = PasswordRotationApplication(AwsSecretsManagerService(client, logger), database_service, logger)
+
+    credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+    client.add_secret('secret', credentials.model_dump_json())
+    database_service.passwords[credentials.username] = credentials.password
+
+    samples = {step: [] for step in RotationStep}
+
+    with application:
+        # the first rotation warms up the caches and the lazily imported modules
+        for rotation in range(rotations + 1):
+            token = str(uuid.uuid4())
+
+            for step in RotationStep:
+                start = time.perf_counter()
+                application.rotate_secret(step, 'secret', token)
+
+                if rotation > 0:
+                    samples[step].append(time.perf_counter() - start)
+
+    return {step.value: _summarize(samples[step]) for step in RotationStep}
+
+
+def run_benchmark(repetitions: int, rotations: int) -> dict:
+    return {
+        'python': platform.python_version(),
+        'cold_start': measure_cold_start(repetitions),
+        'warm_invocation': measure_warm_invocations(rotations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start and warm invocation benchmark of the Lambda entry point')
+    parser.add_argument('--repetitions', type=int, default=5, help='fresh interpreters per cold start measurement')
+    parser.add_argument('--rotations', type=int, default=100, help='full rotations for the warm invocation measurement')
+    parser.add_argument('--output', help='file to write the JSON results to. Defaults to stdout.')
+    args = parser.parse_args()
+
+    results = json.dumps(run_benchmark(args.repetitions, args.rotations), indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+from rds_proxy_password_rotation.adapter.in_memory_secrets_manager import InMemorySecretsManagerClient  # noqa: F401
+from rds_proxy_password_rotation.model import DatabaseCredentials
+from rds_proxy_password_rotation.services import DatabaseService
+
+
+class InMemoryDatabaseService(DatabaseService):
+    """
+    Database which only knows users and their passwords.
+    """
+
+    def __init__(self):
+        self.passwords: dict[str, str] = {}
+
+    def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        if self.passwords.get(old_credentials.username) != old_credentials.password:
+            raise ValueError(f'authentication failed for user {old_credentials.username}')
+
+        self.passwords[old_credentials.username] = new_password
+
+    def test_user_credentials(self, credentials: DatabaseCredentials) -> bool:
+        if self.passwords.get(credentials.username) != credentials.password:
+            raise ValueError(f'authentication failed for user {credentials.username}')
+
+        return True
@@ -0,0 +1,237 @@
+"""
+Measures the throughput of full rotations (create, set, test and finish) driven by `PasswordRotationApplication` for a
+number of secrets. Reports rotations per second, latency percentiles per step and Secrets Manager calls per rotation
+and compares them with the committed baseline:
+
+    PYTHONPATH=src python tests/benchmark/rotation_throughput_benchmark.py --secrets 1 100 10000
+    PYTHONPATH=src python tests/benchmark/rotation_throughput_benchmark.py --secrets 100 --database postgresql
+
+The PostgreSQL mode needs the database of `tests/docker-compose-infra.yml`. Use `--update-baseline` after an intended
+change of the results.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from collections import Counter
+
+from aws_lambda_powertools import Logger
+
+from fakes import InMemorySecretsManagerClient, InMemoryDatabaseService
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.container import Container
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType, RotationStep
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import DatabaseService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'rotation_throughput.json')
+
+DEFAULT_THROUGHPUT_TOLERANCE = 0.5
+"""Fraction the throughput may drop below the baseline. Generous, because the baseline is measured on another machine."""
+
+POSTGRESQL_ROOT_CREDENTIALS = DatabaseCredentials(username='postgres', password='postgres', database_host='localhost', database_port=5432,
+                                                  database_name='postgres', rotation_type=PasswordType.AWS_RDS)
+
+
+def _percentiles(samples: list[float]) -> dict:
+    samples_ms = sorted(sample * 1000 for sample in samples)
+
+    def percentile(fraction: float) -> float:
+        return samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * fraction))]
+
+    return {
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': samples_ms[-1],
+    }
+
+
+class _FakeDatabase:
+    def __init__(self, credentials: list[DatabaseCredentials]):
+        self.database_service = InMemoryDatabaseService()
+
+        for user_credentials in credentials:
+            self.database_service.passwords[user_credentials.username] = user_credentials.password
+
+    def __enter__(self) -> DatabaseService:
+        return self.database_service
+
+    def __exit__(self, *args):
+        pass
+
+
+class _PostgreSqlUsers:
+    """
+    Creates the users of the rotated secrets in the local PostgreSQL database and drops them afterwards.
+    """
+
+    def __init__(self, usernames: list[str]):
+        self.usernames = usernames
+
+    def __enter__(self) -> DatabaseService:
+        from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+
+        self.__execute('CREATE USER {} WITH PASSWORD {}')
+
+        return PostgreSqlDatabaseService(Logger(level='CRITICAL'))
+
+    def __exit__(self, *args):
+        self.__execute('DROP USER IF EXISTS {}')
+
+    def __execute(self, statement: str):
+        import psycopg
+        from psycopg import sql
+
+        from rds_proxy_password_rotation.adapter.postgresql_database_service import get_connect_string
+
+        with psycopg.connect(get_connect_string(POSTGRESQL_ROOT_CREDENTIALS), autocommit=True) as conn, conn.cursor() as cur:
+            for username in self.usernames:
+                cur.execute(sql.SQL(statement).format(sql.Identifier(username), sql.Literal('password')))
+
+
+def measure_rotations(secret_count: int, database: str = 'fake', latency: float = 0.0) -> dict:
+    """
+    :param database: `fake` (in memory) or `postgresql` (local database)
+    :param latency: seconds added to every Secrets Manager call
+    """
+    client = InMemorySecretsManagerClient(latency={'*': latency})
+    # create_secret logs an error for the missing pending version on purpose
+    logger = Logger(level='CRITICAL')
+    run_id = uuid.uuid4().hex[:8]
+    secret_credentials = {}
+
+    for index in range(secret_count):
+        credentials = POSTGRESQL_ROOT_CREDENTIALS.model_copy(update={'username': f'benchmark_{run_id}_{index}', 'password': 'password'})
+        secret_credentials[f'benchmark/{index}'] = credentials
+        client.add_secret(f'benchmark/{index}', credentials.model_dump_json())
+
+    if database == 'postgresql':
+        database_context = _PostgreSqlUsers([credentials.username for credentials in secret_credentials.values()])
+    else:
+        database_context = _FakeDatabase(secret_credentials.values())
+
+    # the password generator of the Lambda function, i.e. the API calls match the deployed rotation
+    password_service = AwsSecretsManagerService(client, logger, password_generator=Container().password_generator())
+
+    with database_context as database_service, PasswordRotationApplication(password_service, database_service, logger) as application:
+        step_samples = {step: [] for step in RotationStep}
+        step_calls = Counter()
+
+        start = time.perf_counter()
+
+        for secret_id in secret_credentials:
+            token = str(uuid.uuid4())
+
+            for step in RotationStep:
+                calls_before = client.call_counts.total()
+                step_start = time.perf_counter()
+
+                application.rotate_secret(step, secret_id, token)
+
+                step_samples[step].append(time.perf_counter() - step_start)
+                step_calls[step] += client.call_counts.total() - calls_before
+
+        duration = time.perf_counter() - start
+
+    return {
+        'secrets': secret_count,
+        'database': database,
+        'duration_s': duration,
+        'rotations_per_second': secret_count / duration,
+        'api_calls_per_rotation': client.call_counts.total() / secret_count,
+        'api_calls_by_operation': {operation: count / secret_count for operation, count in sorted(client.call_counts.items())},
+        'steps': {step.value: dict(_percentiles(step_samples[step]), api_calls=step_calls[step] / secret_count) for step in RotationStep},
+    }
+
+
+def baseline_key(results: dict) -> str:
+    return f"{results['database']}/{results['secrets']}"
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_with_baseline(results: dict, baseline: dict, throughput_tolerance: float | None = DEFAULT_THROUGHPUT_TOLERANCE) -> list[str]:
+    """
+    :param throughput_tolerance: None to compare the API calls only
+    :return: the regressions found, empty if there are none or no baseline exists for the results. The API calls must
+             not exceed the baseline at all as they do not depend on the machine.
+    """
+    expected = baseline.get('results', {}).get(baseline_key(results))
+
+    if expected is None:
+        return []
+
+    regressions = []
+    minimum_throughput = expected['rotations_per_second'] * (1 - throughput_tolerance) if throughput_tolerance is not None else 0.0
+
+    if results['rotations_per_second'] < minimum_throughput:
+        regressions.append(f"{baseline_key(results)}: {results['rotations_per_second']:.1f} rotations per second, baseline {expected['rotations_per_second']:.1f}, "
+                           f"minimum {minimum_throughput:.1f}")
+
+    if results['api_calls_per_rotation'] > expected['api_calls_per_rotation']:
+        regressions.append(f"{baseline_key(results)}: {results['api_calls_per_rotation']:.2f} API calls per rotation, baseline {expected['api_calls_per_rotation']:.2f}")
+
+    for step, step_results in results['steps'].items():
+        if step_results['api_calls'] > expected['steps'][step]['api_calls']:
+            regressions.append(f"{baseline_key(results)}: {step_results['api_calls']:.2f} API calls in {step}, baseline {expected['steps'][step]['api_calls']:.2f}")
+
+    return regressions
+
+
+def update_baseline(all_results: list[dict], path: str = BASELINE_PATH):
+    baseline = load_baseline(path) if os.path.exists(path) else {'results': {}}
+    baseline['python'] = platform.python_version()
+
+    for results in all_results:
+        baseline['results'][baseline_key(results)] = {
+            'rotations_per_second': round(results['rotations_per_second'], 1),
+            'api_calls_per_rotation': results['api_calls_per_rotation'],
+            'steps': {step: {'api_calls': step_results['api_calls']} for step, step_results in results['steps'].items()},
+        }
+
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput benchmark of full rotations')
+    parser.add_argument('--secrets', type=int, nargs='+', default=[1, 100, 10000], help='numbers of secrets to rotate, one run each')
+    parser.add_argument('--database', choices=['fake', 'postgresql'], default='fake', help='database the passwords are changed in')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every Secrets Manager call')
+    parser.add_argument('--throughput-tolerance', type=float, default=DEFAULT_THROUGHPUT_TOLERANCE, help='fraction the throughput may drop below the baseline')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results to the baseline instead of comparing them')
+    parser.add_argument('--output', help='file to write the JSON results to. Defaults to stdout.')
+    args = parser.parse_args()
+
+    all_results = [measure_rotations(secret_count, args.database, args.latency) for secret_count in args.secrets]
+    results = json.dumps({'python': platform.python_version(), 'runs': all_results}, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+    if args.update_baseline:
+        update_baseline(all_results)
+
+        return 0
+
+    regressions = [regression for results in all_results for regression in compare_with_baseline(results, load_baseline(), args.throughput_tolerance)]
+
+    for regression in regressions:
+        print(f'regression: {regression}', file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import json
+import os
+from unittest import TestCase
+
+from cold_start_benchmark import run_benchmark
+from rds_proxy_password_rotation.model import RotationStep
+
+
+class TestColdStartBenchmark(TestCase):
+    def test_should_measure_every_phase_when_run_benchmark(self):
+        # Given
+
+        # When
+        results = run_benchmark(repetitions=1, rotations=10)
+
+        # Then
+        self.assertEqual(set(results['cold_start']['handler'].keys()), {'handler_import', 'container_construction', 'container_wire', 'first_event_validation'})
+        self.assertEqual(set(results['warm_invocation'].keys()), {step.value for step in RotationStep})
+
+        # keep the results to compare them between releases
+        if os.environ.get('BENCHMARK_OUTPUT'):
+            with open(os.environ['BENCHMARK_OUTPUT'], 'w') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,43 @@
+import os
+from unittest import TestCase
+
+from rotation_throughput_benchmark import measure_rotations, compare_with_baseline, load_baseline
+from rds_proxy_password_rotation.model import RotationStep
+
+
+class TestRotationThroughputBenchmark(TestCase):
+    def test_should_not_regress_when_measure_rotations_given_baseline(self):
+        # Given
+        baseline = load_baseline()
+        # the throughput depends on the machine, so it is only compared if asked for
+        throughput_tolerance = float(os.environ['BENCHMARK_THROUGHPUT_TOLERANCE']) if 'BENCHMARK_THROUGHPUT_TOLERANCE' in os.environ else None
+
+        for secret_count in [1, 100]:
+            # When
+            results = measure_rotations(secret_count)
+
+            # Then
+            self.assertEqual(set(results['steps'].keys()), {step.value for step in RotationStep})
+            self.assertEqual(compare_with_baseline(results, baseline, throughput_tolerance), [])
+
+    def test_should_report_regressions_when_compare_with_baseline_given_slower_rotations_with_more_calls(self):
+        # Given
+        baseline = {'results': {'fake/10': {'rotations_per_second': 100.0, 'api_calls_per_rotation': 11.0, 'steps': {'create_secret': {'api_calls': 5.0}}}}}
+        results = {'database': 'fake', 'secrets': 10, 'rotations_per_second': 40.0, 'api_calls_per_rotation': 12.0, 'steps': {'create_secret': {'api_calls': 6.0}}}
+
+        # When
+        regressions = compare_with_baseline(results, baseline, throughput_tolerance=0.5)
+
+        # Then
+        self.assertEqual(len(regressions), 3)
+
+    def test_should_report_api_call_regressions_only_when_compare_with_baseline_given_no_throughput_tolerance(self):
+        # Given
+        baseline = {'results': {'fake/10': {'rotations_per_second': 100.0, 'api_calls_per_rotation': 11.0, 'steps': {'create_secret': {'api_calls': 5.0}}}}}
+        results = {'database': 'fake', 'secrets': 10, 'rotations_per_second': 1.0, 'api_calls_per_rotation': 12.0, 'steps': {'create_secret': {'api_calls': 5.0}}}
+
+        # When
+        regressions = compare_with_baseline(results, baseline, throughput_tolerance=None)
+
+        # Then
+        self.assertEqual(len(regressions), 1)
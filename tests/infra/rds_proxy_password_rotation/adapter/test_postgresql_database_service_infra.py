@@ -111,6 +111,66 @@ class TestAwsSecretsManagerService(TestCase):
 
         self.assertIn('password authentication failed for user', str(context.exception))
 
+    def test_should_change_all_passwords_when_change_users_credentials_given_users_in_the_same_database(self):
+        # Given
+        first_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_e', 'password': 'test_password'})
+        second_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_f', 'password': 'test_password'})
+
+        self.created_users.extend([first_credentials.username, second_credentials.username])
+
+        self.__create_user(self.conn, first_credentials)
+        self.__create_user(self.conn, second_credentials)
+
+        # When
+        # the first user is not privileged to change the password of the second one, i.e. it is changed separately
+        results = self.service.change_users_credentials([(first_credentials, 'new_test_password'), (second_credentials, 'new_test_password')])
+
+        # Then
+        self.assertEqual(results, [None, None])
+
+        with self.service._get_connection(first_credentials.model_copy(update={'password': 'new_test_password'})):
+            pass
+
+        with self.service._get_connection(second_credentials.model_copy(update={'password': 'new_test_password'})):
+            pass
+
+    def test_should_report_the_failed_change_only_when_change_users_credentials_given_one_user_does_not_exist(self):
+        # Given
+        existing_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_g', 'password': 'test_password'})
+        missing_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_h', 'password': 'test_password'})
+
+        self.created_users.append(existing_credentials.username)
+
+        self.__create_user(self.conn, existing_credentials)
+
+        # When
+        results = self.service.change_users_credentials([(existing_credentials, 'new_test_password'), (missing_credentials, 'new_test_password')])
+
+        # Then
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], psycopg.Error)
+
+    def test_should_change_the_other_passwords_when_change_users_credentials_given_first_user_has_wrong_password(self):
+        # Given
+        first_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_i', 'password': 'test_password'})
+        second_credentials = self.root_credentials.model_copy(update={'username': f'test_user_{uuid.uuid4()}_j', 'password': 'test_password'})
+
+        self.created_users.extend([first_credentials.username, second_credentials.username])
+
+        self.__create_user(self.conn, first_credentials)
+        self.__create_user(self.conn, second_credentials)
+
+        # When
+        results = self.service.change_users_credentials([(first_credentials.model_copy(update={'password': 'wrong_password'}), 'new_test_password'),
+                                                         (second_credentials, 'new_test_password')])
+
+        # Then
+        self.assertIsInstance(results[0], psycopg.OperationalError)
+        self.assertIsNone(results[1])
+
+        with self.service._get_connection(second_credentials.model_copy(update={'password': 'new_test_password'})):
+            pass
+
     @staticmethod
     def __create_user(conn: Connection, credentials: UserCredentials):
         with conn.cursor() as cur:
@@ -0,0 +1,83 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock, AsyncMock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.async_aws_secrets_manager import AsyncAwsSecretsManagerService
+from rds_proxy_password_rotation.model import PasswordStage
+
+
+class TestAsyncAwsSecretsManagerService(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = Mock()
+        self.client.describe_secret = AsyncMock(return_value={
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:secret',
+            'RotationEnabled': True,
+            'VersionIdsToStages': {
+                'current': ['AWSCURRENT'],
+                'token': ['AWSPENDING'],
+            }
+        })
+        self.client.get_secret_value = AsyncMock(return_value={
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:secret',
+            'VersionId': 'current',
+            'SecretString': '{"username": "admin", "password": "admin", "database_host": "localhost", "database_port": 5432, "database_name": "test", "rotation_type": "AWS RDS"}'
+        })
+        self.client.update_secret_version_stage = AsyncMock()
+
+        self.service = AsyncAwsSecretsManagerService(self.client, Mock(spec=Logger))
+
+    async def test_should_describe_the_secret_once_when_reading_metadata_concurrently_given_request_scope_is_active(self):
+        # Given
+        self.service.begin_request_scope()
+
+        # When
+        await asyncio.gather(
+            self.service.is_rotation_enabled('secret'),
+            self.service.ensure_valid_secret_state('secret', 'token'),
+            self.service.get_database_credentials('secret', PasswordStage.CURRENT))
+
+        # Then
+        self.client.describe_secret.assert_awaited_once()
+
+    async def test_should_read_the_secret_value_once_when_get_database_credentials_given_version_is_cached(self):
+        # Given
+        self.service.begin_request_scope()
+        await self.service.is_rotation_enabled('secret')
+        await self.service.get_database_credentials('secret', PasswordStage.CURRENT)
+
+        # When
+        result = await self.service.get_database_credentials('secret', PasswordStage.CURRENT)
+
+        # Then
+        self.assertEqual(result.username, 'admin')
+        self.client.get_secret_value.assert_awaited_once_with(SecretId='secret', VersionId='current')
+
+    async def test_should_not_describe_the_secret_when_get_user_credentials_given_secret_is_not_in_request_scope(self):
+        # Given
+        self.client.get_secret_value.return_value = {
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:proxy',
+            'VersionId': 'proxy-current',
+            'SecretString': '{"username": "admin", "password": "admin", "rotation_type": "AWS RDS"}'
+        }
+
+        self.service.begin_request_scope()
+        await self.service.is_rotation_enabled('secret')
+
+        # When
+        result = await self.service.get_user_credentials('proxy', PasswordStage.CURRENT)
+
+        # Then
+        self.assertEqual(result.username, 'admin')
+        self.client.describe_secret.assert_awaited_once_with(SecretId='secret')
+        self.client.get_secret_value.assert_awaited_once_with(SecretId='proxy', VersionStage='AWSCURRENT')
+
+    async def test_should_move_the_stages_when_make_new_credentials_current_given_token_is_pending(self):
+        # Given
+
+        # When
+        await self.service.make_new_credentials_current('secret', 'token')
+
+        # Then
+        self.assertEqual(self.client.update_secret_version_stage.await_count, 2)
@@ -1,6 +1,8 @@
 from unittest import TestCase
 
-from rds_proxy_password_rotation.adapter.aws_lambda_function_model import AwsRotationStep
+from aws_lambda_powertools.utilities.parser import parse
+
+from rds_proxy_password_rotation.adapter.aws_lambda_function_model import AwsRotationStep, AwsSecretManagerRotationEvent, FullRotationEvent
 from rds_proxy_password_rotation.model import RotationStep
 
 class TestAwsRotationStep(TestCase):
@@ -39,3 +41,26 @@ class TestAwsRotationStep(TestCase):
 
         # Then
         self.assertEqual(rotation_step, RotationStep.FINISH_SECRET)
+
+
+class TestFullRotationEvent(TestCase):
+    def test_should_parse_full_rotation_event_when_parse_given_rotation_mode(self):
+        # Given
+        event = {'RotationMode': 'full', 'SecretId': 'arn:secret'}
+
+        # When
+        parsed_event = parse(event=event, model=AwsSecretManagerRotationEvent | FullRotationEvent)
+
+        # Then
+        self.assertIsInstance(parsed_event, FullRotationEvent)
+        self.assertIsNone(parsed_event.client_request_token)
+
+    def test_should_parse_rotation_event_when_parse_given_step(self):
+        # Given
+        event = {'Step': 'set_secret', 'SecretId': 'arn:secret', 'ClientRequestToken': 'token', 'RotationToken': 'rotation_token'}
+
+        # When
+        parsed_event = parse(event=event, model=AwsSecretManagerRotationEvent | FullRotationEvent)
+
+        # Then
+        self.assertIsInstance(parsed_event, AwsSecretManagerRotationEvent)
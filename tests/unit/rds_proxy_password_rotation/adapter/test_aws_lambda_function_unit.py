@@ -0,0 +1,19 @@
+import json
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestAwsLambdaFunction(TestCase):
+    def test_should_not_load_heavy_modules_when_handler_module_is_imported(self):
+        # Given
+        # a fresh interpreter, otherwise the modules imported by other tests are visible
+        code = 'import json, sys; import rds_proxy_password_rotation.adapter.aws_lambda_function; print(json.dumps(list(sys.modules.keys())))'
+
+        # When
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        loaded_modules = json.loads(result.stdout.strip().splitlines()[-1])
+
+        # Then
+        for module in ['psycopg', 'boto3', 'mypy_boto3_secretsmanager']:
+            self.assertNotIn(module, loaded_modules)
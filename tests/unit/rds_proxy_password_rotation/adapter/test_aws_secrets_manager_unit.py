@@ -0,0 +1,136 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.in_memory_secrets_manager import InMemorySecretsManagerClient
+from rds_proxy_password_rotation.adapter.rate_limited_client import RateLimiter, RateLimitedSecretsManagerClient
+from rds_proxy_password_rotation.model import PasswordStage
+
+
+class TestAwsSecretsManagerService(TestCase):
+    def setUp(self):
+        self.client = Mock()
+        self.client.describe_secret.return_value = {
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:secret',
+            'RotationEnabled': True,
+            'VersionIdsToStages': {
+                'current': ['AWSCURRENT'],
+                'token': ['AWSPENDING'],
+            }
+        }
+
+        self.service = AwsSecretsManagerService(self.client, Mock(spec=Logger))
+
+    def test_should_describe_the_secret_once_when_reading_metadata_given_request_scope_is_active(self):
+        # Given
+        self.service.begin_request_scope()
+
+        # When
+        self.service.is_rotation_enabled('secret')
+        self.service.ensure_valid_secret_state('secret', 'token')
+
+        # Then
+        self.assertEqual(self.client.describe_secret.call_count, 1)
+
+    def test_should_describe_the_secret_each_time_when_reading_metadata_given_no_request_scope(self):
+        # Given
+
+        # When
+        self.service.is_rotation_enabled('secret')
+        self.service.ensure_valid_secret_state('secret', 'token')
+
+        # Then
+        self.assertEqual(self.client.describe_secret.call_count, 2)
+
+    def test_should_describe_the_secret_again_when_reading_metadata_given_stages_changed_in_request_scope(self):
+        # Given
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+
+        # When
+        self.service.make_new_credentials_current('secret', 'token')
+        self.service.is_rotation_enabled('secret')
+
+        # Then
+        self.assertEqual(self.client.describe_secret.call_count, 2)
+
+    def test_should_describe_the_secret_again_when_reading_metadata_given_request_scope_has_ended(self):
+        # Given
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+        self.service.end_request_scope()
+
+        # When
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+
+        # Then
+        self.assertEqual(self.client.describe_secret.call_count, 2)
+
+    def test_should_read_the_secret_value_once_when_get_database_credentials_given_version_was_read_in_previous_request_scope(self):
+        # Given
+        self.client.get_secret_value.return_value = {
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:secret',
+            'VersionId': 'current',
+            'SecretString': '{"username": "admin", "password": "admin", "database_host": "localhost", "database_port": 5432, "database_name": "test", "rotation_type": "AWS RDS"}'
+        }
+
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+        self.service.get_database_credentials('secret', PasswordStage.CURRENT)
+        self.service.end_request_scope()
+
+        # When
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+        result = self.service.get_database_credentials('secret', PasswordStage.CURRENT)
+
+        # Then
+        self.assertEqual(result.username, 'admin')
+        self.client.get_secret_value.assert_called_once_with(SecretId='secret', VersionId='current')
+
+    def test_should_not_describe_the_secret_when_get_user_credentials_given_secret_is_not_in_request_scope(self):
+        # Given
+        self.client.get_secret_value.return_value = {
+            'ARN': 'arn:aws:secretsmanager:eu-central-1:123456789012:secret:proxy',
+            'VersionId': 'proxy-current',
+            'SecretString': '{"username": "admin", "password": "admin", "rotation_type": "AWS RDS"}'
+        }
+
+        self.service.begin_request_scope()
+        self.service.is_rotation_enabled('secret')
+
+        # When
+        result = self.service.get_user_credentials('proxy', PasswordStage.CURRENT)
+
+        # Then
+        self.assertEqual(result.username, 'admin')
+        self.client.describe_secret.assert_called_once_with(SecretId='secret')
+        self.client.get_secret_value.assert_called_once_with(SecretId='proxy', VersionStage='AWSCURRENT')
+        self.assertIsNotNone(self.service.secret_value_cache.get('arn:aws:secretsmanager:eu-central-1:123456789012:secret:proxy', 'proxy-current', type(result)))
+
+    def test_should_return_none_when_get_rotation_type_given_secret_is_not_rotated_by_this_project(self):
+        # Given
+        self.client.get_secret_value.return_value = {'ARN': 'arn', 'VersionId': 'current', 'SecretString': '{"api_key": "secret"}'}
+
+        # When
+        result = self.service.get_rotation_type('secret')
+
+        # Then
+        self.assertIsNone(result)
+
+    def test_should_rate_limit_every_page_when_list_secret_ids_given_rate_limited_client(self):
+        # Given
+        client = InMemorySecretsManagerClient(page_size=2)
+        arns = [client.add_secret(f'secret{i}', '{}') for i in range(5)]
+        rate_limiter = RateLimiter({'list_secrets': 80})
+        service = AwsSecretsManagerService(RateLimitedSecretsManagerClient(client, rate_limiter), Mock(spec=Logger))
+
+        # When
+        result = list(service.list_secret_ids())
+
+        # Then
+        self.assertEqual(result, arns)
+        self.assertEqual(rate_limiter.calls, 3)
@@ -0,0 +1,81 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+import boto3
+from aws_lambda_powertools import Logger
+from botocore.awsrequest import AWSResponse
+
+from rds_proxy_password_rotation.adapter.botocore_metrics import BotocoreMetrics, LatencyHistogram
+
+
+class TestLatencyHistogram(TestCase):
+    def test_should_estimate_the_percentiles_within_five_percent_when_percentile_given_samples(self):
+        # Given
+        histogram = LatencyHistogram()
+
+        for milliseconds in range(1, 101):
+            histogram.record(milliseconds)
+
+        # When
+        p50 = histogram.percentile(50)
+        p99 = histogram.percentile(99)
+
+        # Then
+        self.assertAlmostEqual(p50, 50, delta=2.5)
+        self.assertAlmostEqual(p99, 99, delta=5)
+
+
+class _RawResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self):
+        yield self.body
+
+
+class TestBotocoreMetrics(TestCase):
+    def setUp(self):
+        self.client = boto3.client('secretsmanager', region_name='eu-central-1', aws_access_key_id='test', aws_secret_access_key='test')
+        self.metrics = BotocoreMetrics(Mock(spec=Logger))
+        self.metrics.register(self.client)
+
+        # answers the requests without sending them, but after the before-call and before the after-call event
+        self.responses = []
+        self.client.meta.events.register('before-send', lambda request, **kwargs: self.responses.pop(0))
+
+    def add_response(self, status_code: int, body: bytes):
+        self.responses.append(AWSResponse('https://secretsmanager', status_code, {'content-length': str(len(body))}, _RawResponse(body)))
+
+    def test_should_count_the_calls_per_operation_when_dump_given_calls_were_made(self):
+        # Given
+        self.add_response(200, b'{"ARN": "arn"}')
+        self.add_response(200, b'{"ARN": "arn"}')
+        self.add_response(400, b'{"__type": "ResourceNotFoundException"}')
+
+        self.client.describe_secret(SecretId='secret')
+        self.client.describe_secret(SecretId='secret')
+
+        with self.assertRaises(self.client.exceptions.ResourceNotFoundException):
+            self.client.get_secret_value(SecretId='secret')
+
+        # When
+        summary = self.metrics.dump()
+
+        # Then
+        self.assertEqual(summary['DescribeSecret']['calls'], 2)
+        self.assertEqual(summary['DescribeSecret']['errors'], 0)
+        self.assertEqual(summary['DescribeSecret']['response_bytes'], 28)
+        self.assertGreater(summary['DescribeSecret']['request_bytes'], 0)
+        self.assertEqual(summary['GetSecretValue']['errors'], 1)
+
+    def test_should_start_from_scratch_when_dump_given_reset(self):
+        # Given
+        self.add_response(200, b'{"ARN": "arn"}')
+        self.client.describe_secret(SecretId='secret')
+        self.metrics.dump()
+
+        # When
+        summary = self.metrics.dump()
+
+        # Then
+        self.assertEqual(summary, {})
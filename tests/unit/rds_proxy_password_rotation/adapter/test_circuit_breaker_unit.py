@@ -0,0 +1,125 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import psycopg
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.circuit_breaker import DatabaseCircuitBreaker, CircuitOpenError, CircuitState
+from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType
+
+
+class TestDatabaseCircuitBreaker(TestCase):
+    def test_should_fail_fast_when_before_connect_given_consecutive_failures_reached_threshold(self):
+        # Given
+        circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=2, cooldown=60)
+        circuit_breaker.record_failure('host', 5432)
+        circuit_breaker.record_failure('host', 5432)
+
+        # When / Then
+        with self.assertRaises(CircuitOpenError):
+            circuit_breaker.before_connect('host', 5432)
+
+        circuit_breaker.before_connect('other_host', 5432)
+
+    def test_should_let_one_probe_through_when_before_connect_given_cooldown_has_passed(self):
+        # Given
+        circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=1, cooldown=60)
+
+        with patch('rds_proxy_password_rotation.adapter.circuit_breaker.time.monotonic') as monotonic:
+            monotonic.return_value = 0
+            circuit_breaker.record_failure('host', 5432)
+            monotonic.return_value = 60
+
+            # When
+            circuit_breaker.before_connect('host', 5432)
+
+            # Then
+            self.assertEqual(circuit_breaker.get_state('host', 5432), CircuitState.HALF_OPEN)
+
+            with self.assertRaises(CircuitOpenError):
+                circuit_breaker.before_connect('host', 5432)
+
+    def test_should_let_another_probe_through_when_before_connect_given_probe_has_no_outcome_after_cooldown(self):
+        # Given
+        circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=1, cooldown=60)
+
+        with patch('rds_proxy_password_rotation.adapter.circuit_breaker.time.monotonic') as monotonic:
+            monotonic.return_value = 0
+            circuit_breaker.record_failure('host', 5432)
+            monotonic.return_value = 60
+            circuit_breaker.before_connect('host', 5432)
+            monotonic.return_value = 120
+
+            # When
+            circuit_breaker.before_connect('host', 5432)
+
+            # Then
+            self.assertEqual(circuit_breaker.get_state('host', 5432), CircuitState.HALF_OPEN)
+
+            with self.assertRaises(CircuitOpenError):
+                circuit_breaker.before_connect('host', 5432)
+
+            circuit_breaker.record_success('host', 5432)
+            self.assertEqual(circuit_breaker.get_state('host', 5432), CircuitState.CLOSED)
+
+    def test_should_close_the_circuit_when_record_success_given_probe_succeeded(self):
+        # Given
+        circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=1, cooldown=0)
+        circuit_breaker.record_failure('host', 5432)
+        circuit_breaker.before_connect('host', 5432)
+
+        # When
+        circuit_breaker.record_success('host', 5432)
+
+        # Then
+        self.assertEqual(circuit_breaker.get_state('host', 5432), CircuitState.CLOSED)
+
+    def test_should_open_the_circuit_again_when_record_failure_given_probe_failed(self):
+        # Given
+        circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=3, cooldown=0)
+
+        for _ in range(3):
+            circuit_breaker.record_failure('host', 5432)
+
+        circuit_breaker.before_connect('host', 5432)
+
+        # When
+        circuit_breaker.record_failure('host', 5432)
+
+        # Then
+        self.assertEqual(circuit_breaker.get_state('host', 5432), CircuitState.OPEN)
+
+
+class TestPostgreSqlDatabaseServiceCircuitBreaker(TestCase):
+    def setUp(self):
+        self.credentials = DatabaseCredentials(username='user1', password='password', database_host='host', database_port=5432, database_name='test',
+                                               rotation_type=PasswordType.AWS_RDS)
+        self.circuit_breaker = DatabaseCircuitBreaker(Mock(spec=Logger), failure_threshold=2, cooldown=60)
+        self.service = PostgreSqlDatabaseService(Mock(spec=Logger), circuit_breaker=self.circuit_breaker)
+
+    def test_should_not_connect_when_test_user_credentials_given_host_was_unreachable_repeatedly(self):
+        # Given
+        with patch('psycopg.connect', side_effect=psycopg.OperationalError('connection timeout expired')) as connect:
+            for _ in range(2):
+                with self.assertRaises(psycopg.OperationalError):
+                    self.service.test_user_credentials(self.credentials)
+
+            # When / Then
+            with self.assertRaises(CircuitOpenError):
+                self.service.test_user_credentials(self.credentials)
+
+            self.assertEqual(connect.call_count, 2)
+
+    def test_should_keep_the_circuit_closed_when_test_user_credentials_given_authentication_failed(self):
+        # Given
+        error = psycopg.errors.InvalidPassword('password authentication failed')
+
+        with patch('psycopg.connect', side_effect=error):
+            # When
+            for _ in range(3):
+                with self.assertRaises(psycopg.OperationalError):
+                    self.service.test_user_credentials(self.credentials)
+
+        # Then
+        self.assertEqual(self.circuit_breaker.get_state('host', 5432), CircuitState.CLOSED)
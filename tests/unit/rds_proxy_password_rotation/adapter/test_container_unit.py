@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from rds_proxy_password_rotation.adapter.container import Container
+
+
+class TestContainer(TestCase):
+    def test_should_not_create_the_boto3_client_when_container_is_created(self):
+        # Given
+        with patch('boto3.client') as boto3_client:
+            # When
+            Container()
+
+            # Then
+            boto3_client.assert_not_called()
+
+    def test_should_create_the_boto3_client_once_when_application_is_requested_multiple_times(self):
+        # Given
+        container = Container()
+
+        with patch('boto3.client') as boto3_client:
+            # When
+            container.password_rotation_application()
+            container.password_rotation_application()
+
+            # Then
+            boto3_client.assert_called_once()
+
+    def test_should_configure_the_boto3_client_when_client_is_created(self):
+        # Given
+        container = Container()
+        container.config.secrets_manager.max_pool_connections.from_value(42)
+
+        with patch('boto3.client') as boto3_client:
+            # When
+            container.boto3_secrets_manager()
+
+            # Then
+            config = boto3_client.call_args.kwargs['config']
+            self.assertEqual(config.max_pool_connections, 42)
+            self.assertEqual(config.retries, {'max_attempts': 1, 'mode': 'standard'})
+
+    def test_should_rate_limit_the_boto3_client_when_secrets_manager_is_created(self):
+        # Given
+        container = Container()
+
+        with patch('boto3.client') as boto3_client:
+            # When
+            secrets_manager = container.secrets_manager()
+
+            # Then
+            self.assertIs(secrets_manager.client.client.client, boto3_client.return_value)
+            self.assertIs(secrets_manager.client.rate_limiter, container.rate_limiter())
+
+    def test_should_share_the_secret_value_cache_when_secrets_manager_is_created(self):
+        # Given
+        container = Container()
+
+        with patch('boto3.client'):
+            # When
+            secrets_manager = container.secrets_manager()
+
+            # Then
+            self.assertIs(secrets_manager.secret_value_cache, container.secret_value_cache())
@@ -0,0 +1,147 @@
+import time
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.in_memory_secrets_manager import InMemorySecretsManagerClient, ThrottlingException
+from rds_proxy_password_rotation.adapter.rate_limited_client import is_throttling_error
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType, RotationStep, PasswordRotationResult
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import DatabaseService
+
+
+class TestInMemorySecretsManagerClient(TestCase):
+    def setUp(self):
+        self.client = InMemorySecretsManagerClient()
+        self.arn = self.client.add_secret('secret', '{"username": "admin"}')
+        self.current_version = next(iter(self.client.get_stages('secret')))
+
+    def test_should_move_previous_stage_when_update_secret_version_stage_given_current_moved(self):
+        # Given
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='new', SecretString='{}', VersionStages=['AWSPENDING'])
+
+        # When
+        self.client.update_secret_version_stage(SecretId=self.arn, VersionStage='AWSCURRENT', MoveToVersionId='new', RemoveFromVersionId=self.current_version)
+
+        # Then
+        self.assertEqual(self.client.get_stages('secret'), {self.current_version: ['AWSPREVIOUS'], 'new': ['AWSPENDING', 'AWSCURRENT']})
+        self.assertIn('LastRotatedDate', self.client.describe_secret(SecretId='secret'))
+
+    def test_should_raise_exception_when_update_secret_version_stage_given_stage_attached_to_other_version(self):
+        # Given
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='new', SecretString='{}', VersionStages=['AWSPENDING'])
+
+        # When / Then
+        with self.assertRaises(InMemorySecretsManagerClient.exceptions.InvalidParameterException):
+            self.client.update_secret_version_stage(SecretId='secret', VersionStage='AWSCURRENT', MoveToVersionId='new')
+
+    def test_should_be_idempotent_when_put_secret_value_given_same_token_and_value(self):
+        # Given
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='new', SecretString='{}', VersionStages=['AWSPENDING'])
+
+        # When
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='new', SecretString='{}', VersionStages=['AWSPENDING'])
+
+        # Then
+        self.assertEqual(len(self.client.get_stages('secret')), 2)
+
+        with self.assertRaises(InMemorySecretsManagerClient.exceptions.ResourceExistsException):
+            self.client.put_secret_value(SecretId='secret', ClientRequestToken='new', SecretString='{"other": 1}', VersionStages=['AWSPENDING'])
+
+    def test_should_raise_resource_not_found_when_get_secret_value_given_unknown_stage(self):
+        # Given
+
+        # When / Then
+        with self.assertRaises(InMemorySecretsManagerClient.exceptions.ResourceNotFoundException) as context:
+            self.client.get_secret_value(SecretId='secret', VersionStage='AWSPENDING')
+
+        self.assertEqual(context.exception.response['Error']['Code'], 'ResourceNotFoundException')
+
+    def test_should_return_all_pages_when_paginate_given_name_filter(self):
+        # Given
+        client = InMemorySecretsManagerClient(page_size=2)
+
+        for name in ['app/a', 'app/b', 'app/c', 'other']:
+            client.add_secret(name, '{}')
+
+        # When
+        pages = list(client.get_paginator('list_secrets').paginate(Filters=[{'Key': 'name', 'Values': ['app/']}]))
+
+        # Then
+        self.assertEqual([[secret['Name'] for secret in page['SecretList']] for page in pages], [['app/a', 'app/b'], ['app/c']])
+        self.assertEqual(client.call_counts['list_secrets'], 2)
+
+    def test_should_throttle_reproducibly_when_calling_given_throttling_rate_and_seed(self):
+        # Given
+        def throttled_calls(client: InMemorySecretsManagerClient) -> list[bool]:
+            results = []
+
+            for _ in range(50):
+                try:
+                    client.describe_secret(SecretId='secret')
+                    results.append(False)
+                except ThrottlingException as e:
+                    self.assertTrue(is_throttling_error(e))
+                    results.append(True)
+
+            return results
+
+        first_client = InMemorySecretsManagerClient(throttling_rates={'describe_secret': 0.3}, seed=7)
+        first_client.add_secret('secret', '{}')
+        second_client = InMemorySecretsManagerClient(throttling_rates={'*': 0.3}, seed=7)
+        second_client.add_secret('secret', '{}')
+
+        # When
+        first_results = throttled_calls(first_client)
+        second_results = throttled_calls(second_client)
+
+        # Then
+        self.assertEqual(first_results, second_results)
+        self.assertEqual(first_client.throttled_counts['describe_secret'], sum(first_results))
+        self.assertEqual(first_client.call_counts['describe_secret'], 50)
+        self.assertTrue(0 < sum(first_results) < 50)
+
+    def test_should_add_latency_when_calling_given_latency_for_operation(self):
+        # Given
+        client = InMemorySecretsManagerClient(latency={'get_secret_value': 0.05})
+        client.add_secret('secret', '{}')
+
+        # When
+        start = time.perf_counter()
+        client.get_secret_value(SecretId='secret')
+        client.describe_secret(SecretId='secret')
+        duration = time.perf_counter() - start
+
+        # Then
+        self.assertGreaterEqual(duration, 0.05)
+        self.assertLess(duration, 0.1)
+
+    def test_should_stay_within_call_budget_when_rotating_given_password_rotation_application(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test',
+                                          rotation_type=PasswordType.AWS_RDS)
+        self.client.add_secret('rds', credentials.model_dump_json())
+        previous_version = next(iter(self.client.get_stages('rds')))
+
+        logger = Logger(level='CRITICAL')
+        application = PasswordRotationApplication(AwsSecretsManagerService(self.client, logger), Mock(spec=DatabaseService), logger)
+        budgets = {
+            RotationStep.CREATE_SECRET: 5,
+            RotationStep.SET_SECRET: 2,
+            RotationStep.TEST_SECRET: 2,
+            RotationStep.FINISH_SECRET: 3,
+        }
+
+        for step in RotationStep:
+            self.client.reset_call_counts()
+
+            # When
+            result = application.rotate_secret(step, 'rds', 'token')
+
+            # Then
+            self.assertEqual(result, PasswordRotationResult.STEP_EXECUTED)
+            self.assertLessEqual(self.client.call_counts.total(), budgets[step], f'{step.value}: {dict(self.client.call_counts)}')
+
+        self.assertEqual(self.client.get_stages('rds'), {previous_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
@@ -0,0 +1,58 @@
+from unittest import TestCase
+from unittest.mock import Mock, MagicMock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.instrumentation import EmfInstrumentation, InstrumentedSecretsManagerClient
+from rds_proxy_password_rotation.services import Instrumentation
+
+
+class TestEmfInstrumentation(TestCase):
+    def test_should_write_one_line_per_dimension_set_when_flush_given_recorded_metrics(self):
+        # Given
+        logger = Mock(spec=Logger)
+        instrumentation = EmfInstrumentation(logger, namespace='Test')
+        instrumentation.record_duration('StepDuration', 0.5, {'Step': 'set_secret'})
+        instrumentation.increment('SecretsManagerCalls', {'Operation': 'describe_secret'})
+        instrumentation.increment('SecretsManagerCalls', {'Operation': 'describe_secret'})
+
+        # When
+        instrumentation.flush()
+
+        # Then
+        lines = {tuple(call.kwargs['extra']['_aws']['CloudWatchMetrics'][0]['Dimensions'][0]): call.kwargs['extra'] for call in logger.info.call_args_list}
+
+        self.assertEqual(lines[('Step',)]['StepDuration'], [500.0])
+        self.assertEqual(lines[('Step',)]['Step'], 'set_secret')
+        self.assertEqual(lines[('Step',)]['_aws']['CloudWatchMetrics'][0]['Metrics'], [{'Name': 'StepDuration', 'Unit': 'Milliseconds'}])
+        self.assertEqual(lines[('Operation',)]['SecretsManagerCalls'], 2)
+        self.assertEqual(lines[('Operation',)]['_aws']['CloudWatchMetrics'][0]['Namespace'], 'Test')
+
+    def test_should_write_nothing_when_flush_given_metrics_were_flushed_already(self):
+        # Given
+        logger = Mock(spec=Logger)
+        instrumentation = EmfInstrumentation(logger)
+        instrumentation.increment('SecretsManagerCalls')
+        instrumentation.flush()
+        logger.reset_mock()
+
+        # When
+        instrumentation.flush()
+
+        # Then
+        logger.info.assert_not_called()
+
+
+class TestInstrumentedSecretsManagerClient(TestCase):
+    def test_should_count_and_measure_the_call_when_call_given_operation(self):
+        # Given
+        client = Mock()
+        instrumentation = MagicMock(spec=Instrumentation)
+
+        # When
+        InstrumentedSecretsManagerClient(client, instrumentation).describe_secret(SecretId='secret')
+
+        # Then
+        client.describe_secret.assert_called_once_with(SecretId='secret')
+        instrumentation.increment.assert_called_once_with('SecretsManagerCalls', {'Operation': 'describe_secret'})
+        instrumentation.measure.assert_called_once_with('SecretsManagerCallDuration', {'Operation': 'describe_secret'})
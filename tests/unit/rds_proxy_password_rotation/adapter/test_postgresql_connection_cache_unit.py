@@ -0,0 +1,128 @@
+from unittest import TestCase
+from unittest.mock import Mock, MagicMock, patch
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.postgresql_connection_cache import PostgreSqlConnectionCache
+from rds_proxy_password_rotation.adapter.postgresql_database_service import PostgreSqlDatabaseService
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType
+
+
+class TestPostgreSqlConnectionCache(TestCase):
+    credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+
+    @staticmethod
+    def __create_connection() -> MagicMock:
+        return MagicMock(closed=False, broken=False)
+
+    def test_should_return_the_connection_when_acquire_given_connection_was_released(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger))
+        connection = self.__create_connection()
+        cache.release(self.credentials, connection)
+
+        # When
+        result = cache.acquire(self.credentials)
+
+        # Then
+        self.assertIs(result, connection)
+
+    def test_should_return_none_when_acquire_given_connection_is_in_use(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger))
+        cache.release(self.credentials, self.__create_connection())
+        cache.acquire(self.credentials)
+
+        # When
+        result = cache.acquire(self.credentials)
+
+        # Then
+        self.assertIsNone(result)
+
+    def test_should_close_the_connection_when_acquire_given_different_password(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger))
+        connection = self.__create_connection()
+        cache.release(self.credentials, connection)
+
+        # When
+        result = cache.acquire(self.credentials.model_copy(update={'password': 'new_password'}))
+
+        # Then
+        self.assertIsNone(result)
+        connection.close.assert_called_once()
+
+    def test_should_close_the_connection_when_acquire_given_max_idle_time_exceeded(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger), max_idle_time=10)
+        connection = self.__create_connection()
+
+        with patch('time.monotonic', return_value=100):
+            cache.release(self.credentials, connection)
+
+        # When
+        with patch('time.monotonic', return_value=111):
+            result = cache.acquire(self.credentials)
+
+        # Then
+        self.assertIsNone(result)
+        connection.close.assert_called_once()
+
+    def test_should_close_the_connection_when_acquire_given_health_check_fails(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger), health_check_after=1)
+        connection = self.__create_connection()
+        connection.cursor.side_effect = Exception('server closed the connection unexpectedly')
+
+        with patch('time.monotonic', return_value=100):
+            cache.release(self.credentials, connection)
+
+        # When
+        with patch('time.monotonic', return_value=102):
+            result = cache.acquire(self.credentials)
+
+        # Then
+        self.assertIsNone(result)
+        connection.close.assert_called_once()
+
+    def test_should_close_the_connection_when_invalidate(self):
+        # Given
+        cache = PostgreSqlConnectionCache(Mock(spec=Logger))
+        connection = self.__create_connection()
+        cache.release(self.credentials, connection)
+
+        # When
+        cache.invalidate(self.credentials)
+
+        # Then
+        connection.close.assert_called_once()
+        self.assertIsNone(cache.acquire(self.credentials))
+
+    def test_should_connect_each_time_when_test_user_credentials_is_called_twice_given_connection_cache(self):
+        # Given
+        service = PostgreSqlDatabaseService(Mock(spec=Logger), PostgreSqlConnectionCache(Mock(spec=Logger)))
+        connections = [self.__create_connection(), self.__create_connection()]
+
+        with patch.object(service, '_get_connection', side_effect=connections) as get_connection:
+            # When
+            service.test_user_credentials(self.credentials)
+            service.test_user_credentials(self.credentials)
+
+            # Then
+            self.assertEqual(get_connection.call_count, 2)
+            connections[0].close.assert_called_once()
+            connections[1].close.assert_not_called()
+
+    def test_should_reuse_the_connection_of_test_user_credentials_when_change_user_credentials_given_connection_cache(self):
+        # Given
+        service = PostgreSqlDatabaseService(Mock(spec=Logger), PostgreSqlConnectionCache(Mock(spec=Logger)))
+        connection = self.__create_connection()
+
+        with patch.object(service, '_get_connection', return_value=connection) as get_connection, patch('psycopg.ClientCursor'):
+            service.test_user_credentials(self.credentials)
+
+            # When
+            service.change_user_credentials(self.credentials, 'new_password')
+
+            # Then
+            get_connection.assert_called_once()
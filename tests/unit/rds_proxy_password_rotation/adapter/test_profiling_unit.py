@@ -0,0 +1,97 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from rds_proxy_password_rotation.adapter.profiling import profile_invocations
+
+
+def handler(event, context):
+    time.sleep(0.05)
+
+    return event
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.output_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output_directory.cleanup()
+
+    def test_should_return_the_handler_as_is_when_profile_invocations_given_profiling_is_disabled(self):
+        # Given
+        with patch.dict(os.environ, {}, clear=True):
+            # When
+            result = profile_invocations(handler)
+
+        # Then
+        self.assertIs(result, handler)
+
+    def test_should_write_the_pstats_when_handler_is_invoked_given_cprofile_mode(self):
+        # Given
+        with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': 'cprofile', 'ROTATION_PROFILING_OUTPUT_DIRECTORY': self.output_directory.name}):
+            profiled_handler = profile_invocations(handler)
+
+        # When
+        result = profiled_handler('event', Mock(aws_request_id='request'))
+
+        # Then
+        self.assertEqual(result, 'event')
+        self.assertTrue(os.path.exists(os.path.join(self.output_directory.name, 'rotation-request.pstats')))
+
+    def test_should_write_the_collapsed_stacks_when_handler_is_invoked_given_sampling_mode(self):
+        # Given
+        with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': 'sampling', 'ROTATION_PROFILING_OUTPUT_DIRECTORY': self.output_directory.name,
+                                     'ROTATION_PROFILING_SAMPLING_INTERVAL': '0.001'}):
+            profiled_handler = profile_invocations(handler)
+
+        # When
+        profiled_handler('event', Mock(aws_request_id='request'))
+
+        # Then
+        with open(os.path.join(self.output_directory.name, 'rotation-request.collapsed')) as file:
+            self.assertIn('test_profiling_unit.py:handler', file.read())
+
+    def test_should_not_profile_when_handler_is_invoked_given_invocation_is_not_sampled(self):
+        # Given
+        with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': 'cprofile', 'ROTATION_PROFILING_SAMPLE_RATE': '0',
+                                     'ROTATION_PROFILING_OUTPUT_DIRECTORY': self.output_directory.name}):
+            profiled_handler = profile_invocations(handler)
+
+        # When
+        profiled_handler('event', Mock(aws_request_id='request'))
+
+        # Then
+        self.assertEqual(os.listdir(self.output_directory.name), [])
+
+    def test_should_return_the_handler_as_is_when_profile_invocations_given_invalid_mode(self):
+        # Given
+        with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': 'perf'}):
+            # When
+            result = profile_invocations(handler)
+
+        # Then
+        self.assertIs(result, handler)
+
+    def test_should_return_the_handler_as_is_when_profile_invocations_given_invalid_sample_rate(self):
+        # Given
+        with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': 'sampling', 'ROTATION_PROFILING_SAMPLE_RATE': '10%'}):
+            # When
+            result = profile_invocations(handler)
+
+        # Then
+        self.assertIs(result, handler)
+
+    def test_should_return_the_result_of_the_handler_when_handler_is_invoked_given_output_directory_does_not_exist(self):
+        # Given
+        for mode in ['cprofile', 'sampling']:
+            with patch.dict(os.environ, {'ROTATION_PROFILING_MODE': mode, 'ROTATION_PROFILING_OUTPUT_DIRECTORY': os.path.join(self.output_directory.name, 'missing')}):
+                profiled_handler = profile_invocations(handler)
+
+            # When
+            result = profiled_handler('event', Mock(aws_request_id='request'))
+
+            # Then
+            self.assertEqual(result, 'event')
@@ -0,0 +1,130 @@
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import Mock, AsyncMock
+
+from rds_proxy_password_rotation.adapter.rate_limited_client import RateLimiter, RateLimitedSecretsManagerClient, AsyncRateLimitedSecretsManagerClient
+from rds_proxy_password_rotation.deadline import Deadline, DeadlineExceededError, deadline_scope
+from rds_proxy_password_rotation.services import Instrumentation
+
+
+class ThrottlingError(Exception):
+    response = {'Error': {'Code': 'ThrottlingException'}}
+
+
+class TestRateLimitedSecretsManagerClient(TestCase):
+    def test_should_retry_the_call_when_call_given_throttling_error(self):
+        # Given
+        client = Mock()
+        client.get_secret_value.side_effect = [ThrottlingError(), {'SecretString': 'value'}]
+        rate_limiter = RateLimiter(base_delay=0.01)
+
+        # When
+        result = RateLimitedSecretsManagerClient(client, rate_limiter).get_secret_value(SecretId='secret')
+
+        # Then
+        self.assertEqual(result, {'SecretString': 'value'})
+        self.assertEqual(client.get_secret_value.call_count, 2)
+        self.assertEqual(rate_limiter.statistics()['throttled_calls'], 1)
+
+    def test_should_count_the_retry_when_call_given_throttling_error(self):
+        # Given
+        client = Mock()
+        client.get_secret_value.side_effect = [ThrottlingError(), {'SecretString': 'value'}]
+        instrumentation = Mock(spec=Instrumentation)
+
+        # When
+        RateLimitedSecretsManagerClient(client, RateLimiter(base_delay=0.01, instrumentation=instrumentation)).get_secret_value(SecretId='secret')
+
+        # Then
+        instrumentation.increment.assert_called_once_with('SecretsManagerRetries', {'Operation': 'get_secret_value'})
+
+    def test_should_count_from_scratch_when_statistics_are_read_given_reset(self):
+        # Given
+        client = Mock()
+        client.get_secret_value.side_effect = [ThrottlingError(), {'SecretString': 'value'}]
+        rate_limiter = RateLimiter(base_delay=0.01)
+        RateLimitedSecretsManagerClient(client, rate_limiter).get_secret_value(SecretId='secret')
+
+        # When
+        statistics = rate_limiter.statistics(reset=True)
+
+        # Then
+        self.assertEqual(statistics['calls'], 2)
+        self.assertEqual(statistics['throttled_calls'], 1)
+        self.assertEqual(rate_limiter.statistics(), {'calls': 0, 'throttled_calls': 0, 'wait_seconds': 0.0, 'work_seconds': 0.0})
+
+    def test_should_raise_the_error_when_call_given_retries_exhausted(self):
+        # Given
+        client = Mock()
+        client.get_secret_value.side_effect = ThrottlingError()
+
+        # When / Then
+        with self.assertRaises(ThrottlingError):
+            RateLimitedSecretsManagerClient(client, RateLimiter(max_retries=2, base_delay=0.001)).get_secret_value(SecretId='secret')
+
+        self.assertEqual(client.get_secret_value.call_count, 3)
+
+    def test_should_not_retry_the_call_when_call_given_other_error(self):
+        # Given
+        client = Mock()
+        client.get_secret_value.side_effect = ValueError()
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            RateLimitedSecretsManagerClient(client, RateLimiter()).get_secret_value(SecretId='secret')
+
+        self.assertEqual(client.get_secret_value.call_count, 1)
+
+    def test_should_wait_for_the_rate_limit_when_call_given_burst_is_used_up(self):
+        # Given
+        client = Mock()
+        rate_limiter = RateLimiter(rate_limits={'put_secret_value': 20})
+        rate_limited_client = RateLimitedSecretsManagerClient(client, rate_limiter)
+
+        # When
+        start = time.perf_counter()
+
+        for _ in range(25):
+            rate_limited_client.put_secret_value(SecretId='secret')
+
+        elapsed = time.perf_counter() - start
+
+        # Then
+        # 20 calls of the burst are free, the other 5 need 0.05 seconds each
+        self.assertGreater(elapsed, 0.2)
+        self.assertGreater(rate_limiter.statistics()['wait_seconds'], 0.2)
+
+    def test_should_pass_other_attributes_through_when_accessed(self):
+        # Given
+        client = Mock()
+
+        # When
+        exceptions = RateLimitedSecretsManagerClient(client, RateLimiter()).exceptions
+
+        # Then
+        self.assertIs(exceptions, client.exceptions)
+
+    def test_should_not_call_the_operation_when_call_given_deadline_has_passed(self):
+        # Given
+        client = Mock()
+
+        # When / Then
+        with deadline_scope(Deadline(0)), self.assertRaises(DeadlineExceededError):
+            RateLimitedSecretsManagerClient(client, RateLimiter()).get_secret_value(SecretId='secret')
+
+        client.get_secret_value.assert_not_called()
+
+
+class TestAsyncRateLimitedSecretsManagerClient(IsolatedAsyncioTestCase):
+    async def test_should_retry_the_call_when_call_given_throttling_error(self):
+        # Given
+        client = Mock()
+        client.describe_secret = AsyncMock(side_effect=[ThrottlingError(), {'ARN': 'arn'}])
+
+        # When
+        result = await AsyncRateLimitedSecretsManagerClient(client, RateLimiter(base_delay=0.01)).describe_secret(SecretId='secret')
+
+        # Then
+        self.assertEqual(result, {'ARN': 'arn'})
+        self.assertEqual(client.describe_secret.await_count, 2)
+
@@ -0,0 +1,63 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.secret_inventory_scanner import SecretInventoryScanner
+from rds_proxy_password_rotation.model import PasswordType
+
+
+class TestSecretInventoryScanner(TestCase):
+    def setUp(self):
+        self.secrets_manager = Mock(spec=AwsSecretsManagerService)
+        self.secrets_manager.list_secrets.return_value = iter([
+            {'ARN': 'arn1', 'Name': 'rds', 'RotationEnabled': True, 'SecretVersionsToStages': {'v1': ['AWSCURRENT']}},
+            {'ARN': 'arn2', 'Name': 'stuck', 'RotationEnabled': True, 'SecretVersionsToStages': {'v1': ['AWSCURRENT'], 'v2': ['AWSPENDING']}},
+            {'ARN': 'arn3', 'Name': 'other', 'SecretVersionsToStages': {'v1': ['AWSCURRENT', 'AWSPENDING']}},
+        ])
+        self.secrets_manager.get_rotation_type.side_effect = lambda arn: PasswordType.AWS_RDS if arn != 'arn3' else None
+
+        self.scanner = SecretInventoryScanner(self.secrets_manager, Mock(spec=Logger), max_concurrent_value_fetches=1)
+
+    def test_should_not_fetch_values_when_scan_given_no_rotation_type(self):
+        # Given
+
+        # When
+        records = list(self.scanner.scan(name_prefix='prefix', rotation_enabled=True))
+
+        # Then
+        self.assertEqual([record.name for record in records], ['rds', 'stuck'])
+        self.secrets_manager.list_secrets.assert_called_once_with('prefix')
+        self.secrets_manager.get_rotation_type.assert_not_called()
+
+    def test_should_return_unfinished_rotations_only_when_scan_given_pending_only(self):
+        # Given
+
+        # When
+        records = list(self.scanner.scan(pending_only=True))
+
+        # Then
+        self.assertEqual([(record.name, record.pending_version_id) for record in records], [('stuck', 'v2'), ('other', 'v1')])
+
+    def test_should_find_the_pending_version_when_scan_given_current_version_is_still_pending(self):
+        # Given
+        self.secrets_manager.list_secrets.return_value = iter([
+            {'ARN': 'arn1', 'Name': 'interrupted', 'RotationEnabled': True, 'SecretVersionsToStages': {'v1': ['AWSPREVIOUS'], 'v2': ['AWSCURRENT', 'AWSPENDING']}},
+        ])
+
+        # When
+        records = list(self.scanner.scan(pending_only=True))
+
+        # Then
+        self.assertEqual([record.pending_version_id for record in records], ['v2'])
+
+    def test_should_keep_the_order_when_scan_given_rotation_type(self):
+        # Given
+
+        # When
+        records = list(self.scanner.scan(rotation_type=PasswordType.AWS_RDS))
+
+        # Then
+        self.assertEqual([record.arn for record in records], ['arn1', 'arn2'])
+        self.assertTrue(all(record.rotation_type == PasswordType.AWS_RDS for record in records))
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from rds_proxy_password_rotation.adapter.secret_value_cache import SecretValueCache
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType, UserCredentials
+
+
+class TestSecretValueCache(TestCase):
+    credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+
+    def test_should_count_a_miss_when_get_given_version_is_not_cached(self):
+        # Given
+        cache = SecretValueCache()
+
+        # When
+        result = cache.get('arn', 'version', DatabaseCredentials)
+
+        # Then
+        self.assertIsNone(result)
+        self.assertEqual(cache.statistics()['misses'], 1)
+
+    def test_should_return_a_copy_when_get_given_version_is_cached(self):
+        # Given
+        cache = SecretValueCache()
+        cache.put('arn', 'version', self.credentials)
+
+        # When
+        result = cache.get('arn', 'version', DatabaseCredentials)
+        result.password = 'modified'
+
+        # Then
+        self.assertEqual(cache.get('arn', 'version', DatabaseCredentials).password, 'admin')
+        self.assertEqual(cache.statistics()['hits'], 2)
+
+    def test_should_not_return_the_value_when_get_given_version_is_cached_as_different_type(self):
+        # Given
+        cache = SecretValueCache()
+        cache.put('arn', 'version', self.credentials)
+
+        # When
+        result = cache.get('arn', 'version', UserCredentials)
+
+        # Then
+        self.assertIsNone(result)
+
+    def test_should_count_an_eviction_when_put_given_cache_is_full(self):
+        # Given
+        cache = SecretValueCache(maxsize=1)
+        cache.put('arn', 'version1', self.credentials)
+
+        # When
+        cache.put('arn', 'version2', self.credentials)
+
+        # Then
+        self.assertEqual(cache.statistics()['evictions'], 1)
+        self.assertIsNone(cache.get('arn', 'version1', DatabaseCredentials))
+
+    def test_should_keep_the_values_when_statistics_are_read_given_reset(self):
+        # Given
+        cache = SecretValueCache()
+        cache.put('arn', 'version', self.credentials)
+        cache.get('arn', 'version', DatabaseCredentials)
+
+        # When
+        statistics = cache.statistics(reset=True)
+
+        # Then
+        self.assertEqual(statistics['hits'], 1)
+        self.assertEqual(cache.statistics(), {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 1})
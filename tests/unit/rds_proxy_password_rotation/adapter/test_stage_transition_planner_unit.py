@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from rds_proxy_password_rotation.adapter.stage_transition_planner import plan_stage_transition, StageMove
+
+
+class TestStageTransitionPlanner(TestCase):
+    def test_should_move_current_and_remove_pending_when_plan_stage_transition_given_pending_token(self):
+        # Given
+        versions = {'previous': ['AWSPREVIOUS'], 'current': ['AWSCURRENT'], 'token': ['AWSPENDING']}
+
+        # When
+        stage_moves = plan_stage_transition(versions, 'token')
+
+        # Then
+        self.assertEqual(stage_moves, [
+            StageMove(version_stage='AWSCURRENT', move_to_version_id='token', remove_from_version_id='current'),
+            StageMove(version_stage='AWSPENDING', remove_from_version_id='token'),
+        ])
+
+    def test_should_remove_pending_only_when_plan_stage_transition_given_current_was_moved_already(self):
+        # Given
+        versions = {'current': ['AWSPREVIOUS'], 'token': ['AWSCURRENT', 'AWSPENDING']}
+
+        # When
+        stage_moves = plan_stage_transition(versions, 'token')
+
+        # Then
+        self.assertEqual(stage_moves, [StageMove(version_stage='AWSPENDING', remove_from_version_id='token')])
+
+    def test_should_return_no_moves_when_plan_stage_transition_given_final_state(self):
+        # Given
+        versions = {'current': ['AWSPREVIOUS'], 'token': ['AWSCURRENT']}
+
+        # When
+        stage_moves = plan_stage_transition(versions, 'token')
+
+        # Then
+        self.assertEqual(stage_moves, [])
+
+    def test_should_raise_exception_when_plan_stage_transition_given_token_is_not_pending(self):
+        # Given
+        versions = {'current': ['AWSCURRENT'], 'token': ['AWSPREVIOUS']}
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            plan_stage_transition(versions, 'token')
+
+    def test_should_raise_exception_when_plan_stage_transition_given_no_current_version(self):
+        # Given
+        versions = {'token': ['AWSPENDING']}
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            plan_stage_transition(versions, 'token')
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock, AsyncMock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.async_password_rotation_application import AsyncPasswordRotationApplication
+from rds_proxy_password_rotation.model import RotationStep, DatabaseCredentials, PasswordStage, UserCredentials, PasswordType, PasswordRotationResult, Credentials
+from rds_proxy_password_rotation.services import AsyncPasswordService, AsyncDatabaseService
+
+
+class SlowAsyncPasswordService(AsyncPasswordService):
+    """
+    Password service with a fixed latency for every credentials lookup.
+    """
+
+    def __init__(self, proxy_usernames: list[str], latency: float):
+        self.proxy_secrets = {f'proxy_secret_{username}': UserCredentials(username=username, password='proxy', rotation_type=PasswordType.AWS_RDS) for username in proxy_usernames}
+        self.latency = latency
+        self.written_credentials = {}
+
+    async def is_rotation_enabled(self, secret_id: str) -> bool:
+        return True
+
+    async def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
+        return True
+
+    async def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        return False
+
+    async def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        await asyncio.sleep(self.latency)
+        username = 'user2' if stage == PasswordStage.PENDING else 'user1'
+
+        return DatabaseCredentials(username=username, password=f'{username}_password', database_host='localhost', database_port=5432, database_name='test',
+                                   rotation_type=PasswordType.AWS_RDS, proxy_secret_ids=list(self.proxy_secrets.keys()))
+
+    async def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        await asyncio.sleep(self.latency)
+
+        return self.proxy_secrets.get(secret_id)
+
+    async def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
+        pass
+
+    async def set_credentials(self, secret_id: str, token: str, credential: Credentials):
+        self.written_credentials[secret_id] = credential
+
+    async def make_new_credentials_current(self, secret_id: str, token: str):
+        pass
+
+    async def remove_pending_version(self, secret_id: str, token: str):
+        pass
+
+
+class TestAsyncPasswordRotationApplication(IsolatedAsyncioTestCase):
+    async def test_should_do_nothing_when_rotate_secret_given_secret_has_rotation_disabled(self):
+        # Given
+        password_service = Mock(spec=AsyncPasswordService)
+        password_service.is_rotation_enabled = AsyncMock(return_value=False)
+
+        application = AsyncPasswordRotationApplication(password_service, Mock(spec=AsyncDatabaseService), Mock(spec=Logger))
+
+        # When
+        result = await application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # Then
+        self.assertEqual(result, PasswordRotationResult.NOTHING_TO_ROTATE)
+
+    async def test_should_overlap_the_lookups_when_rotate_secret_given_set_secret_step(self):
+        # Given
+        password_service = SlowAsyncPasswordService([f'proxy{i}' for i in range(9)] + ['user2'], latency=0.1)
+        database_service = Mock(spec=AsyncDatabaseService)
+        database_service.change_user_credentials = AsyncMock()
+
+        application = AsyncPasswordRotationApplication(password_service, database_service, Mock(spec=Logger), max_concurrent_proxy_secret_lookups=10)
+
+        # When
+        start = time.perf_counter()
+        await application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+        elapsed = time.perf_counter() - start
+
+        # Then
+        # pending and current credentials in parallel, then all proxy secrets in parallel. Sequentially 12 * 0.1 seconds.
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(password_service.written_credentials['proxy_secret_user2'].password, 'user2_password')
+        database_service.change_user_credentials.assert_awaited_once()
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import Mock
+
+from rds_proxy_password_rotation.batching_database_service import BatchingDatabaseService
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType
+from rds_proxy_password_rotation.services import DatabaseService
+
+
+def credentials(username: str, database_host: str = 'host') -> DatabaseCredentials:
+    return DatabaseCredentials(username=username, password='password', database_host=database_host, database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+
+
+class TestBatchingDatabaseService(TestCase):
+    def setUp(self):
+        self.database_service = Mock(spec=DatabaseService)
+        self.database_service.change_users_credentials.side_effect = lambda changes: [ValueError('failed') if c.username == 'failing' else None for c, _ in changes]
+
+    def test_should_change_the_passwords_with_one_call_when_change_user_credentials_given_concurrent_changes_in_one_database(self):
+        # Given
+        service = BatchingDatabaseService(self.database_service, window=0.2)
+
+        # When
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda username: service.change_user_credentials(credentials(username), 'new'), ['user1', 'user2', 'user3', 'user4']))
+
+        # Then
+        self.database_service.change_users_credentials.assert_called_once()
+        self.assertEqual(len(self.database_service.change_users_credentials.call_args.args[0]), 4)
+
+    def test_should_batch_per_database_when_change_user_credentials_given_changes_in_different_databases(self):
+        # Given
+        service = BatchingDatabaseService(self.database_service, window=0.2)
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda host: service.change_user_credentials(credentials('user1', host), 'new'), ['host1', 'host2']))
+
+        # Then
+        self.assertEqual(self.database_service.change_users_credentials.call_count, 2)
+
+    def test_should_raise_the_error_of_the_user_only_when_change_user_credentials_given_one_change_fails(self):
+        # Given
+        service = BatchingDatabaseService(self.database_service, window=0.2)
+
+        # When
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            failing = executor.submit(service.change_user_credentials, credentials('failing'), 'new')
+            succeeding = executor.submit(service.change_user_credentials, credentials('user1'), 'new')
+
+        # Then
+        self.assertIsInstance(failing.exception(), ValueError)
+        self.assertIsNone(succeeding.exception())
+
+    def test_should_not_wait_for_the_window_when_change_user_credentials_given_batch_is_full(self):
+        # Given
+        service = BatchingDatabaseService(self.database_service, window=10, max_batch_size=1)
+
+        # When
+        service.change_user_credentials(credentials('user1'), 'new')
+
+        # Then
+        self.database_service.change_users_credentials.assert_called_once()
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from rds_proxy_password_rotation.bounded_executor import map_as_completed
+
+
+class TestMapAsCompleted(TestCase):
+    def test_should_return_all_results_when_map_as_completed_given_more_items_than_pending_calls(self):
+        # Given
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # When
+            results = list(map_as_completed(executor, lambda item: item * 2, range(10), max_pending=3))
+
+        # Then
+        self.assertEqual(sorted(results), [item * 2 for item in range(10)])
+
+    def test_should_consume_the_items_lazily_when_map_as_completed_given_first_result_is_yielded(self):
+        # Given
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = map_as_completed(executor, lambda item: item, items(), max_pending=4)
+
+            # When
+            next(results)
+            results.close()
+
+        # Then
+        self.assertLessEqual(len(consumed), 5)
+
+    def test_should_cancel_the_calls_not_started_when_map_as_completed_given_iterator_is_closed(self):
+        # Given
+        started = []
+
+        def call(item: int) -> int:
+            started.append(item)
+            time.sleep(0.05)
+
+            return item
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = map_as_completed(executor, call, range(10), max_pending=10)
+
+            # When
+            next(results)
+            results.close()
+
+        # Then
+        self.assertLessEqual(len(started), 2)
@@ -0,0 +1,140 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.credential_drift_detector import CredentialDriftDetector
+from rds_proxy_password_rotation.deadline import Deadline
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordStage, PasswordType, UserCredentials, CredentialKind
+from rds_proxy_password_rotation.services import PasswordService, DatabaseService
+
+
+class RecordingDatabaseService(DatabaseService):
+    """
+    Accepts the passwords given and counts the logins running concurrently per database host.
+    """
+
+    def __init__(self, valid_passwords: dict[str, str], latency: float = 0):
+        self.valid_passwords = valid_passwords
+        self.latency = latency
+        self.running_by_host = {}
+        self.max_running_by_host = {}
+        self.lock = threading.Lock()
+
+    def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        pass
+
+    def test_user_credentials(self, credentials: DatabaseCredentials):
+        with self.lock:
+            self.running_by_host[credentials.database_host] = self.running_by_host.get(credentials.database_host, 0) + 1
+            self.max_running_by_host[credentials.database_host] = max(self.max_running_by_host.get(credentials.database_host, 0), self.running_by_host[credentials.database_host])
+
+        try:
+            time.sleep(self.latency)
+
+            if self.valid_passwords.get(credentials.username) != credentials.password:
+                raise ValueError(f'password authentication failed for user {credentials.username}')
+
+            return True
+        finally:
+            with self.lock:
+                self.running_by_host[credentials.database_host] -= 1
+
+
+class TestCredentialDriftDetector(TestCase):
+    def setUp(self):
+        def get_database_credentials(secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials:
+            username = 'user1' if stage == PasswordStage.CURRENT else 'user2'
+
+            return DatabaseCredentials(username=username, password=f'{username}_password', database_host=secret_id.split('/')[0], database_port=5432, database_name='test',
+                                       rotation_type=PasswordType.AWS_RDS, rotation_usernames=['user1', 'user2'], proxy_secret_ids=['proxy_secret'])
+
+        self.password_service = Mock(spec=PasswordService)
+        self.password_service.get_database_credentials.side_effect = get_database_credentials
+        self.password_service.get_user_credentials.return_value = UserCredentials(username='proxy', password='outdated', rotation_type=PasswordType.AWS_RDS)
+
+        self.database_service = RecordingDatabaseService({'user1': 'user1_password', 'user2': 'user2_password', 'proxy': 'proxy_password'})
+
+    def test_should_test_the_current_credentials_only_when_check_secrets_given_defaults(self):
+        # Given
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger))
+
+        # When
+        results = list(detector.check_secrets(['host1/secret1']))
+
+        # Then
+        self.assertEqual([(result.kind, result.username, result.is_failed()) for result in results], [(CredentialKind.CURRENT, 'user1', False)])
+        self.assertIsNotNone(results[0].connect_seconds)
+
+    def test_should_report_drifted_proxy_secret_when_check_secrets_given_all_checks_enabled(self):
+        # Given
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger), check_rotation_users=True, check_proxy_secrets=True)
+
+        # When
+        results = {result.kind: result for result in detector.check_secrets(['host1/secret1'])}
+
+        # Then
+        self.assertFalse(results[CredentialKind.CURRENT].is_failed())
+        self.assertEqual(results[CredentialKind.ROTATION_USER].username, 'user2')
+        self.assertFalse(results[CredentialKind.ROTATION_USER].is_failed())
+        self.assertEqual(results[CredentialKind.PROXY].secret_id, 'proxy_secret')
+        self.assertEqual(results[CredentialKind.PROXY].error, 'ValueError: password authentication failed for user proxy')
+
+    def test_should_report_the_secret_and_continue_when_check_secrets_given_unreadable_secret(self):
+        # Given
+        self.password_service.get_database_credentials.side_effect = lambda secret_id, stage, token=None: None if secret_id == 'host1/missing' else DatabaseCredentials(
+            username='user1', password='user1_password', database_host='host1', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger))
+
+        # When
+        results = {result.secret_id: result for result in detector.check_secrets(['host1/missing', 'host1/secret1'])}
+
+        # Then
+        self.assertTrue(results['host1/missing'].is_failed())
+        self.assertIsNone(results['host1/missing'].username)
+        self.assertFalse(results['host1/secret1'].is_failed())
+
+    def test_should_limit_the_logins_per_host_when_check_secrets_given_many_secrets_on_one_host(self):
+        # Given
+        self.database_service.latency = 0.01
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger), max_workers=8, max_concurrent_checks_per_host=2)
+        secret_ids = [f'host1/secret{i}' for i in range(6)] + [f'host2/secret{i}' for i in range(6)]
+
+        # When
+        results = list(detector.check_secrets(secret_ids))
+
+        # Then
+        self.assertEqual(len(results), 12)
+        self.assertEqual(self.database_service.max_running_by_host, {'host1': 2, 'host2': 2})
+
+    def test_should_fail_the_checks_without_testing_when_check_secrets_given_deadline_passed(self):
+        # Given
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger))
+
+        # When
+        results = list(detector.check_secrets(['host1/secret1', 'host2/secret1'], Deadline(0)))
+
+        # Then
+        self.assertTrue(all(result.error.startswith('DeadlineExceededError') for result in results))
+        self.assertEqual(self.database_service.max_running_by_host, {})
+
+    def test_should_read_the_secret_ids_lazily_when_check_secrets_given_first_result_is_consumed(self):
+        # Given
+        consumed = []
+
+        def secret_ids():
+            for index in range(1000):
+                consumed.append(index)
+                yield f'host1/secret{index}'
+
+        detector = CredentialDriftDetector(self.password_service, self.database_service, Mock(spec=Logger), max_workers=2)
+        results = detector.check_secrets(secret_ids())
+
+        # When
+        next(results)
+        results.close()
+
+        # Then
+        self.assertLessEqual(len(consumed), 5)
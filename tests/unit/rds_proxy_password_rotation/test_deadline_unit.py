@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from unittest import TestCase
+
+from rds_proxy_password_rotation.deadline import Deadline, DeadlineExceededError, deadline_scope, get_current_deadline
+
+
+class TestDeadline(TestCase):
+    def test_should_subtract_the_safety_margin_when_from_remaining_milliseconds(self):
+        # Given
+
+        # When
+        deadline = Deadline.from_remaining_milliseconds(10_000, safety_margin=2)
+
+        # Then
+        self.assertAlmostEqual(deadline.remaining(), 8, delta=0.1)
+
+    def test_should_raise_exception_when_check_given_less_time_left_than_required(self):
+        # Given
+        deadline = Deadline(1)
+
+        # When / Then
+        with self.assertRaises(DeadlineExceededError):
+            deadline.check('operation', required=2)
+
+    def test_should_cap_the_timeout_when_timeout_given_more_time_left_than_maximum(self):
+        # Given
+        deadline = Deadline(60)
+
+        # When
+        timeout = deadline.timeout('operation', maximum=5)
+
+        # Then
+        self.assertEqual(timeout, 5)
+
+    def test_should_provide_the_deadline_to_other_threads_when_deadline_scope_given_context_is_copied(self):
+        # Given
+        deadline = Deadline(60)
+
+        # When
+        with deadline_scope(deadline), ThreadPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(copy_context().run, get_current_deadline).result()
+
+        # Then
+        self.assertIs(result, deadline)
+        self.assertIsNone(get_current_deadline())
@@ -0,0 +1,124 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.async_password_rotation_application import RotationStepError
+from rds_proxy_password_rotation.fleet_rotation_runner import FleetRotationRunner
+from rds_proxy_password_rotation.model import RotationStep, DatabaseCredentials, PasswordStage, PasswordType, PasswordRotationResult
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import PasswordService
+
+
+class RecordingApplication:
+    """
+    Counts the rotations running concurrently per database host. The host of a secret is its id up to the first slash.
+    """
+
+    def __init__(self, latency: float, failing_secret_id: str = None):
+        self.latency = latency
+        self.failing_secret_id = failing_secret_id
+        self.executed_steps = []
+        self.running_by_host = {}
+        self.max_running_by_host = {}
+        self.lock = threading.Lock()
+
+    def rotate_secret(self, step: RotationStep, secret_id: str, token: str) -> PasswordRotationResult:
+        host = secret_id.split('/')[0]
+
+        with self.lock:
+            self.executed_steps.append((secret_id, step, token))
+            self.running_by_host[host] = self.running_by_host.get(host, 0) + 1
+            self.max_running_by_host[host] = max(self.max_running_by_host.get(host, 0), self.running_by_host[host])
+
+        try:
+            time.sleep(self.latency)
+
+            if secret_id == self.failing_secret_id and step == RotationStep.SET_SECRET:
+                raise ValueError('password change failed')
+
+            return PasswordRotationResult.STEP_EXECUTED
+        finally:
+            with self.lock:
+                self.running_by_host[host] -= 1
+
+
+class TestFleetRotationRunner(TestCase):
+    def setUp(self):
+        self.password_service = Mock(spec=PasswordService)
+        self.password_service.get_database_credentials.side_effect = lambda secret_id, stage, token=None: DatabaseCredentials(
+            username='user1', password='password', database_host=secret_id.split('/')[0], database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS)
+
+    def test_should_run_all_steps_with_one_token_when_rotate_secrets_given_secret(self):
+        # Given
+        application = RecordingApplication(latency=0)
+        runner = FleetRotationRunner(application, self.password_service, Mock(spec=Logger))
+
+        # When
+        outcomes = list(runner.rotate_secrets(['host1/secret1']))
+
+        # Then
+        self.assertEqual(outcomes[0].result, PasswordRotationResult.STEP_EXECUTED)
+        self.assertEqual([step for _, step, _ in application.executed_steps], list(RotationStep))
+        self.assertEqual(len({token for _, _, token in application.executed_steps}), 1)
+
+    def test_should_stop_the_rotation_when_rotate_secrets_given_nothing_to_rotate(self):
+        # Given
+        application = Mock(spec=PasswordRotationApplication)
+        application.rotate_secret.return_value = PasswordRotationResult.NOTHING_TO_ROTATE
+        runner = FleetRotationRunner(application, self.password_service, Mock(spec=Logger))
+
+        # When
+        outcomes = list(runner.rotate_secrets(['host1/secret1']))
+
+        # Then
+        self.assertEqual(outcomes[0].result, PasswordRotationResult.NOTHING_TO_ROTATE)
+        application.rotate_secret.assert_called_once()
+
+    def test_should_report_the_failed_step_and_continue_when_rotate_secrets_given_failing_secret(self):
+        # Given
+        application = RecordingApplication(latency=0, failing_secret_id='host1/secret1')
+        runner = FleetRotationRunner(application, self.password_service, Mock(spec=Logger))
+
+        # When
+        outcomes = {outcome.secret_id: outcome for outcome in runner.rotate_secrets(['host1/secret1', 'host1/secret2'])}
+
+        # Then
+        self.assertTrue(outcomes['host1/secret1'].is_failed())
+        self.assertEqual(outcomes['host1/secret1'].failed_step, RotationStep.SET_SECRET)
+        self.assertEqual(outcomes['host1/secret2'].result, PasswordRotationResult.STEP_EXECUTED)
+
+    def test_should_limit_the_rotations_per_host_when_rotate_secrets_given_many_secrets_on_one_host(self):
+        # Given
+        application = RecordingApplication(latency=0.01)
+        runner = FleetRotationRunner(application, self.password_service, Mock(spec=Logger), max_workers=8, max_concurrent_rotations_per_host=2)
+        secret_ids = [f'host1/secret{i}' for i in range(6)] + [f'host2/secret{i}' for i in range(6)]
+
+        # When
+        outcomes = list(runner.rotate_secrets(secret_ids))
+
+        # Then
+        self.assertEqual(len(outcomes), 12)
+        self.assertEqual(application.max_running_by_host, {'host1': 2, 'host2': 2})
+
+    def test_should_report_the_failed_step_when_rotate_secrets_given_single_invocation_fails(self):
+        # Given
+        def rotate_secret_fully(secret_id: str, token: str) -> PasswordRotationResult:
+            try:
+                raise ValueError('password change failed')
+            except ValueError as e:
+                raise RotationStepError(RotationStep.SET_SECRET, secret_id) from e
+
+        application = Mock(spec=PasswordRotationApplication)
+        application.rotate_secret_fully.side_effect = rotate_secret_fully
+        runner = FleetRotationRunner(application, self.password_service, Mock(spec=Logger), single_invocation=True)
+
+        # When
+        outcomes = list(runner.rotate_secrets(['host1/secret1']))
+
+        # Then
+        self.assertEqual(outcomes[0].failed_step, RotationStep.SET_SECRET)
+        self.assertEqual(outcomes[0].error, 'ValueError: password change failed')
+        application.rotate_secret.assert_not_called()
@@ -0,0 +1,69 @@
+import string
+from unittest import TestCase
+
+from rds_proxy_password_rotation.local_password_generator import LocalPasswordGenerator
+from rds_proxy_password_rotation.services import EXCLUDED_PASSWORD_CHARACTERS
+
+
+class TestLocalPasswordGenerator(TestCase):
+    def test_should_not_contain_excluded_characters_when_generate_password(self):
+        # Given
+        generator = LocalPasswordGenerator()
+
+        # When
+        passwords = generator.generate_passwords(200)
+
+        # Then
+        for password in passwords:
+            self.assertFalse(set(password) & set(EXCLUDED_PASSWORD_CHARACTERS))
+
+    def test_should_return_password_with_configured_length_when_generate_password(self):
+        # Given
+        generator = LocalPasswordGenerator(length=64)
+
+        # When
+        password = generator.generate_password()
+
+        # Then
+        self.assertEqual(len(password), 64)
+
+    def test_should_contain_each_character_type_when_generate_password_given_each_type_is_required(self):
+        # Given
+        generator = LocalPasswordGenerator(length=4)
+
+        # When
+        passwords = generator.generate_passwords(100)
+
+        # Then
+        for password in passwords:
+            self.assertTrue(set(password) & set(string.ascii_lowercase))
+            self.assertTrue(set(password) & set(string.ascii_uppercase))
+            self.assertTrue(set(password) & set(string.digits))
+            self.assertTrue(set(password) & set(string.punctuation))
+
+    def test_should_contain_digits_only_when_generate_password_given_other_types_are_not_included(self):
+        # Given
+        generator = LocalPasswordGenerator(include_lowercase=False, include_uppercase=False, include_punctuation=False)
+
+        # When
+        password = generator.generate_password()
+
+        # Then
+        self.assertTrue(password.isdigit())
+
+    def test_should_return_distinct_passwords_when_generate_passwords(self):
+        # Given
+        generator = LocalPasswordGenerator()
+
+        # When
+        passwords = generator.generate_passwords(50)
+
+        # Then
+        self.assertEqual(len(set(passwords)), 50)
+
+    def test_should_raise_value_error_when_created_given_length_too_short_for_required_types(self):
+        # Given
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            LocalPasswordGenerator(length=3)
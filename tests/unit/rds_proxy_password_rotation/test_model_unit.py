@@ -1,7 +1,7 @@
 import json
 from unittest import TestCase
 
-from rds_proxy_password_rotation.model import DatabaseCredentials, UserCredentials, Credentials
+from rds_proxy_password_rotation.model import DatabaseCredentials, UserCredentials, Credentials, PasswordType
 
 
 class TestCredentials(TestCase):
@@ -53,6 +53,61 @@ class TestDatabaseCredentials(TestCase):
         self.assertEqual(credentials.password, "admin")
         self.assertEqual(credentials.extra_field, "extra_value")
 
+    def test_should_return_true_when_has_valid_proxy_secret_index_given_every_proxy_secret_is_indexed(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS,
+                                          proxy_secret_ids=['secret1', 'secret2'], proxy_secret_id_by_username={'user1': 'secret1', 'user2': 'secret2'})
+
+        # When
+        result = credentials.has_valid_proxy_secret_index()
+
+        # Then
+        self.assertTrue(result)
+
+    def test_should_return_false_when_has_valid_proxy_secret_index_given_proxy_secret_is_missing_in_index(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS,
+                                          proxy_secret_ids=['secret1', 'secret2'], proxy_secret_id_by_username={'user1': 'secret1'})
+
+        # When
+        result = credentials.has_valid_proxy_secret_index()
+
+        # Then
+        self.assertFalse(result)
+
+    def test_should_return_false_when_has_valid_proxy_secret_index_given_user_is_missing_in_index(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS,
+                                          proxy_secret_ids=['secret1', 'secret2'], proxy_secret_id_by_username={'user1': 'secret1', 'user2': 'secret2'})
+
+        # When
+        result = credentials.has_valid_proxy_secret_index('user3')
+
+        # Then
+        self.assertFalse(result)
+
+    def test_should_return_true_when_has_valid_proxy_secret_index_given_user_is_indexed_without_proxy_secret(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS,
+                                          proxy_secret_ids=['secret1'], proxy_secret_id_by_username={'user1': 'secret1', 'user3': None})
+
+        # When
+        result = credentials.has_valid_proxy_secret_index('user3')
+
+        # Then
+        self.assertTrue(result)
+
+    def test_should_return_false_when_has_valid_proxy_secret_index_given_no_index(self):
+        # Given
+        credentials = DatabaseCredentials(username='admin', password='admin', database_host='localhost', database_port=5432, database_name='test', rotation_type=PasswordType.AWS_RDS,
+                                          proxy_secret_ids=['secret1'])
+
+        # When
+        result = credentials.has_valid_proxy_secret_index()
+
+        # Then
+        self.assertFalse(result)
+
 
 class TestUserCredentials(TestCase):
     def test_should_allow_extra_fields(self):
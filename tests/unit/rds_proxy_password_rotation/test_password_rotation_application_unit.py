@@ -1,11 +1,69 @@
+import threading
+import time
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, MagicMock
 
 from aws_lambda_powertools import Logger
 
-from rds_proxy_password_rotation.model import RotationStep
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.in_memory_secrets_manager import InMemorySecretsManagerClient
+from rds_proxy_password_rotation.async_password_rotation_application import RotationStepError
+from rds_proxy_password_rotation.model import RotationStep, DatabaseCredentials, PasswordStage, UserCredentials, PasswordType, Credentials
 from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication, PasswordRotationResult
-from rds_proxy_password_rotation.services import PasswordService, DatabaseService
+from rds_proxy_password_rotation.services import PasswordService, DatabaseService, Instrumentation
+
+
+class SlowPasswordService(PasswordService):
+    """
+    Password service with a fixed latency for every proxy secret lookup.
+    """
+
+    def __init__(self, proxy_usernames: list[str], latency: float, proxy_secret_id_by_username: dict[str, str] = None):
+        self.proxy_secrets = {f'proxy_secret_{username}': UserCredentials(username=username, password='proxy', rotation_type=PasswordType.AWS_RDS) for username in proxy_usernames}
+        self.proxy_secret_id_by_username = proxy_secret_id_by_username
+        self.latency = latency
+        self.written_credentials = {}
+        self.has_pending_credentials = True
+        self.pending_credentials = None
+        self.user_credentials_lookups = []
+
+    def is_rotation_enabled(self, secret_id: str) -> bool:
+        return True
+
+    def ensure_valid_secret_state(self, secret_id: str, token: str) -> bool:
+        return True
+
+    def is_rotation_finished(self, secret_id: str, token: str) -> bool:
+        return False
+
+    def get_database_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> DatabaseCredentials | None:
+        if stage == PasswordStage.PENDING and self.has_pending_credentials:
+            username = 'user2'
+        elif stage == PasswordStage.CURRENT:
+            username = 'user1'
+        else:
+            return None
+
+        return DatabaseCredentials(username=username, password=f'{username}_password', database_host='localhost', database_port=5432, database_name='test',
+                                   rotation_type=PasswordType.AWS_RDS, proxy_secret_ids=list(self.proxy_secrets.keys()), proxy_secret_id_by_username=self.proxy_secret_id_by_username)
+
+    def get_user_credentials(self, secret_id: str, stage: PasswordStage, token: str = None) -> UserCredentials | None:
+        time.sleep(self.latency)
+        self.user_credentials_lookups.append(secret_id)
+
+        return self.proxy_secrets.get(secret_id)
+
+    def set_new_pending_password(self, secret_id: str, token: str, credential: DatabaseCredentials):
+        self.pending_credentials = credential
+
+    def set_credentials(self, secret_id: str, token: str, credential: Credentials):
+        self.written_credentials[secret_id] = credential
+
+    def make_new_credentials_current(self, secret_id: str, token: str):
+        pass
+
+    def remove_pending_version(self, secret_id: str, token: str):
+        pass
 
 
 class TestPasswordRotationApplication(TestCase):
@@ -47,3 +105,240 @@ class TestPasswordRotationApplication(TestCase):
         # when / then
         with self.assertRaises(ValueError):
             application.rotate_secret('invalid_step', 'secret', 'token')
+
+    def test_should_open_and_close_the_request_scope_when_rotate_secret_given_step_fails(self):
+        # given
+        secrets_manager = Mock(spec=PasswordService)
+        secrets_manager.is_rotation_enabled.return_value = True
+
+        application = PasswordRotationApplication(secrets_manager, Mock(spec=DatabaseService), logger = Mock(spec=Logger))
+
+        # when
+        with self.assertRaises(ValueError):
+            application.rotate_secret('invalid_step', 'secret', 'token')
+
+        # then
+        secrets_manager.begin_request_scope.assert_called_once()
+        secrets_manager.end_request_scope.assert_called_once()
+
+    def test_should_look_up_proxy_secrets_concurrently_when_rotate_secret_given_set_secret_step(self):
+        # given
+        password_service = SlowPasswordService([f'proxy{i}' for i in range(7)] + ['user2'], latency=0.2)
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger), max_concurrent_proxy_secret_lookups=8)
+
+        # when
+        start = time.perf_counter()
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+        elapsed = time.perf_counter() - start
+
+        # then
+        # a sequential lookup takes 8 * 0.2 seconds
+        self.assertLess(elapsed, 0.8)
+
+    def test_should_update_the_proxy_secret_of_the_pending_user_when_rotate_secret_given_set_secret_step(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user2', 'proxy3'], latency=0)
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(list(password_service.written_credentials.keys()), ['proxy_secret_user2'])
+        self.assertEqual(password_service.written_credentials['proxy_secret_user2'].password, 'user2_password')
+
+    def test_should_fetch_only_the_proxy_secret_of_the_pending_user_when_rotate_secret_given_proxy_secrets_are_indexed(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user2', 'proxy3'], latency=0,
+                                               proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'user2': 'proxy_secret_user2', 'proxy3': 'proxy_secret_proxy3'})
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(password_service.user_credentials_lookups, ['proxy_secret_user2'])
+        self.assertEqual(list(password_service.written_credentials.keys()), ['proxy_secret_user2'])
+
+    def test_should_scan_the_proxy_secrets_when_rotate_secret_given_proxy_secret_index_is_outdated(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user2', 'proxy3'], latency=0,
+                                               proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'user2': 'proxy_secret_proxy3', 'proxy3': 'proxy_secret_user2'})
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(list(password_service.written_credentials.keys()), ['proxy_secret_user2'])
+
+    def test_should_scan_the_proxy_secrets_when_rotate_secret_given_pending_user_is_not_indexed(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user2'], latency=0,
+                                               proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'renamed_user': 'proxy_secret_user2'})
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(list(password_service.written_credentials.keys()), ['proxy_secret_user2'])
+
+    def test_should_rebuild_the_proxy_secret_index_when_rotate_secret_given_create_secret_step_and_next_user_is_not_indexed(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user1'], latency=0,
+                                               proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'renamed_user': 'proxy_secret_user1'})
+        password_service.has_pending_credentials = False
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.CREATE_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(password_service.pending_credentials.proxy_secret_id_by_username, {'proxy1': 'proxy_secret_proxy1', 'user1': 'proxy_secret_user1'})
+
+    def test_should_index_the_proxy_secrets_when_rotate_secret_given_create_secret_step(self):
+        # given
+        password_service = SlowPasswordService(['proxy1', 'user2'], latency=0)
+        password_service.has_pending_credentials = False
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.CREATE_SECRET, 'secret', 'token')
+
+        # then
+        # user1 is the user to rotate to and has no proxy secret
+        self.assertEqual(password_service.pending_credentials.proxy_secret_id_by_username, {'proxy1': 'proxy_secret_proxy1', 'user2': 'proxy_secret_user2', 'user1': None})
+
+    def test_should_not_rebuild_the_proxy_secret_index_when_rotate_secret_given_create_secret_step_and_next_user_is_indexed_without_proxy_secret(self):
+        # given
+        password_service = SlowPasswordService(['proxy1'], latency=0, proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'user1': None})
+        password_service.has_pending_credentials = False
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.CREATE_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(password_service.user_credentials_lookups, [])
+        self.assertEqual(password_service.pending_credentials.proxy_secret_id_by_username, {'proxy1': 'proxy_secret_proxy1', 'user1': None})
+
+    def test_should_not_scan_the_proxy_secrets_when_rotate_secret_given_pending_user_is_indexed_without_proxy_secret(self):
+        # given
+        password_service = SlowPasswordService(['proxy1'], latency=0, proxy_secret_id_by_username={'proxy1': 'proxy_secret_proxy1', 'user2': None})
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(password_service.user_credentials_lookups, [])
+        self.assertEqual(password_service.written_credentials, {})
+
+    def test_should_measure_the_step_and_flush_the_metrics_when_rotate_secret_given_set_secret_step(self):
+        # given
+        password_service = SlowPasswordService(['user2'], latency=0)
+        instrumentation = MagicMock(spec=Instrumentation)
+
+        application = PasswordRotationApplication(password_service, Mock(spec=DatabaseService), Mock(spec=Logger), instrumentation=instrumentation)
+
+        # when
+        application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # then
+        instrumentation.measure.assert_called_once_with('StepDuration', {'Step': 'set_secret'})
+        instrumentation.flush.assert_called_once()
+
+    def test_should_share_the_metadata_between_the_steps_when_rotate_secret_fully_given_secret(self):
+        # given
+        client = InMemorySecretsManagerClient()
+        client.add_secret('secret', DatabaseCredentials(username='user1', password='password', database_host='localhost', database_port=5432, database_name='test',
+                                                        rotation_type=PasswordType.AWS_RDS).model_dump_json())
+        previous_version = next(iter(client.get_stages('secret')))
+        database_service = Mock(spec=DatabaseService)
+
+        application = PasswordRotationApplication(AwsSecretsManagerService(client, Mock(spec=Logger)), database_service, Mock(spec=Logger))
+
+        # when
+        result = application.rotate_secret_fully('secret', 'token')
+
+        # then
+        self.assertEqual(result, PasswordRotationResult.STEP_EXECUTED)
+        self.assertEqual(client.get_stages('secret'), {previous_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+        # once for the create step and once more after the pending version has been written
+        self.assertEqual(client.call_counts['describe_secret'], 2)
+        # the current version for the create step only, the pending credentials are known from writing them
+        self.assertEqual(client.call_counts['get_secret_value'], 2)
+        database_service.change_user_credentials.assert_called_once()
+        database_service.test_user_credentials.assert_called_once()
+
+    def test_should_raise_exception_with_the_failed_step_when_rotate_secret_fully_given_password_change_fails(self):
+        # given
+        password_service = SlowPasswordService(['user2'], latency=0)
+        database_service = Mock(spec=DatabaseService)
+        database_service.change_user_credentials.side_effect = ConnectionError('database not reachable')
+
+        application = PasswordRotationApplication(password_service, database_service, Mock(spec=Logger))
+
+        # when
+        with self.assertRaises(RotationStepError) as context:
+            application.rotate_secret_fully('secret', 'token')
+
+        # then
+        self.assertEqual(context.exception.step, RotationStep.SET_SECRET)
+        self.assertIsInstance(context.exception.__cause__, ConnectionError)
+
+    def test_should_remove_the_pending_stage_when_rotate_secret_given_finish_secret_step_and_pending_version_is_current_already(self):
+        # given
+        client = InMemorySecretsManagerClient()
+        credentials = DatabaseCredentials(username='user1', password='password', database_host='localhost', database_port=5432, database_name='test',
+                                          rotation_type=PasswordType.AWS_RDS)
+        client.add_secret('secret', credentials.model_dump_json())
+        previous_version = next(iter(client.get_stages('secret')))
+        # finish_secret interrupted after moving AWSCURRENT
+        client.put_secret_value(SecretId='secret', ClientRequestToken='token', SecretString=credentials.model_copy(update={'username': 'user2'}).model_dump_json(),
+                                VersionStages=['AWSPENDING', 'AWSCURRENT'])
+
+        application = PasswordRotationApplication(AwsSecretsManagerService(client, Mock(spec=Logger)), Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        # when
+        result = application.rotate_secret(RotationStep.FINISH_SECRET, 'secret', 'token')
+
+        # then
+        self.assertEqual(result, PasswordRotationResult.STEP_EXECUTED)
+        self.assertEqual(client.get_stages('secret'), {previous_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+
+    def test_should_do_nothing_when_rotate_secret_fully_given_rotation_to_token_finished_already(self):
+        # given
+        client = InMemorySecretsManagerClient()
+        client.add_secret('secret', DatabaseCredentials(username='user1', password='password', database_host='localhost', database_port=5432, database_name='test',
+                                                        rotation_type=PasswordType.AWS_RDS).model_dump_json())
+        previous_version = next(iter(client.get_stages('secret')))
+        database_service = Mock(spec=DatabaseService)
+
+        application = PasswordRotationApplication(AwsSecretsManagerService(client, Mock(spec=Logger)), database_service, Mock(spec=Logger))
+        application.rotate_secret_fully('secret', 'token')
+        client.reset_call_counts()
+
+        # when
+        result = application.rotate_secret_fully('secret', 'token')
+
+        # then
+        self.assertEqual(result, PasswordRotationResult.NOTHING_TO_ROTATE)
+        self.assertEqual(client.get_stages('secret'), {previous_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+        self.assertEqual(set(client.call_counts.keys()), {'describe_secret'})
+        database_service.change_user_credentials.assert_called_once()
+
+    def test_should_stop_the_threads_when_close_given_secrets_were_rotated(self):
+        # given
+        threads_before = threading.active_count()
+        application = PasswordRotationApplication(SlowPasswordService(['user2'], latency=0), Mock(spec=DatabaseService), Mock(spec=Logger))
+
+        for _ in range(3):
+            application.rotate_secret(RotationStep.SET_SECRET, 'secret', 'token')
+
+        # when
+        application.close()
+
+        # then
+        self.assertEqual(threading.active_count(), threads_before)
@@ -0,0 +1,174 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+
+from rds_proxy_password_rotation.adapter.aws_secrets_manager import AwsSecretsManagerService
+from rds_proxy_password_rotation.adapter.in_memory_secrets_manager import InMemorySecretsManagerClient
+from rds_proxy_password_rotation.model import DatabaseCredentials, PasswordType, SecretInventoryRecord, StuckRotationClass, SweepAction
+from rds_proxy_password_rotation.password_rotation_application import PasswordRotationApplication
+from rds_proxy_password_rotation.services import DatabaseService
+from rds_proxy_password_rotation.stuck_rotation_sweeper import StuckRotationSweeper
+
+
+class PasswordDatabaseService(DatabaseService):
+    """
+    Database which only knows users and their passwords.
+    """
+
+    def __init__(self, passwords: dict[str, str]):
+        self.passwords = passwords
+        self.changes = 0
+
+    def change_user_credentials(self, old_credentials: DatabaseCredentials, new_password: str):
+        self.test_user_credentials(old_credentials)
+        self.passwords[old_credentials.username] = new_password
+        self.changes += 1
+
+    def test_user_credentials(self, credentials: DatabaseCredentials):
+        if self.passwords.get(credentials.username) != credentials.password:
+            raise ValueError(f'password authentication failed for user {credentials.username}')
+
+        return True
+
+
+class TestStuckRotationSweeper(TestCase):
+    def setUp(self):
+        self.client = InMemorySecretsManagerClient()
+        self.credentials = DatabaseCredentials(username='user1', password='old_password', database_host='localhost', database_port=5432, database_name='test',
+                                               rotation_type=PasswordType.AWS_RDS)
+        self.arn = self.client.add_secret('secret', self.credentials.model_dump_json())
+        self.current_version = next(iter(self.client.get_stages('secret')))
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='token', SecretString=self.credentials.model_copy(update={'password': 'new_password'}).model_dump_json(),
+                                     VersionStages=['AWSPENDING'])
+        self.records = [SecretInventoryRecord(arn=self.arn, name='secret', rotation_enabled=True, pending_version_id='token')]
+
+        self.logger = Mock(spec=Logger)
+        self.secrets_manager = AwsSecretsManagerService(self.client, self.logger)
+
+    def __create_sweeper(self, database_service: DatabaseService, **kwargs) -> StuckRotationSweeper:
+        application = PasswordRotationApplication(self.secrets_manager, database_service, self.logger)
+
+        return StuckRotationSweeper(application, self.secrets_manager, database_service, self.logger, **kwargs)
+
+    def test_should_resume_the_rotation_when_sweep_given_pending_password_not_applied(self):
+        # Given
+        database_service = PasswordDatabaseService({'user1': 'old_password'})
+        sweeper = self.__create_sweeper(database_service)
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual((outcomes[0].classification, outcomes[0].action, outcomes[0].error), (StuckRotationClass.NOT_APPLIED, SweepAction.RESUMED, None))
+        self.assertEqual(database_service.passwords, {'user1': 'new_password'})
+        self.assertEqual(self.client.get_stages('secret'), {self.current_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+
+    def test_should_finish_the_rotation_without_changing_the_password_when_sweep_given_pending_password_applied(self):
+        # Given
+        database_service = PasswordDatabaseService({'user1': 'new_password'})
+        sweeper = self.__create_sweeper(database_service)
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual((outcomes[0].classification, outcomes[0].action), (StuckRotationClass.APPLIED, SweepAction.RESUMED))
+        self.assertEqual(database_service.changes, 0)
+        self.assertEqual(self.client.get_stages('secret'), {self.current_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+
+    def test_should_remove_the_pending_stage_when_sweep_given_pending_version_is_current_already(self):
+        # Given
+        self.client.update_secret_version_stage(SecretId='secret', VersionStage='AWSCURRENT', MoveToVersionId='token', RemoveFromVersionId=self.current_version)
+        database_service = PasswordDatabaseService({'user1': 'new_password'})
+        sweeper = self.__create_sweeper(database_service)
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual((outcomes[0].classification, outcomes[0].action, outcomes[0].error), (StuckRotationClass.APPLIED, SweepAction.RESUMED, None))
+        self.assertEqual(self.client.get_stages('secret'), {self.current_version: ['AWSPREVIOUS'], 'token': ['AWSCURRENT']})
+
+    def test_should_report_the_secret_when_sweep_given_rotation_disabled(self):
+        # Given
+        database_service = PasswordDatabaseService({'user1': 'old_password'})
+        sweeper = self.__create_sweeper(database_service)
+        self.secrets_manager.is_rotation_enabled = Mock(return_value=False)
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual(outcomes[0].classification, StuckRotationClass.NOT_APPLIED)
+        self.assertIn('still pending', outcomes[0].error)
+
+    def test_should_roll_back_when_sweep_given_pending_password_not_applied_and_roll_back_requested(self):
+        # Given
+        database_service = PasswordDatabaseService({'user1': 'old_password'})
+        sweeper = self.__create_sweeper(database_service, roll_back_not_applied=True)
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual(outcomes[0].action, SweepAction.ROLLED_BACK)
+        self.assertEqual(database_service.passwords, {'user1': 'old_password'})
+        self.assertEqual(self.client.get_stages('secret'), {self.current_version: ['AWSCURRENT'], 'token': []})
+
+    def test_should_roll_back_when_sweep_given_unreadable_pending_version(self):
+        # Given
+        self.client.put_secret_value(SecretId='secret', ClientRequestToken='broken', SecretString='{}', VersionStages=['AWSPENDING'])
+        sweeper = self.__create_sweeper(PasswordDatabaseService({'user1': 'old_password'}))
+
+        # When
+        outcomes = list(sweeper.sweep([self.records[0].model_copy(update={'pending_version_id': 'broken'})]))
+
+        # Then
+        self.assertEqual((outcomes[0].classification, outcomes[0].action), (StuckRotationClass.ORPHANED, SweepAction.ROLLED_BACK))
+        self.assertNotIn('AWSPENDING', self.client.get_stages('secret')['broken'])
+
+    def test_should_change_nothing_when_sweep_given_dry_run(self):
+        # Given
+        database_service = PasswordDatabaseService({'user1': 'old_password'})
+        sweeper = self.__create_sweeper(database_service, dry_run=True)
+        self.client.reset_call_counts()
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertEqual((outcomes[0].classification, outcomes[0].action), (StuckRotationClass.NOT_APPLIED, SweepAction.NONE))
+        self.assertEqual(set(self.client.call_counts.keys()), {'get_secret_value'})
+
+    def test_should_report_the_secret_when_sweep_given_no_credentials_work(self):
+        # Given
+        sweeper = self.__create_sweeper(PasswordDatabaseService({}))
+
+        # When
+        outcomes = list(sweeper.sweep(self.records))
+
+        # Then
+        self.assertTrue(outcomes[0].is_failed())
+        self.assertIsNone(outcomes[0].classification)
+        self.assertIn('token', self.client.get_stages('secret'))
+        self.assertEqual(self.client.get_stages('secret')['token'], ['AWSPENDING'])
+
+    def test_should_read_the_records_lazily_when_sweep_given_first_outcome_is_consumed(self):
+        # Given
+        consumed = []
+
+        def records():
+            for index in range(1000):
+                consumed.append(index)
+                yield self.records[0]
+
+        sweeper = self.__create_sweeper(PasswordDatabaseService({'user1': 'old_password'}), max_workers=2, dry_run=True)
+        outcomes = sweeper.sweep(records())
+
+        # When
+        next(outcomes)
+        outcomes.close()
+
+        # Then
+        self.assertLessEqual(len(consumed), 5)